@@ -3,8 +3,11 @@ from .orders_blueprint import orders
 from .payments_blueprint import payments
 from .rules_blueprint import rules
 from .rule_actions_blueprint import rule_actions
+from .metrics_blueprint import metrics
+from .tracing_blueprint import tracing
 
-BP_LIST = [orders, payments, rules, rule_actions]
+BP_LIST = [orders, payments, rules, rule_actions, metrics,
+           tracing]
 
 def register_blueprints(app: Chalice) -> None:
     """
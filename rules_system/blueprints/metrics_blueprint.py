@@ -0,0 +1,30 @@
+import time
+from chalice import Blueprint, Response
+from rules_system.helpers.prometheus import (REGISTRY,
+                                             HTTP_REQUESTS,
+                                             HTTP_REQUEST_SECONDS)
+
+
+metrics = Blueprint(__name__)
+
+@metrics.middleware('http')
+def metrics_middleware(event, get_response):
+    route = event.context.get('resourcePath', event.path)
+    started_at = time.perf_counter()
+    status = 500
+    try:
+        response = get_response(event)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started_at,
+                                     event.method, route)
+        HTTP_REQUESTS.inc(event.method, route, status)
+
+@metrics.route('/metrics')
+def metrics_get():
+    return Response(
+        body=REGISTRY.render(),
+        status_code=200,
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
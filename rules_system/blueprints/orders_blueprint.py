@@ -14,6 +14,12 @@ def orders_post():
     order_controller = OrderController(orders.current_request)
     return response(order_controller.post())
 
+@orders.route('/orders/bulk', methods=['POST'],
+              content_types=['application/json', 'application/x-ndjson'])
+def orders_bulk():
+    order_controller = OrderController(orders.current_request)
+    return response(order_controller.bulk())
+
 @orders.route('/orders/{_id}', methods=['PUT'])
 def orders_put(_id:str):
     order_controller = OrderController(orders.current_request)
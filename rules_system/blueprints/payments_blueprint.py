@@ -14,6 +14,12 @@ def payments_post():
     payment_controller = PaymentController(payments.current_request)
     return response(payment_controller.post())
 
+@payments.route('/payments/bulk', methods=['POST'],
+                content_types=['application/json', 'application/x-ndjson'])
+def payments_bulk():
+    payment_controller = PaymentController(payments.current_request)
+    return response(payment_controller.bulk())
+
 @payments.route('/payments/{_id}', methods=['PUT'])
 def payments_put(_id:str):
     payment_controller = PaymentController(payments.current_request)
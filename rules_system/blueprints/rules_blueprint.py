@@ -10,6 +10,11 @@ def rules_get(_id:str):
     rule_controller = RuleController()
     return response(rule_controller.get(_id))
 
+@rules.route('/rules/{_id}/stats')
+def rules_stats(_id:str):
+    rule_controller = RuleController()
+    return response(rule_controller.stats(_id))
+
 @rules.route('/rules', methods=['POST'])
 def rules_post():
     rule_controller = RuleController(rules.current_request)
@@ -0,0 +1,17 @@
+from chalice import Blueprint
+from rules_system.config.settings import TRACE_HEADER, SLOW_TRACE_THRESHOLD
+from rules_system.helpers.tracing import trace, timing_header
+
+
+tracing = Blueprint(__name__)
+
+@tracing.middleware('http')
+def tracing_middleware(event, get_response):
+    route = event.context.get('resourcePath', event.path)
+    with trace(f"{event.method} {route}", SLOW_TRACE_THRESHOLD / 1000,
+               path=event.path) as root:
+        response = get_response(event)
+        root.tags['status'] = response.status_code
+    if TRACE_HEADER:
+        response.headers['Server-Timing'] = timing_header(root)
+    return response
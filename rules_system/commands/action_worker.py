@@ -0,0 +1,106 @@
+"""Executes the rule action jobs enqueued by the API.
+
+Usage:
+    python -m rules_system.commands.action_worker [--workers 8] [--timeout 5]
+        [--metrics-port 9100]
+"""
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rules_system.logger import logger
+from rules_system.config.redis import get_redis_instance
+from rules_system.config.settings import ACTION_WORKERS, WORKER_METRICS_PORT
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.helpers import prometheus
+
+
+def run(workers:int, timeout:int = 5, max_jobs:int = None, 
+        redis_instance = None, stopped:threading.Event = None) -> int:
+    """Consumes the action queue with a pool of threads.
+
+    At most `workers` jobs are taken from the queue at a time, so jobs that
+    are not being executed stay in Redis for other workers. While running,
+    the worker listens to the invalidation channel, so rules and actions
+    changed through the API are not executed from a stale cache. Once the
+    running jobs finish, the held emails are sent and the metrics flushed.
+
+    Args:
+        workers (int): Number of jobs executed concurrently.
+        timeout (int): Seconds each poll waits for a job.
+        max_jobs (int): Stops after this number of jobs (optional).
+        redis_instance (any): Pre initiated redis instance (optional)
+        stopped (threading.Event): Stops polling once set (optional).
+
+    Returns:
+        int: Number of jobs consumed.
+    """
+    redis = redis_instance or get_redis_instance()
+    queue = RuleEngine.get_action_queue()
+    slots = threading.Semaphore(workers)
+    consumed = 0
+
+    def execute(job:dict) -> None:
+        try:
+            actions_executed = queue.handler(job)
+            logger.info(f"[ACTION WORKER]: '{len(actions_executed)} actions executed'")
+        except Exception as e:
+            logger.error(f"[ACTION WORKER EXCEPTION]: '{str(e)}'")
+        finally:
+            slots.release()
+
+    RuleEngine.start_invalidation_listener(redis)
+    try:
+        with ThreadPoolExecutor(max_workers=workers, 
+                                thread_name_prefix='rule-action') as pool:
+            while (max_jobs is None or consumed < max_jobs) and \
+                    not (stopped and stopped.is_set()):
+                slots.acquire()
+                job = queue.dequeue(timeout, redis)
+                if job is None:
+                    slots.release()
+                    continue
+                pool.submit(execute, job)
+                consumed += 1
+    finally:
+        RuleEngine.stop_invalidation_listener()
+        RuleEngine.shutdown()
+    return consumed
+
+
+def main(argv:list = None) -> int:
+    """Runs the action worker until interrupted.
+
+    Args:
+        argv (list): Command line arguments (optional).
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        description="Execute the rule action jobs enqueued by the API."
+    )
+    parser.add_argument('--workers', type=int, default=ACTION_WORKERS,
+                        help="Jobs executed concurrently.")
+    parser.add_argument('--timeout', type=int, default=5,
+                        help="Seconds each poll waits for a job.")
+    parser.add_argument('--metrics-port', type=int, default=WORKER_METRICS_PORT,
+                        help="Port serving the worker's Prometheus metrics at "
+                             "/metrics (0 disables it).")
+    args = parser.parse_args(argv)
+
+    # The actions are executed here, so their metrics are only in this process
+    server = prometheus.serve(args.metrics_port) if args.metrics_port else None
+    logger.info(f"[ACTION WORKER]: 'Started with {args.workers} workers'")
+    try:
+        run(args.workers, args.timeout)
+    except KeyboardInterrupt:
+        logger.info("[ACTION WORKER]: 'Stopped'")
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
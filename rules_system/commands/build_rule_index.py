@@ -0,0 +1,33 @@
+"""Builds the per-entity rule indexes from the existing rule filter keys.
+
+Usage:
+    python -m rules_system.commands.build_rule_index [--batch-size 500]
+"""
+import argparse
+from rules_system.logger import logger
+from rules_system.helpers.rule_engine import RuleEngine
+
+
+def main(argv:list = None) -> int:
+    """Runs the rule index migration.
+
+    Args:
+        argv (list): Command line arguments (optional).
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        description="Index every 'rule_filter#*' key by entity."
+    )
+    parser.add_argument('--batch-size', type=int, default=500,
+                        help="Keys read and written per Redis round trip.")
+    args = parser.parse_args(argv)
+
+    indexed = RuleEngine.build_rule_index(batch_size=args.batch_size)
+    logger.info(f"[RULE INDEX]: '{indexed} rules indexed'")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,325 @@
+"""Replays NDJSON event files against the API and reports throughput and
+latency percentiles.
+
+Each line of the files is either the data of an event, posted to the
+resource given by `--resource`, or a request like
+`{"method": "POST", "path": "/payments", "body": {...}}`. The requests are
+spread over `--concurrency` workers at up to `--rate` requests per second.
+With `--mix`, part of the requests update (PUT) or read (GET) events created
+earlier in the run.
+
+Usage:
+    python -m rules_system.commands.load_test events.ndjson
+        [--url http://localhost:8000] [--resource orders] [--concurrency 16]
+        [--rate 200] [--duration 60 | --requests 10000]
+        [--mix post=80,put=10,get=10] [--output report.json]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from typing import Iterable, List, Optional
+import requests
+from rules_system.logger import logger
+
+METHODS = ('post', 'put', 'get')
+
+
+def read_events(paths:Iterable[str], resource:str) -> List[dict]:
+    """Reads the requests of NDJSON files.
+
+    Args:
+        paths (Iterable[str]): NDJSON files.
+        resource (str): Resource the lines holding only event data are
+                        posted to.
+
+    Returns:
+        List[dict]: Requests with 'method', 'path' and 'body'.
+    """
+    events = []
+    for path in paths:
+        with open(path) as lines:
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: {str(e)}")
+                if isinstance(item, dict) and 'path' in item:
+                    events.append({'method': item.get('method', 'POST').upper(),
+                                   'path': item['path'],
+                                   'body': item.get('body')})
+                else:
+                    events.append({'method': 'POST', 'path': f"/{resource}",
+                                   'body': item})
+    return events
+
+
+def parse_mix(mix:str) -> dict:
+    """Parses a workload mix such as 'post=80,put=10,get=10'.
+
+    Args:
+        mix (str): Weight of each method.
+
+    Returns:
+        dict: Weight by method.
+    """
+    weights = {}
+    for part in filter(None, mix.split(',')):
+        method, _, weight = part.partition('=')
+        method = method.strip().lower()
+        if method not in METHODS:
+            raise ValueError(f"Unknown method '{method}' in the mix.")
+        weights[method] = float(weight or 0)
+    if not weights.get('post'):
+        raise ValueError("The mix needs POST requests to create the events "
+                         "read and updated by the others.")
+    return weights
+
+
+def percentile(values:list, percent:float) -> float:
+    """Returns the nearest-rank percentile of sorted values."""
+    if not values:
+        return 0
+    index = int(round(percent / 100 * len(values))) - 1
+    return values[min(len(values) - 1, max(index, 0))]
+
+
+class LoadTest:
+    """Drives requests built from the events against the API.
+
+    When a rate is given, request `n` is scheduled `n / rate` seconds after
+    the start and its latency is measured from that moment, so a slow
+    server also shows up in the latency of the requests it delayed.
+
+    Args:
+        url (str): Base URL of the API.
+        events (List[dict]): Requests read from the NDJSON files.
+        concurrency (int): Number of concurrent workers.
+        rate (float): Target requests per second (0 sends as fast as the
+                      workers can).
+        duration (float): Seconds the test runs, if `total_requests` is not
+                          given.
+        total_requests (int): Number of requests to send (optional)
+        mix (dict): Weight of each method (optional)
+        timeout (float): Seconds to wait for each response.
+        seed (int): Seed of the method and event choices.
+    """
+
+    def __init__(self, url:str, events:List[dict], concurrency:int = 16,
+                 rate:float = 0, duration:float = 30,
+                 total_requests:Optional[int] = None, mix:dict = None,
+                 timeout:float = 10, seed:int = 42) -> None:
+        self.url = url.rstrip('/')
+        self.events = events
+        self.concurrency = max(concurrency, 1)
+        self.rate = rate
+        self.duration = duration
+        self.total_requests = total_requests
+        self.mix = mix or {'post': 1}
+        self.timeout = timeout
+        self.seed = seed
+        self.__next = 0
+        self.__created = []
+        self.__lock = threading.Lock()
+
+
+    def run(self) -> dict:
+        """Runs the test until the number of requests or the duration is
+        reached.
+
+        Returns:
+            dict: Report of the test (see `report`).
+        """
+        if not self.events:
+            raise ValueError("No events to replay.")
+        self.__started_at = time.perf_counter()
+        self.__deadline = None if self.total_requests else \
+            self.__started_at + self.duration
+        samples = [[] for _ in range(self.concurrency)]
+        workers = [threading.Thread(target=self.__work, args=(samples[index],),
+                                    daemon=True)
+                   for index in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - self.__started_at
+        return self.report([sample for worker_samples in samples
+                            for sample in worker_samples], elapsed)
+
+
+    def report(self, samples:list, elapsed:float) -> dict:
+        """Summarizes the samples of a run.
+
+        Args:
+            samples (list): `(method, status, latency)` of each request, with
+                            status 0 for connection errors.
+            elapsed (float): Duration of the run in seconds.
+
+        Returns:
+            dict: Requests, errors, throughput and latency percentiles in
+                  milliseconds, overall and by method.
+        """
+        def summarize(items:list) -> dict:
+            latencies = sorted(latency * 1000 for _, _, latency in items)
+            statuses = {}
+            for _, status, _ in items:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            return {
+                'requests': len(items),
+                'errors': sum(1 for _, status, _ in items
+                              if not status or status >= 400),
+                'throughput': round(len(items) / elapsed, 1) if elapsed else 0,
+                'statuses': statuses,
+                'latency_ms': {
+                    'p50': round(percentile(latencies, 50), 2),
+                    'p90': round(percentile(latencies, 90), 2),
+                    'p99': round(percentile(latencies, 99), 2),
+                    'max': round(latencies[-1], 2) if latencies else 0,
+                }
+            }
+
+        report = summarize(samples)
+        report['elapsed'] = round(elapsed, 2)
+        report['methods'] = {
+            method: summarize([sample for sample in samples
+                               if sample[0] == method])
+            for method in sorted({sample[0] for sample in samples})
+        }
+        return report
+
+
+    def __work(self, samples:list) -> None:
+        session = requests.Session()
+        while True:
+            index = self.__claim()
+            if index is None:
+                break
+            scheduled_at = self.__started_at + index / self.rate \
+                if self.rate else time.perf_counter()
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self.__deadline and time.perf_counter() >= self.__deadline:
+                break
+            rng = random.Random(self.seed + index)
+            method, path, body = self.__build(index, rng)
+            status = 0
+            try:
+                response = session.request(method, self.url + path, json=body,
+                                           timeout=self.timeout)
+                status = response.status_code
+                if method == 'POST' and status == 201:
+                    self.__remember(path, response)
+            except requests.RequestException as e:
+                logger.debug(f"[LOAD TEST EXCEPTION]: '{str(e)}'")
+            samples.append((method, status, time.perf_counter() - scheduled_at))
+        session.close()
+
+
+    def __claim(self) -> Optional[int]:
+        with self.__lock:
+            if self.total_requests is not None and \
+                    self.__next >= self.total_requests:
+                return None
+            if self.__deadline and time.perf_counter() >= self.__deadline:
+                return None
+            index = self.__next
+            self.__next += 1
+            return index
+
+
+    def __build(self, index:int, rng:random.Random) -> tuple:
+        event = self.events[index % len(self.events)]
+        methods = list(self.mix)
+        choice = rng.choices(methods, weights=[self.mix[m] for m in methods])[0]
+        with self.__lock:
+            created = rng.choice(self.__created) if self.__created else None
+        if choice == 'post' or event['method'] != 'POST' or created is None:
+            return event['method'], event['path'], event['body']
+        if choice == 'put':
+            return 'PUT', created, event['body']
+        return 'GET', created, None
+
+
+    def __remember(self, path:str, response) -> None:
+        try:
+            _id = response.json().get('id')
+        except ValueError:
+            return
+        if _id:
+            with self.__lock:
+                self.__created.append(f"{path.rstrip('/')}/{_id}")
+
+
+def print_report(report:dict) -> None:
+    """Prints a report in a table by method."""
+    print(f"{report['requests']} requests in {report['elapsed']} s, "
+          f"{report['throughput']} req/s, {report['errors']} errors")
+    print(f"{'method':<8} {'requests':>9} {'errors':>7} {'req/s':>9} "
+          f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for method, summary in [('ALL', report), *report['methods'].items()]:
+        latency = summary['latency_ms']
+        print(f"{method:<8} {summary['requests']:>9} {summary['errors']:>7} "
+              f"{summary['throughput']:>9} {latency['p50']:>9} "
+              f"{latency['p90']:>9} {latency['p99']:>9} {latency['max']:>9}")
+
+
+def main(argv:list = None) -> int:
+    """Runs the load test.
+
+    Args:
+        argv (list): Command line arguments (optional).
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        description="Replay NDJSON event files against the API."
+    )
+    parser.add_argument('files', nargs='+', help="NDJSON event files.")
+    parser.add_argument('--url', default='http://localhost:8000',
+                        help="Base URL of the API.")
+    parser.add_argument('--resource', default='orders',
+                        choices=['orders', 'payments'],
+                        help="Resource the event data lines are posted to.")
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="Number of concurrent workers.")
+    parser.add_argument('--rate', type=float, default=0,
+                        help="Target requests per second (0 is unlimited).")
+    parser.add_argument('--duration', type=float, default=30,
+                        help="Seconds the test runs.")
+    parser.add_argument('--requests', type=int,
+                        help="Number of requests, instead of a duration.")
+    parser.add_argument('--mix', default='post=100',
+                        help="Weight of each method, e.g. post=80,put=10,get=10.")
+    parser.add_argument('--timeout', type=float, default=10,
+                        help="Seconds to wait for each response.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Saves the report as JSON.")
+    args = parser.parse_args(argv)
+
+    try:
+        events = read_events(args.files, args.resource)
+        mix = parse_mix(args.mix)
+    except (OSError, ValueError) as e:
+        logger.error(f"[LOAD TEST EXCEPTION]: '{str(e)}'")
+        return 2
+
+    report = LoadTest(args.url, events, args.concurrency, args.rate,
+                      args.duration, args.requests, mix, args.timeout,
+                      args.seed).run()
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Writes the filters of every enabled rule from the database to Redis.
+
+Usage:
+    python -m rules_system.commands.rebuild_rule_cache [--chunk-size 1000] [--prune]
+"""
+import time
+import argparse
+from sqlalchemy import select, func
+from rules_system.logger import logger
+from rules_system.config.database import Session
+from rules_system.models import Rule
+from rules_system.helpers.rule_engine import RuleEngine
+
+
+def rebuild(chunk_size:int = 1000, prune:bool = False, 
+            redis_instance = None) -> dict:
+    """Streams the enabled rules with a server-side cursor and writes their
+    filters to Redis.
+
+    Args:
+        chunk_size (int): Rules fetched and written per round trip.
+        prune (bool): Removes the cached rules that aren't enabled anymore.
+        redis_instance (any): Pre initiated redis instance (optional)
+
+    Returns:
+        dict: Number of rules 'written', 'failed' and 'pruned'.
+    """
+    enabled = Rule.enabled.is_(True)
+    started_at = time.monotonic()
+    with Session() as session:
+        total = session.execute(
+            select(func.count()).select_from(Rule).where(enabled)
+        ).scalar()
+
+        def report(processed:int) -> None:
+            elapsed = max(time.monotonic() - started_at, 1e-6)
+            logger.info(f"[RULE CACHE]: '{processed}/{total} rules "
+                        f"({processed / elapsed:.0f} rules/s)'")
+
+        rows = session.execute(
+            select(Rule.id, Rule.entity, Rule.filters)
+            .where(enabled)
+            .execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        return RuleEngine.rebuild_rule_cache(rows, redis_instance,
+                                             chunk_size=chunk_size,
+                                             prune=prune,
+                                             progress=report)
+
+
+def main(argv:list = None) -> int:
+    """Runs the rule cache rebuild.
+
+    Args:
+        argv (list): Command line arguments (optional).
+
+    Returns:
+        int: Exit code.
+    """
+    parser = argparse.ArgumentParser(
+        description="Write the filters of every enabled rule to Redis."
+    )
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="Rules fetched and written per round trip.")
+    parser.add_argument('--prune', action='store_true',
+                        help="Remove cached rules that aren't enabled anymore.")
+    args = parser.parse_args(argv)
+
+    result = rebuild(args.chunk_size, args.prune)
+    logger.info(f"[RULE CACHE]: '{result['written']} rules written, "
+                f"{result['failed']} failed, {result['pruned']} pruned'")
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
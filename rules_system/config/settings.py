@@ -0,0 +1,108 @@
+import os
+
+# Maximum number of compiled rule filters kept in memory by each process.
+FILTER_CACHE_SIZE = int(os.getenv('RULES_FILTER_CACHE_SIZE', '10000'))
+
+# Maximum number of items accepted by the bulk ingestion endpoints.
+BULK_MAX_ITEMS = int(os.getenv('RULES_BULK_MAX_ITEMS', '10000'))
+
+# Backend of the rule action queue: 'redis' (consumed by the action worker)
+# or 'memory' (executed by a local thread pool of the API process).
+ACTION_QUEUE_BACKEND = os.getenv('RULES_ACTION_QUEUE', 'redis')
+
+# Redis list holding the pending rule action jobs.
+ACTION_QUEUE_KEY = os.getenv('RULES_ACTION_QUEUE_KEY', 'rule_action_queue')
+
+# Number of jobs executed concurrently by each action worker.
+ACTION_WORKERS = int(os.getenv('RULES_ACTION_WORKERS', '8'))
+
+# Port the action worker serves its Prometheus metrics on (0 disables it).
+WORKER_METRICS_PORT = int(os.getenv('RULES_WORKER_METRICS_PORT', '0'))
+
+# Number of hosts whose connection pools are kept by the webhook client.
+WEBHOOK_POOL_CONNECTIONS = int(os.getenv('RULES_WEBHOOK_POOL_CONNECTIONS', '50'))
+
+# Maximum number of connections kept open to each webhook host.
+WEBHOOK_POOL_MAXSIZE = int(os.getenv('RULES_WEBHOOK_POOL_MAXSIZE', '10'))
+
+# Whether requests wait for a free connection instead of opening connections
+# above WEBHOOK_POOL_MAXSIZE.
+WEBHOOK_POOL_BLOCK = os.getenv('RULES_WEBHOOK_POOL_BLOCK', 'true').lower() == 'true'
+
+# Seconds to wait for a webhook connection and for its response.
+WEBHOOK_CONNECT_TIMEOUT = float(os.getenv('RULES_WEBHOOK_CONNECT_TIMEOUT', '3.05'))
+WEBHOOK_READ_TIMEOUT = float(os.getenv('RULES_WEBHOOK_READ_TIMEOUT', '15'))
+
+# Maximum number of actions executed concurrently by the process, across all
+# events, and by the actions of a single event.
+ACTION_FANOUT_WORKERS = int(os.getenv('RULES_ACTION_FANOUT_WORKERS', '32'))
+ACTION_FANOUT_PER_EVENT = int(os.getenv('RULES_ACTION_FANOUT_PER_EVENT', '8'))
+
+# Seconds a rule's resolved actions are kept in memory. Writes through the API
+# invalidate them right away in the process that handled the request.
+ACTION_CACHE_TTL = float(os.getenv('RULES_ACTION_CACHE_TTL', '60'))
+
+# When true, an action referenced by several rules triggered by the same event
+# runs only once for that event.
+ACTION_DEDUPE = os.getenv('RULES_ACTION_DEDUPE', 'false').lower() == 'true'
+
+# Worker processes executing fulfillment scripts, and the wall clock and CPU
+# seconds each script execution may take.
+FULFILLMENT_WORKERS = int(os.getenv('RULES_FULFILLMENT_WORKERS', str(os.cpu_count() or 1)))
+FULFILLMENT_TIMEOUT = float(os.getenv('RULES_FULFILLMENT_TIMEOUT', '5'))
+FULFILLMENT_CPU_LIMIT = int(os.getenv('RULES_FULFILLMENT_CPU_LIMIT', '2'))
+
+# Maximum number of compiled fulfillment scripts kept by each worker process.
+FULFILLMENT_CACHE_SIZE = int(os.getenv('RULES_FULFILLMENT_CACHE_SIZE', '1024'))
+
+# SMTP server used by email actions. Without a host, emails are only logged.
+SMTP_HOST = os.getenv('RULES_SMTP_HOST', '')
+SMTP_PORT = int(os.getenv('RULES_SMTP_PORT', '25'))
+SMTP_USER = os.getenv('RULES_SMTP_USER', '')
+SMTP_PASSWORD = os.getenv('RULES_SMTP_PASSWORD', '')
+SMTP_STARTTLS = os.getenv('RULES_SMTP_STARTTLS', 'false').lower() == 'true'
+SMTP_SENDER = os.getenv('RULES_SMTP_SENDER', 'rules-system@localhost')
+
+# Number of SMTP connections kept open by the email dispatcher.
+SMTP_POOL_SIZE = int(os.getenv('RULES_SMTP_POOL_SIZE', '2'))
+
+# Seconds emails to the same recipient are held to be sent together, and the
+# maximum number of emails held per recipient.
+EMAIL_BATCH_WINDOW = float(os.getenv('RULES_EMAIL_BATCH_WINDOW', '2'))
+EMAIL_BATCH_MAX = int(os.getenv('RULES_EMAIL_BATCH_MAX', '100'))
+
+# When true, the emails held for a recipient are sent as a single digest.
+EMAIL_DIGEST = os.getenv('RULES_EMAIL_DIGEST', 'false').lower() == 'true'
+
+# How processes learn about rule changes: 'poll' checks the Redis version stamp
+# on every event, 'pubsub' listens to invalidation messages and only checks the
+# stamp every CACHE_RESYNC_INTERVAL seconds or after a missed message.
+CACHE_INVALIDATION = os.getenv('RULES_CACHE_INVALIDATION', 'poll')
+CACHE_RESYNC_INTERVAL = float(os.getenv('RULES_CACHE_RESYNC_INTERVAL', '30'))
+
+# Redis pub/sub channel of the rule invalidation messages.
+INVALIDATION_CHANNEL = os.getenv('RULES_INVALIDATION_CHANNEL', 'rule_invalidation')
+
+# Whether rule filters cached as pickles, before the binary filter format,
+# are still loaded. Disable it once `make rule-cache` rewrote every filter.
+FILTER_READ_LEGACY = os.getenv('RULES_FILTER_READ_LEGACY', 'true').lower() == 'true'
+
+# One in PREDICATE_STATS_SAMPLE rule evaluations records how often each
+# predicate passes and how long it takes (0 disables it). Every
+# PREDICATE_REORDER_INTERVAL seconds, the predicates with at least
+# PREDICATE_REORDER_MIN_SAMPLES samples are reordered so the ones most likely
+# to reject an event cheaply run first.
+PREDICATE_STATS_SAMPLE = int(os.getenv('RULES_PREDICATE_STATS_SAMPLE', '100'))
+PREDICATE_REORDER_INTERVAL = float(os.getenv('RULES_PREDICATE_REORDER_INTERVAL', '60'))
+PREDICATE_REORDER_MIN_SAMPLES = int(os.getenv('RULES_PREDICATE_REORDER_MIN_SAMPLES', '100'))
+
+# Seconds between flushes of the per rule metrics of each process to Redis.
+METRICS_FLUSH_INTERVAL = float(os.getenv('RULES_METRICS_FLUSH_INTERVAL', '10'))
+
+# When true, the API returns the time spent in the database, Redis, filter
+# evaluation and actions of each request in a `Server-Timing` header.
+TRACE_HEADER = os.getenv('RULES_TRACE_HEADER', 'false').lower() == 'true'
+
+# Requests and action jobs slower than SLOW_TRACE_THRESHOLD milliseconds are
+# logged with their span tree (0 disables it).
+SLOW_TRACE_THRESHOLD = float(os.getenv('RULES_SLOW_TRACE_THRESHOLD', '1000'))
@@ -27,6 +27,7 @@ class BaseController:
     Methods:
         - get(_id: str): Placeholder method for handling GET requests.
         - post(): Placeholder method for handling POST requests.
+        - bulk(): Placeholder method for handling bulk POST requests.
         - put(_id: str): Placeholder method for handling PUT requests.
         - delete(_id: str): Placeholder method for handling DELETE requests.
     """
@@ -60,6 +61,15 @@ class BaseController:
         """
         raise MethodNotImplementedException('POST')
     
+    def bulk(self):
+        """Placeholder method for handling bulk POST requests.
+
+        Raises:
+            MethodNotImplementedException: Indicates that the method should be implemented
+                                           in the derived controller.
+        """
+        raise MethodNotImplementedException('POST')
+    
     def put(self, _id:str):
         """Placeholder method for handling PUT requests.
 
@@ -2,7 +2,9 @@ import uuid
 from .base_controller import BaseController
 from rules_system.config.database import Session
 from rules_system.models import Payment
+from rules_system.exceptions import InvalidBulkBodyException
 from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.helpers.bulk import parse_bulk_body, bulk_create
 
 
 class PaymentController(BaseController):
@@ -11,6 +13,7 @@ class PaymentController(BaseController):
     Methods:
         - get(_id: str): Retrieves the details of a payment by its ID.
         - post(): Creates a new payment with the provided data.
+        - bulk(): Creates a batch of payments with the provided data.
         - put(_id: str): Updates an existing payment with the provided data.
         - delete(_id: str): Deletes an payment by its ID.
     """
@@ -54,6 +57,20 @@ class PaymentController(BaseController):
             return e.args[0], 400
     
     
+    def bulk(self):
+        """Creates a batch of payments from a JSON array or NDJSON body.
+
+        Returns:
+            dict or tuple: The id or error of each payment, or an error message
+                          with a corresponding HTTP status code.
+        """
+        try:
+            items = parse_bulk_body(self.request)
+        except InvalidBulkBodyException as e:
+            return e.args[0], 400
+        return bulk_create(Payment, 'payment', items), 201
+    
+    
     def put(self, _id:str):
         """Updates an existing payment with the provided data.
 
@@ -53,6 +53,7 @@ class RuleActionController(BaseController):
                 )
             )
             rule_action.save()
+            RuleEngine.invalidate_actions_cache(action_id=rule_action.id)
             return rule_action.jsonable(), 201
         except InvalidActionTypeException as e:
             return e.args[0], 400
@@ -80,6 +81,7 @@ class RuleActionController(BaseController):
                     rule_action_data.get('action')
                 )
                 rule_action.save(session)
+                RuleEngine.invalidate_actions_cache(action_id=rule_action.id)
                 return rule_action.jsonable()
             except InvalidActionTypeException as e:
                 return e.args[0], 400
@@ -102,6 +104,7 @@ class RuleActionController(BaseController):
             session.delete(rule_action)
             session.commit()
             session.close()
+            RuleEngine.invalidate_actions_cache(action_id=rule_action.id)
             return {'message': 'Deleted succesfully'}
         session.close()
         return f"Rule action with id '{_id}' not found.", 404
\ No newline at end of file
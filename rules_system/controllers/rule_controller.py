@@ -14,6 +14,7 @@ class RuleController(BaseController):
         - post(): Creates a new rule with the provided data.
         - put(_id: str): Updates an existing rule with the provided data.
         - delete(_id: str): Deletes an rule by its ID.
+        - stats(_id: str): Retrieves the metrics of a rule by its ID.
     """
     
     def get(self, _id:str):
@@ -55,6 +56,7 @@ class RuleController(BaseController):
             )
             rule.save()
             RuleEngine.set_function_cache(rule)
+            RuleEngine.invalidate_actions_cache(rule_id=rule.id)
             return rule.jsonable(), 201
         except InvalidFilterException as e:
             return e.args[0], 400
@@ -84,6 +86,7 @@ class RuleController(BaseController):
                 rule.filters=filters
                 rule.save()
                 RuleEngine.set_function_cache(rule)
+                RuleEngine.invalidate_actions_cache(rule_id=rule.id)
                 return rule.jsonable()
             except InvalidFilterException as e:
                 return e.args[0], 400
@@ -107,6 +110,33 @@ class RuleController(BaseController):
             session.commit()
             session.close()
             RuleEngine.delete_function_cache(rule)
+            RuleEngine.invalidate_actions_cache(rule_id=rule.id)
             return {'message': 'Deleted succesfully'}
         session.close()
-        return f"Rule with id '{_id}' not found.", 404
\ No newline at end of file
+        return f"Rule with id '{_id}' not found.", 404
+    
+    
+    def stats(self, _id:str):
+        """Retrieves the metrics of a rule by its ID: match rate, evaluation
+        and action latencies, and the stats of its predicates in this process.
+
+        Args:
+            _id (str): Identifier for the rule.
+
+        Returns:
+            dict or tuple: JSON-serializable rule metrics or an error message
+                          with a corresponding HTTP status code.
+        """
+        session = Session()
+        rule = session.query(Rule).get(_id)
+        session.close()
+        if rule:
+            metrics = RuleEngine.get_rule_metrics(rule)
+            predicates = RuleEngine.get_rule_stats(rule)
+            return {
+                'id': rule.id,
+                'entity': rule.entity,
+                **metrics,
+                'predicates': predicates.get('predicates') if predicates else []
+            }
+        return f"Rule with id '{_id}' not found.", 404
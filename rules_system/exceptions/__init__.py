@@ -1,6 +1,10 @@
 from .method_not_implemented_exception import MethodNotImplementedException
 from .invalid_action_type_exception import InvalidActionTypeException
+from .invalid_bulk_body_exception import InvalidBulkBodyException
+from .fulfillment_timeout_exception import FulfillmentTimeoutException
 from .invalid_filter_exception import (InvalidFilterException,
                                        InvalidFilterOperationException,
                                        RuleFilterOperationMissingFieldException,
-                                       MissingRuleKeyException)
\ No newline at end of file
+                                       MissingRuleKeyException,
+                                       InvalidRuleKeyException,
+                                       InvalidFilterFormatException)
\ No newline at end of file
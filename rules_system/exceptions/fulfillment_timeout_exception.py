@@ -0,0 +1,9 @@
+class FulfillmentTimeoutException(Exception):
+    """Exception class raised when a fulfillment script exceeds its time or
+    CPU budget
+    """
+
+    def __init__(self, message = None) -> None:
+        self.message = message if message else \
+            "Fulfillment script exceeded its time budget"
+        super().__init__(self.message)
@@ -0,0 +1,8 @@
+class InvalidBulkBodyException(Exception):
+    """Exception class raised when a bulk request body can't be parsed
+    """
+
+    def __init__(self, message = None) -> None:
+        self.message = message if message else \
+            "Bulk body must be a JSON array or NDJSON (one JSON object per line)"
+        super().__init__(self.message)
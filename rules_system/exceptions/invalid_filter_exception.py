@@ -31,4 +31,20 @@ class MissingRuleKeyException(InvalidFilterException):
         message = f"Rule filter must have a 'key' field."
         self.message = message
         super().__init__(self.message)
-        
\ No newline at end of file
+                
+
+class InvalidRuleKeyException(InvalidFilterException):
+    """Exception class raised for rule filters whose 'key' is not a valid path
+    """
+    def __init__(self, key, reason):
+        message = f"Rule filter key '{key}' is not a valid path: {reason}."
+        self.message = message
+        super().__init__(self.message)
+                
+
+class InvalidFilterFormatException(InvalidFilterException):
+    """Exception class raised when a cached rule filter can't be decoded
+    """
+    def __init__(self, message = None):
+        self.message = message if message else "Cached rule filter format is not supported."
+        super().__init__(self.message)
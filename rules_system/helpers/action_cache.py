@@ -0,0 +1,132 @@
+import time
+import threading
+from typing import Dict, Iterable, List
+from rules_system.config.database import Session
+from rules_system.helpers.tracing import span
+from rules_system.models import (RuleAction, Rule)
+
+
+class ActionCache:
+    """Process-local read-through cache of the actions of each rule.
+
+    Rules are cached as the list of their action IDs and actions as detached
+    `RuleAction` objects, so updating an action doesn't require touching the
+    rules using it. Everything missing or expired in a lookup is loaded with
+    one IN query per table, whatever the number of rules.
+
+    Args:
+        ttl (float): Seconds an entry is kept before being loaded again.
+    """
+
+    def __init__(self, ttl:float) -> None:
+        self.ttl = ttl
+        self.__rules = {}
+        self.__actions = {}
+        self.__lock = threading.Lock()
+
+
+    def get_rules_actions(self, rules_ids:Iterable[str]) -> Dict[str, List[RuleAction]]:
+        """Resolves the actions of a list of rules.
+
+        Args:
+            rules_ids (Iterable[str]): ID of the rules.
+
+        Returns:
+            Dict[str, List[RuleAction]]: Existing actions of each found rule,
+                                         in the order of the rule.
+        """
+        rules_ids = set(rules_ids)
+        if not rules_ids:
+            return {}
+        rules = self.__lookup(self.__rules, rules_ids, self.__load_rules)
+        actions = self.get_actions({action_id for actions_ids in rules.values()
+                                    for action_id in actions_ids})
+        return {
+            rule_id: [actions[action_id] for action_id in actions_ids 
+                      if action_id in actions]
+            for rule_id, actions_ids in rules.items()
+        }
+
+
+    def get_actions(self, actions_ids:Iterable[str]) -> Dict[str, RuleAction]:
+        """Resolves a list of actions.
+
+        Args:
+            actions_ids (Iterable[str]): ID of the actions.
+
+        Returns:
+            Dict[str, RuleAction]: Found actions by ID.
+        """
+        actions_ids = set(actions_ids)
+        if not actions_ids:
+            return {}
+        return self.__lookup(self.__actions, actions_ids, self.__load_actions)
+
+
+    def invalidate_rule(self, rule_id:str) -> None:
+        """Drops the cached actions list of a rule.
+
+        Args:
+            rule_id (str): ID of the rule.
+        """
+        with self.__lock:
+            self.__rules.pop(rule_id, None)
+
+
+    def invalidate_action(self, action_id:str) -> None:
+        """Drops a cached action.
+
+        Args:
+            action_id (str): ID of the action.
+        """
+        with self.__lock:
+            self.__actions.pop(action_id, None)
+
+
+    def clear(self) -> None:
+        """Drops every cached rule and action."""
+        with self.__lock:
+            self.__rules.clear()
+            self.__actions.clear()
+
+
+    def __lookup(self, entries:dict, ids:set, loader) -> dict:
+        now = time.monotonic()
+        found, missing = {}, set()
+        with self.__lock:
+            for _id in ids:
+                entry = entries.get(_id)
+                if entry is None or entry[0] < now:
+                    missing.add(_id)
+                elif entry[1] is not None:
+                    found[_id] = entry[1]
+
+        if missing:
+            loaded = loader(missing)
+            expires_at = time.monotonic() + self.ttl
+            with self.__lock:
+                for _id in missing:
+                    # Missing IDs are cached too, so a rule pointing to a 
+                    # deleted action doesn't query the database every time.
+                    entries[_id] = (expires_at, loaded.get(_id))
+            found.update({_id: value for _id, value in loaded.items()
+                          if _id in missing})
+        return found
+
+
+    @staticmethod
+    def __load_rules(rules_ids:set) -> Dict[str, tuple]:
+        with span('db.load_rules_actions'), Session() as session:
+            rows = session.query(Rule.id, Rule.actions).filter(
+                Rule.id.in_(rules_ids)
+            ).all()
+        return {rule_id: tuple(actions or ()) for rule_id, actions in rows}
+
+
+    @staticmethod
+    def __load_actions(actions_ids:set) -> Dict[str, RuleAction]:
+        with span('db.load_actions'), Session() as session:
+            rule_actions = session.query(RuleAction).filter(
+                RuleAction.id.in_(actions_ids)
+            ).all()
+        return {rule_action.id: rule_action for rule_action in rule_actions}
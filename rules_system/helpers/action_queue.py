@@ -0,0 +1,106 @@
+import json
+import threading
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from redis.exceptions import ConnectionError, TimeoutError
+from rules_system.logger import logger
+from rules_system.config.redis import get_redis_instance
+from rules_system.config.settings import (ACTION_QUEUE_BACKEND,
+                                          ACTION_QUEUE_KEY,
+                                          ACTION_WORKERS)
+
+
+class ActionQueue:
+    """Queue of rule action jobs, executed outside of the API requests.
+
+    A job holds an event and the (rule_id, action_id) pairs it triggered.
+    With the 'redis' backend, jobs are pushed to a Redis list consumed by the
+    action worker (`python -m rules_system.commands.action_worker`). With the
+    'memory' backend, or when Redis can't be reached, jobs are executed by a
+    local pool of threads of the current process instead.
+
+    Args:
+        handler (Callable): Function executing a job in the local pool.
+        backend (str): 'redis' or 'memory'.
+        key (str): Redis list holding the jobs.
+        workers (int): Size of the local pool.
+    """
+
+    def __init__(self, handler:Callable, backend:str = ACTION_QUEUE_BACKEND,
+                 key:str = ACTION_QUEUE_KEY, workers:int = ACTION_WORKERS) -> None:
+        self.handler = handler
+        self.backend = backend
+        self.key = key
+        self.workers = workers
+        self.__pool = None
+        self.__lock = threading.Lock()
+
+
+    def enqueue(self, jobs:list, redis_instance = None) -> None:
+        """Enqueues a list of jobs.
+
+        Args:
+            jobs (list): Jobs to be executed.
+            redis_instance (any): Pre initiated redis instance (optional)
+        """
+        if not jobs:
+            return
+        if self.backend == 'redis':
+            try:
+                redis = redis_instance or get_redis_instance()
+                redis.lpush(self.key, *[json.dumps(job) for job in jobs])
+                return
+            except (ConnectionError, TimeoutError) as e:
+                logger.error(f"[ACTION QUEUE EXCEPTION]: 'Executing jobs locally: {str(e)}'")
+        for job in jobs:
+            self.__get_pool().submit(self.__execute, job)
+
+
+    def dequeue(self, timeout:int = 5, redis_instance = None) -> Optional[dict]:
+        """Waits for the next job of the Redis backend.
+
+        Args:
+            timeout (int): Seconds to wait for a job.
+            redis_instance (any): Pre initiated redis instance (optional)
+
+        Returns:
+            dict: Next job or None if the timeout expired.
+        """
+        redis = redis_instance or get_redis_instance()
+        item = redis.brpop(self.key, timeout=timeout)
+        if item is None:
+            return None
+        return json.loads(item[1])
+
+
+    def depth(self, redis_instance = None) -> int:
+        """Returns the number of jobs waiting to be executed.
+
+        Args:
+            redis_instance (any): Pre initiated redis instance (optional)
+
+        Returns:
+            int: Pending jobs in Redis and in the local pool.
+        """
+        pending = self.__pool._work_queue.qsize() if self.__pool else 0
+        if self.backend == 'redis':
+            redis = redis_instance or get_redis_instance()
+            pending += redis.llen(self.key)
+        return pending
+
+
+    def __execute(self, job:dict) -> None:
+        try:
+            self.handler(job)
+        except Exception as e:
+            logger.error(f"[ACTION QUEUE EXCEPTION]: '{str(e)}'")
+
+
+    def __get_pool(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='rule-action'
+                )
+            return self.__pool
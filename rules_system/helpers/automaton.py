@@ -0,0 +1,132 @@
+from collections import deque
+
+
+class Automaton:
+    """Aho-Corasick automaton over a changing set of needles.
+
+    Needles are reference counted, so the same needle can be added by
+    several rules and is only dropped when the last one removes it. Adding
+    or removing a needle only updates the trie; the failure links are
+    rebuilt on the next scan.
+    """
+
+    def __init__(self) -> None:
+        self.__needles = {}
+        self.__reset()
+
+
+    def add(self, needle:str) -> None:
+        """Adds a needle to the automaton.
+
+        Args:
+            needle (str): Substring to be searched.
+        """
+        self.__needles[needle] = self.__needles.get(needle, 0) + 1
+        if self.__needles[needle] > 1:
+            return
+        node = 0
+        for char in needle:
+            child = self.__goto[node].get(char)
+            if child is None:
+                child = len(self.__goto)
+                self.__goto[node][char] = child
+                self.__goto.append({})
+                self.__own.append(set())
+            node = child
+        self.__own[node].add(needle)
+        self.__dirty = True
+
+
+    def remove(self, needle:str) -> None:
+        """Removes one reference to a needle from the automaton.
+
+        Args:
+            needle (str): Substring previously added.
+        """
+        count = self.__needles.get(needle, 0)
+        if count > 1:
+            self.__needles[needle] = count - 1
+            return
+        if not count:
+            return
+        del self.__needles[needle]
+        node = 0
+        for char in needle:
+            node = self.__goto[node][char]
+        self.__own[node].discard(needle)
+        self.__dirty = True
+        if len(self.__goto) > 2 * (sum(map(len, self.__needles)) + 1):
+            self.__compact()
+
+
+    def scan(self, text:str) -> frozenset:
+        """Scans a text once and returns the needles found in it.
+
+        Args:
+            text (str): Text to be scanned.
+
+        Returns:
+            frozenset: Needles occurring in the text.
+        """
+        if self.__dirty:
+            self.__build()
+        goto, fail, output = self.__goto, self.__fail, self.__output
+        found = set(output[0])
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return frozenset(found)
+
+
+    def __contains__(self, needle:str) -> bool:
+        return needle in self.__needles
+
+
+    def __len__(self) -> int:
+        return len(self.__needles)
+
+
+    def __reset(self) -> None:
+        self.__goto = [{}]
+        self.__own = [set()]
+        self.__fail = [0]
+        self.__output = [frozenset()]
+        self.__dirty = True
+
+
+    def __compact(self) -> None:
+        """Rebuilds the trie without the nodes left by removed needles."""
+        needles = self.__needles
+        self.__needles = {}
+        self.__reset()
+        for needle, count in needles.items():
+            self.add(needle)
+            self.__needles[needle] = count
+
+
+    def __build(self) -> None:
+        """Builds the failure links and the output of every node."""
+        goto, own = self.__goto, self.__own
+        fail = [0] * len(goto)
+        output = [frozenset()] * len(goto)
+        output[0] = frozenset(own[0])
+        queue = deque()
+        for child in goto[0].values():
+            output[child] = frozenset(own[child] | output[0])
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                output[child] = frozenset(own[child] | output[fail[child]])
+                queue.append(child)
+        self.__fail = fail
+        self.__output = output
+        self.__dirty = False
@@ -0,0 +1,92 @@
+import json
+import uuid
+from rules_system.logger import logger
+from rules_system.config.settings import BULK_MAX_ITEMS
+from rules_system.exceptions import InvalidBulkBodyException
+from rules_system.helpers.rule_engine import RuleEngine
+
+NDJSON_CONTENT_TYPES = ['application/x-ndjson', 'application/ndjson']
+
+
+def parse_bulk_body(request) -> list:
+    """Parses the body of a bulk request.
+
+    The body can be a JSON array or NDJSON, in which case a line that is not
+    valid JSON becomes an `InvalidBulkBodyException` in the returned list
+    instead of failing the whole request.
+
+    Args:
+        request (Request): Chalice request.
+
+    Returns:
+        list: Parsed items or the exception of each unparseable line.
+
+    Raises:
+        InvalidBulkBodyException: If the body can't be parsed at all.
+    """
+    body = (request.raw_body or b'').decode('utf-8')
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(InvalidBulkBodyException("Invalid JSON line"))
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise InvalidBulkBodyException()
+        if type(items) != list:
+            raise InvalidBulkBodyException()
+
+    if len(items) > BULK_MAX_ITEMS:
+        raise InvalidBulkBodyException(
+            f"Bulk body must have at most {BULK_MAX_ITEMS} items")
+    return items
+
+
+def bulk_create(model, entity:str, items:list) -> dict:
+    """Creates a batch of events and processes their rules once.
+
+    Args:
+        model (BaseModel): Model of the events (Order, Payment...).
+        entity (str): Entity associated with the events.
+        items (list): Items returned by `parse_bulk_body`.
+
+    Returns:
+        dict: The id or error of each item, in the order they were sent.
+    """
+    results = []
+    events = []
+    for item in items:
+        if isinstance(item, Exception):
+            results.append({'id': None, 'error': item.args[0]})
+        elif type(item) != dict:
+            results.append({'id': None, 'error': "Item must be a JSON object"})
+        else:
+            event = model(id=str(uuid.uuid4()), data=item)
+            results.append({'id': event.id, 'error': None})
+            events.append((len(results) - 1, event))
+
+    errors = model.save_all([event for _, event in events])
+    saved = []
+    for (index, event), error in zip(events, errors):
+        if error is None:
+            saved.append(event)
+        else:
+            results[index] = {'id': None, 'error': str(error.args[0])}
+
+    try:
+        RuleEngine.process_events(saved, entity)
+    except Exception as e:
+        logger.error(f"[BULK RULES EXCEPTION]: '{str(e)}'")
+
+    return {
+        'items': results,
+        'created': len(saved),
+        'failed': len(results) - len(saved)
+    }
@@ -0,0 +1,256 @@
+import time
+import queue
+import smtplib
+import threading
+from email.message import EmailMessage
+from typing import List, Optional
+from rules_system.logger import logger
+from rules_system.config.settings import (SMTP_HOST, SMTP_PORT, SMTP_USER,
+                                          SMTP_PASSWORD, SMTP_STARTTLS,
+                                          SMTP_SENDER, SMTP_POOL_SIZE,
+                                          EMAIL_BATCH_WINDOW, EMAIL_BATCH_MAX,
+                                          EMAIL_DIGEST)
+
+
+class SmtpPool:
+    """Pool of persistent SMTP connections.
+
+    Connections are opened on demand, kept open between batches and opened
+    again when the server drops them.
+
+    Args:
+        host (str): SMTP server host.
+        port (int): SMTP server port.
+        user (str): Login user (optional)
+        password (str): Login password (optional)
+        starttls (bool): Upgrade the connections with STARTTLS.
+        size (int): Maximum number of open connections.
+        timeout (float): Socket timeout of the connections.
+    """
+
+    def __init__(self, host:str = SMTP_HOST, port:int = SMTP_PORT,
+                 user:str = SMTP_USER, password:str = SMTP_PASSWORD,
+                 starttls:bool = SMTP_STARTTLS, size:int = SMTP_POOL_SIZE,
+                 timeout:float = 10) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections_opened = 0
+        self.__idle = queue.LifoQueue()
+        self.__slots = threading.BoundedSemaphore(max(size, 1))
+        self.__lock = threading.Lock()
+
+
+    def send(self, messages:List[EmailMessage]) -> None:
+        """Sends a list of messages through one pooled connection.
+
+        Args:
+            messages (List[EmailMessage]): Messages to be sent.
+        """
+        with self.__slots:
+            connection = self.__acquire()
+            try:
+                for message in messages:
+                    try:
+                        connection.send_message(message)
+                    except (smtplib.SMTPServerDisconnected, ConnectionError):
+                        self.__discard(connection)
+                        connection = self.__connect()
+                        connection.send_message(message)
+            except Exception:
+                self.__discard(connection)
+                raise
+            self.__idle.put(connection)
+
+
+    def close(self) -> None:
+        """Closes the idle connections."""
+        while True:
+            try:
+                self.__discard(self.__idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+    def __acquire(self) -> smtplib.SMTP:
+        try:
+            return self.__idle.get_nowait()
+        except queue.Empty:
+            return self.__connect()
+
+
+    def __connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            connection.starttls()
+        if self.user:
+            connection.login(self.user, self.password)
+        with self.__lock:
+            self.connections_opened += 1
+        return connection
+
+
+    @staticmethod
+    def __discard(connection:smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except Exception:
+            connection.close()
+
+
+class EmailDispatcher:
+    """Batches emails per recipient and sends them through an `SmtpPool`.
+
+    Emails submitted to a recipient are held for `window` seconds, or until
+    `max_batch` of them are waiting, and then sent together on one
+    connection. In digest mode, the emails held for a recipient are merged
+    into a single message.
+
+    Args:
+        pool (SmtpPool): SMTP connections used to send the emails.
+        sender (str): Sender address of the emails.
+        window (float): Seconds emails are held per recipient.
+        max_batch (int): Maximum number of emails held per recipient.
+        digest (bool): Send the held emails as a single digest message.
+    """
+
+    def __init__(self, pool:SmtpPool, sender:str = SMTP_SENDER,
+                 window:float = EMAIL_BATCH_WINDOW,
+                 max_batch:int = EMAIL_BATCH_MAX,
+                 digest:bool = EMAIL_DIGEST) -> None:
+        self.pool = pool
+        self.sender = sender
+        self.window = window
+        self.max_batch = max(max_batch, 1)
+        self.digest = digest
+        self.__pending = {}
+        self.__condition = threading.Condition()
+        self.__flusher = None
+        self.__closed = False
+
+
+    def submit(self, recipient:str, subject:str, body:str) -> None:
+        """Holds an email to be sent in the next batch of its recipient.
+
+        Args:
+            recipient (str): Recipient address.
+            subject (str): Subject of the email.
+            body (str): Body of the email.
+        """
+        with self.__condition:
+            _, emails = self.__pending.setdefault(
+                recipient, (time.monotonic(), [])
+            )
+            emails.append((subject, body))
+            if self.__flusher is None:
+                self.__flusher = threading.Thread(target=self.__run,
+                                                  name='email-dispatcher',
+                                                  daemon=True)
+                self.__flusher.start()
+            self.__condition.notify()
+
+
+    def flush(self, recipient:Optional[str] = None) -> None:
+        """Sends the held emails right away.
+
+        Args:
+            recipient (str): Only flush this recipient (optional)
+        """
+        with self.__condition:
+            if recipient is None:
+                batches = list(self.__pending.items())
+                self.__pending.clear()
+            elif recipient in self.__pending:
+                batches = [(recipient, self.__pending.pop(recipient))]
+            else:
+                batches = []
+        for recipient, (_, emails) in batches:
+            self.__send(recipient, emails)
+
+
+    def close(self) -> None:
+        """Sends the held emails and stops the dispatcher."""
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify()
+        if self.__flusher is not None:
+            self.__flusher.join()
+        self.flush()
+        self.pool.close()
+
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                if self.__closed:
+                    return
+                now = time.monotonic()
+                due = [recipient for recipient, (started_at, emails) 
+                       in self.__pending.items()
+                       if now - started_at >= self.window or 
+                          len(emails) >= self.max_batch]
+                if not due:
+                    waits = [started_at + self.window - now 
+                             for started_at, _ in self.__pending.values()]
+                    self.__condition.wait(min(waits) if waits else None)
+                    continue
+                batches = [(recipient, self.__pending.pop(recipient)) 
+                           for recipient in due]
+            for recipient, (_, emails) in batches:
+                self.__send(recipient, emails)
+
+
+    def __send(self, recipient:str, emails:list) -> None:
+        if self.digest and len(emails) > 1:
+            emails = [(
+                f"{len(emails)} rule notifications",
+                "\n\n".join(f"{subject}\n{body}" for subject, body in emails)
+            )]
+        messages = [self.__message(recipient, subject, body) 
+                    for subject, body in emails]
+        try:
+            self.pool.send(messages)
+        except Exception as e:
+            logger.error(f"[EMAIL ACTION EXCEPTION]: 'Sending to {recipient}: {str(e)}'")
+
+
+    def __message(self, recipient:str, subject:str, body:str) -> EmailMessage:
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body)
+        return message
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_email_dispatcher() -> Optional[EmailDispatcher]:
+    """Get the email dispatcher of the process
+
+    Returns:
+        EmailDispatcher: Email dispatcher or None if no SMTP host is set
+    """
+    global _dispatcher
+    if not SMTP_HOST:
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = EmailDispatcher(SmtpPool())
+        return _dispatcher
+
+
+def close_email_dispatcher() -> None:
+    """Sends the held emails and closes the email dispatcher of the process,
+    if it was started. The next `get_email_dispatcher` call starts a new one.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.close()
@@ -0,0 +1,82 @@
+import threading
+import contextvars
+from typing import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from rules_system.config.settings import (ACTION_FANOUT_WORKERS,
+                                          ACTION_FANOUT_PER_EVENT)
+
+
+class FanOut:
+    """Bounded concurrent execution of a function over a list of items.
+
+    All calls of `map` share one pool of threads, whose size is the global
+    cap of concurrent executions. Each call also runs at most `per_call`
+    items at the same time, so one event with many actions can't take the
+    whole pool.
+
+    Args:
+        max_workers (int): Global cap of concurrent executions.
+        per_call (int): Cap of concurrent executions of a single `map` call.
+    """
+
+    def __init__(self, max_workers:int = ACTION_FANOUT_WORKERS,
+                 per_call:int = ACTION_FANOUT_PER_EVENT) -> None:
+        self.max_workers = max(max_workers, 1)
+        self.per_call = max(per_call, 1)
+        self.__pool = None
+        self.__lock = threading.Lock()
+
+
+    def map(self, function:Callable, items:Iterable) -> list:
+        """Calls the function for every item concurrently.
+
+        Args:
+            function (Callable): Function called with each item.
+            items (Iterable): Items to be processed.
+
+        Returns:
+            list: Results in the order of the items. An item whose call raised
+                  an exception has the exception as result.
+        """
+        items = list(items)
+        if len(items) <= 1 or self.per_call == 1:
+            return [self.__call(function, item) for item in items]
+
+        slots = threading.BoundedSemaphore(self.per_call)
+        pool = self.__get_pool()
+        futures = []
+        for item in items:
+            slots.acquire()
+            # Each item runs in a copy of the caller's context, so context
+            # variables such as the current trace span are kept
+            future = pool.submit(contextvars.copy_context().run, 
+                                 self.__call, function, item)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        return [future.result() for future in futures]
+
+
+    def shutdown(self) -> None:
+        """Stops the pool, waiting for the running executions."""
+        with self.__lock:
+            if self.__pool is not None:
+                self.__pool.shutdown(wait=True)
+                self.__pool = None
+
+
+    @staticmethod
+    def __call(function:Callable, item):
+        try:
+            return function(item)
+        except Exception as e:
+            return e
+
+
+    def __get_pool(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if self.__pool is None:
+                self.__pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='rule-fanout'
+                )
+            return self.__pool
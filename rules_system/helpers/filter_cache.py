@@ -0,0 +1,152 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+
+
+class FilterCache:
+    """Process-local LRU cache of ready-to-call rule filters.
+
+    Filters are stored by rule id and rule version, so a rule is only
+    compiled again when its version changes. On top of that, the ruleset of
+    each entity is kept together with the Redis version stamp it was loaded
+    for, which lets `RuleEngine.process_event` skip reading the
+    rule index while the stamp does not change. Changes to the ruleset of an
+    entity are serialized by its `lock`.
+
+    Args:
+        max_size (int): Maximum number of compiled filters kept in memory.
+    """
+
+    def __init__(self, max_size:int) -> None:
+        self.max_size = max_size
+        self.__filters = OrderedDict()
+        self.__rulesets = {}
+        self.__checked_at = {}
+        self.__entity_locks = {}
+        self.__lock = threading.Lock()
+
+
+    def get(self, rule_id:str, version:str) -> Optional[Callable]:
+        """Returns the compiled filter of a rule version, if cached.
+
+        Args:
+            rule_id (str): ID of the rule.
+            version (str): Version of the rule.
+
+        Returns:
+            Callable: Compiled filter or None.
+        """
+        with self.__lock:
+            exec_filter = self.__filters.get((rule_id, version))
+            if exec_filter is not None:
+                self.__filters.move_to_end((rule_id, version))
+            return exec_filter
+
+
+    def put(self, rule_id:str, version:str, exec_filter:Callable) -> None:
+        """Caches the compiled filter of a rule version, evicting the least
+        recently used filters above `max_size`.
+
+        Args:
+            rule_id (str): ID of the rule.
+            version (str): Version of the rule.
+            exec_filter (Callable): Compiled filter.
+        """
+        with self.__lock:
+            self.__filters[(rule_id, version)] = exec_filter
+            self.__filters.move_to_end((rule_id, version))
+            while len(self.__filters) > self.max_size:
+                self.__filters.popitem(last=False)
+
+
+    def get_ruleset(self, entity:str) -> Tuple[Hashable, any]:
+        """Returns the ruleset of an entity and the stamp it was loaded for.
+
+        Args:
+            entity (str): Entity of the rules.
+
+        Returns:
+            Tuple[Hashable, Ruleset]: Stamp and ruleset, or (None, None).
+        """
+        with self.__lock:
+            return self.__rulesets.get(entity, (None, None))
+
+
+    def set_ruleset(self, entity:str, stamp:Hashable, ruleset:any) -> None:
+        """Stores the ruleset of an entity loaded for `stamp`.
+
+        Args:
+            entity (str): Entity of the rules.
+            stamp (Hashable): Version stamp the rules were loaded for.
+            ruleset (Ruleset): Ruleset of the entity.
+        """
+        with self.__lock:
+            self.__rulesets[entity] = (stamp, ruleset)
+            self.__checked_at[entity] = time.monotonic()
+
+
+    def is_fresh(self, entity:str, max_age:float) -> bool:
+        """Tells if the ruleset of an entity was stored less than `max_age`
+        seconds ago.
+
+        Args:
+            entity (str): Entity of the rules.
+            max_age (float): Maximum age in seconds.
+
+        Returns:
+            bool: True if the ruleset is cached and fresh.
+        """
+        with self.__lock:
+            checked_at = self.__checked_at.get(entity)
+            return checked_at is not None and \
+                time.monotonic() - checked_at < max_age
+
+
+    def lock(self, entity:str) -> threading.RLock:
+        """Returns the lock held while the ruleset of an entity is loaded or
+        updated, so a load can't store a stamp older than an update applied
+        meanwhile.
+
+        Args:
+            entity (str): Entity of the rules.
+
+        Returns:
+            threading.RLock: Lock of the entity.
+        """
+        with self.__lock:
+            lock = self.__entity_locks.get(entity)
+            if lock is None:
+                lock = self.__entity_locks[entity] = threading.RLock()
+            return lock
+
+
+    def drop_ruleset(self, entity:Optional[str] = None) -> None:
+        """Forgets the version stamp of an entity's ruleset, or of every
+        ruleset, so it is checked against Redis on its next load.
+
+        Args:
+            entity (str): Entity of the rules (optional)
+        """
+        with self.__lock:
+            entities = [entity] if entity else list(self.__rulesets)
+        for entity in entities:
+            with self.lock(entity), self.__lock:
+                self.__checked_at.pop(entity, None)
+                stamp, ruleset = self.__rulesets.get(entity, (None, None))
+                if stamp is not None:
+                    # The epoch is kept, so the ruleset is updated 
+                    # incrementally instead of being built again.
+                    self.__rulesets[entity] = ((stamp[0], None), ruleset)
+
+
+    def clear(self) -> None:
+        """Drops every cached filter and ruleset."""
+        with self.__lock:
+            self.__filters.clear()
+            self.__rulesets.clear()
+            self.__checked_at.clear()
+
+
+    def __len__(self) -> int:
+        return len(self.__filters)
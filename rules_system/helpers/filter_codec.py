@@ -0,0 +1,173 @@
+"""Compact binary format of the rule filters cached in Redis.
+
+Layout (big-endian)::
+
+    header     magic b'RF' | format version (B) | engine version (H)
+    entity     length (H) | UTF-8 bytes
+    predicates count (H), then for each predicate:
+               operation code (B) | key length (H) | UTF-8 key |
+               value type (B) | value
+
+Values are stored as None/False/True without payload, int64 (q), float64
+(d), UTF-8 strings (I length) or, for anything else, JSON (I length).
+"""
+import json
+import struct
+from typing import Tuple
+from rules_system.exceptions import InvalidFilterFormatException
+
+MAGIC = b'RF'
+
+# Version of the byte layout, checked on decoding.
+FORMAT_VERSION = 1
+
+# Version of the filter semantics. Bumping it changes every rule version, so
+# every process compiles its filters again.
+ENGINE_VERSION = 1
+
+# Operation codes. Codes are part of the format: only append new operations.
+OPERATION_CODES = ('is', 'is_not', 'is_empty', 'is_not_empty', 'contains',
+                   'does_not_contain', 'starts_with', 'ends_with')
+
+_HEADER = struct.Struct('>2sBH')
+_LENGTH = struct.Struct('>H')
+_OPERATION = struct.Struct('>BH')
+_TYPE = struct.Struct('>B')
+_INT = struct.Struct('>q')
+_FLOAT = struct.Struct('>d')
+_TEXT = struct.Struct('>I')
+
+_NONE, _FALSE, _TRUE, _INTEGER, _REAL, _STRING, _JSON = range(7)
+_INT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def is_encoded(data:bytes) -> bool:
+    """Tells if a cached filter is in this format.
+
+    Args:
+        data (bytes): Cached filter.
+
+    Returns:
+        bool: True for this format, False for legacy pickles.
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def encode(entity:str, filters:list) -> bytes:
+    """Encodes the validated filters of a rule.
+
+    Args:
+        entity (str): Entity associated with the rule.
+        filters (list): Filters returned by `RuleEngine.prepare_filter`.
+
+    Returns:
+        bytes: Encoded filter.
+    """
+    filters = filters or []
+    parts = [_HEADER.pack(MAGIC, FORMAT_VERSION, ENGINE_VERSION),
+             *_pack_text(entity or '', _LENGTH),
+             _LENGTH.pack(len(filters))]
+    for _filter in filters:
+        operation = _filter.get('operation')
+        if operation not in OPERATION_CODES:
+            raise InvalidFilterFormatException(
+                f"Operation '{operation}' has no code in the filter format"
+            )
+        key = str(_filter.get('key')).encode('utf-8')
+        parts.append(_OPERATION.pack(OPERATION_CODES.index(operation), len(key)))
+        parts.append(key)
+        parts.extend(_pack_value(_filter.get('value')))
+    return b''.join(parts)
+
+
+def decode(data:bytes) -> Tuple[str, list]:
+    """Decodes an encoded filter.
+
+    Args:
+        data (bytes): Encoded filter.
+
+    Raises:
+        InvalidFilterFormatException: If the data isn't a supported filter.
+
+    Returns:
+        Tuple[str, list]: Entity and filters of the rule.
+    """
+    try:
+        magic, format_version, _ = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise InvalidFilterFormatException(
+                f"Unsupported filter format version: {format_version}"
+            )
+        offset = _HEADER.size
+        entity, offset = _unpack_text(data, offset, _LENGTH)
+        (count,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        filters = []
+        unpack_operation = _OPERATION.unpack_from
+        for _ in range(count):
+            code, key_length = unpack_operation(data, offset)
+            offset += 3
+            key = data[offset:offset + key_length].decode('utf-8')
+            offset += key_length
+            if data[offset] == _STRING:
+                # Most values are strings, decoded here without extra calls
+                (size,) = _TEXT.unpack_from(data, offset + 1)
+                offset += 5
+                value = data[offset:offset + size].decode('utf-8')
+                offset += size
+            else:
+                value, offset = _unpack_value(data, offset)
+            filters.append({'key': key, 
+                            'operation': OPERATION_CODES[code], 
+                            'value': value})
+        if offset != len(data):
+            raise ValueError("length mismatch")
+        return entity, filters
+    except (struct.error, IndexError, UnicodeDecodeError, ValueError) as e:
+        raise InvalidFilterFormatException(f"Corrupted filter: {str(e)}")
+
+
+def _pack_text(text:str, length:struct.Struct) -> list:
+    encoded = text.encode('utf-8')
+    return [length.pack(len(encoded)), encoded]
+
+
+def _unpack_text(data:bytes, offset:int, length:struct.Struct) -> Tuple[str, int]:
+    (size,) = length.unpack_from(data, offset)
+    offset += length.size
+    if offset + size > len(data):
+        raise ValueError("truncated text")
+    return data[offset:offset + size].decode('utf-8'), offset + size
+
+
+def _pack_value(value) -> list:
+    if value is None:
+        return [_TYPE.pack(_NONE)]
+    if isinstance(value, bool):
+        return [_TYPE.pack(_TRUE if value else _FALSE)]
+    if isinstance(value, int) and _INT_RANGE[0] <= value <= _INT_RANGE[1]:
+        return [_TYPE.pack(_INTEGER), _INT.pack(value)]
+    if isinstance(value, float):
+        return [_TYPE.pack(_REAL), _FLOAT.pack(value)]
+    if isinstance(value, str):
+        return [_TYPE.pack(_STRING), *_pack_text(value, _TEXT)]
+    return [_TYPE.pack(_JSON), *_pack_text(json.dumps(value), _TEXT)]
+
+
+def _unpack_value(data:bytes, offset:int) -> Tuple[any, int]:
+    (value_type,) = _TYPE.unpack_from(data, offset)
+    offset += _TYPE.size
+    if value_type == _NONE:
+        return None, offset
+    if value_type in (_FALSE, _TRUE):
+        return value_type == _TRUE, offset
+    if value_type == _INTEGER:
+        return _INT.unpack_from(data, offset)[0], offset + _INT.size
+    if value_type == _REAL:
+        return _FLOAT.unpack_from(data, offset)[0], offset + _FLOAT.size
+    if value_type == _STRING:
+        return _unpack_text(data, offset, _TEXT)
+    if value_type == _JSON:
+        text, offset = _unpack_text(data, offset, _TEXT)
+        return json.loads(text), offset
+    raise ValueError(f"unknown value type {value_type}")
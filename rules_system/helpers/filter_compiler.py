@@ -0,0 +1,200 @@
+from typing import Callable, List
+from rules_system.helpers.key_path import is_path, compile_path
+
+# Operations that don't compare against a value
+_VALUELESS_OPERATIONS = ('is_empty', 'is_not_empty')
+
+
+def _is(value) -> Callable:
+    expected = str(value)
+    return lambda field: field == expected
+
+
+def _is_not(value) -> Callable:
+    expected = str(value)
+    return lambda field: field != expected
+
+
+def _is_empty(value) -> Callable:
+    return lambda field: not field
+
+
+def _is_not_empty(value) -> Callable:
+    return lambda field: field != ''
+
+
+def _contains(value) -> Callable:
+    needle = str(value)
+    def test(field) -> bool:
+        if isinstance(field, str):
+            return needle in field
+        try:
+            return needle in field
+        except TypeError:
+            return False
+    return test
+
+
+def _does_not_contain(value) -> Callable:
+    contains = _contains(value)
+    return lambda field: not contains(field)
+
+
+def _starts_with(value) -> Callable:
+    prefix = str(value)
+    return lambda field: isinstance(field, str) and field.startswith(prefix)
+
+
+def _ends_with(value) -> Callable:
+    suffix = str(value)
+    return lambda field: isinstance(field, str) and field.endswith(suffix)
+
+
+OPERATIONS = {
+    'is' :               _is,
+    'is_not' :           _is_not,
+    'is_empty' :         _is_empty,
+    'is_not_empty' :     _is_not_empty,
+    'contains' :         _contains,
+    'does_not_contain' : _does_not_contain,
+    'starts_with' :      _starts_with,
+    'ends_with' :        _ends_with
+}
+
+
+class Predicate:
+    """A single compiled filter condition.
+
+    Args:
+        key (str): Key of the event data tested by the condition, or a
+                   dotted and bracketed path to nested data.
+        operation (str): Name of the operation.
+        value (any): Value the operation compares against, if any.
+    """
+
+    __slots__ = ('key', 'path', 'operation', 'value', 'test', 
+                 'evaluations', 'passes', 'elapsed_ns')
+
+    def __init__(self, key:str, operation:str, value=None) -> None:
+        self.key = key
+        self.path = compile_path(key) if is_path(key) else None
+        self.operation = operation
+        # As in the filters generated before the compiler, values are
+        # compared as strings: `is 5` matches "5" but not 5
+        self.value = value if operation in _VALUELESS_OPERATIONS else str(value)
+        self.test = OPERATIONS[operation](value)
+        self.evaluations = 0
+        self.passes = 0
+        self.elapsed_ns = 0
+
+
+    def __call__(self, data:dict) -> bool:
+        if self.path is None:
+            return self.test(data.get(self.key))
+        return self.test(self.path(data))
+
+
+    def record(self, passed:bool, elapsed_ns:int) -> None:
+        """Records a sampled evaluation of the predicate.
+
+        Args:
+            passed (bool): Result of the evaluation.
+            elapsed_ns (int): Duration of the evaluation in nanoseconds.
+        """
+        self.evaluations += 1
+        self.passes += passed
+        self.elapsed_ns += elapsed_ns
+
+
+    @property
+    def rank(self) -> float:
+        """Expected cost of the predicate per rejected event. Evaluating the
+        predicates of a conjunction by ascending rank minimizes the expected
+        cost of the whole chain.
+        """
+        if not self.evaluations:
+            return float('inf')
+        cost = self.elapsed_ns / self.evaluations
+        rejection = 1 - self.passes / self.evaluations
+        return cost / rejection if rejection > 0 else float('inf')
+
+
+    def stats(self) -> dict:
+        """Returns the recorded evaluations of the predicate.
+
+        Returns:
+            dict: Key, operation, evaluations, pass rate and average cost.
+        """
+        evaluations = self.evaluations
+        return {
+            'key': self.key,
+            'operation': self.operation,
+            'evaluations': evaluations,
+            'pass_rate': self.passes / evaluations if evaluations else None,
+            'avg_ns': self.elapsed_ns / evaluations if evaluations else None
+        }
+
+
+class CompiledFilter:
+    """Rule filter compiled into a chain of predicates.
+
+    Instances are called like the legacy `exec_filter` function, so they can
+    be used wherever a compiled filter is expected.
+
+    Args:
+        entity (str): Entity associated with the rule.
+        predicates (List[Predicate]): Conditions that must all be true.
+    """
+
+    __slots__ = ('entity', 'predicates')
+
+    def __init__(self, entity:str, predicates:List[Predicate]) -> None:
+        self.entity = entity
+        self.predicates = predicates
+
+
+    def __call__(self, event:any, entity:str) -> bool:
+        return entity == self.entity and self.matches(event.data)
+
+
+    def matches(self, data:dict) -> bool:
+        """Evaluates the predicates against the data of an event.
+
+        Args:
+            data (dict): Data of the event.
+
+        Returns:
+            bool: True if every predicate is satisfied.
+        """
+        if not isinstance(data, dict):
+            data = {}
+        for predicate in self.predicates:
+            if not predicate(data):
+                return False
+        return True
+
+
+class FilterCompiler:
+    """Compiles validated rule filters into `CompiledFilter` objects.
+
+    Filter values are bound into the predicates as constants, so no Python
+    source is generated and any value, including quotes, is matched as is.
+    """
+
+    @classmethod
+    def compile(cls, entity:str, filters:list) -> CompiledFilter:
+        """Compiles a validated list of filters.
+
+        Args:
+            entity (str): Entity associated with the rule.
+            filters (list): Filters returned by `RuleEngine.prepare_filter`.
+
+        Returns:
+            CompiledFilter: Callable filter of the rule.
+        """
+        return CompiledFilter(entity, [
+            Predicate(_filter.get('key'), 
+                      _filter.get('operation'), 
+                      _filter.get('value'))
+            for _filter in filters or []
+        ])
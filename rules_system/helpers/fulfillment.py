@@ -0,0 +1,321 @@
+import math
+import signal
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import contextmanager
+import requests
+from rules_system.logger import logger
+from rules_system.exceptions import FulfillmentTimeoutException
+from rules_system.config.settings import (FULFILLMENT_WORKERS,
+                                          FULFILLMENT_TIMEOUT,
+                                          FULFILLMENT_CPU_LIMIT,
+                                          FULFILLMENT_CACHE_SIZE)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+# Extra seconds the API waits for a worker after the script's own time budget
+# before giving up on the worker process. The budget itself is enforced inside
+# the worker, so this only catches workers that stopped answering.
+_GRACE_PERIOD = 1.0
+
+# Seconds a worker process may take to start or to stop.
+_START_TIMEOUT = 30.0
+_STOP_TIMEOUT = 1.0
+
+# Compiled scripts of the current worker process, by (action_id, version).
+_code_cache = OrderedDict()
+
+
+def script_version(source:str) -> str:
+    """Returns the version of a fulfillment script.
+
+    Args:
+        source (str): Source of the script.
+
+    Returns:
+        str: Digest of the source.
+    """
+    return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+def compile_script(key:tuple, source:str):
+    """Returns the code object of a script, compiling it only once per key.
+
+    Args:
+        key (tuple): (action_id, version) of the script.
+        source (str): Source of the script.
+
+    Returns:
+        code: Compiled script.
+    """
+    code = _code_cache.get(key)
+    if code is None:
+        code = compile(source, f'<fulfillment {key[0]}>', 'exec')
+        _code_cache[key] = code
+        while len(_code_cache) > FULFILLMENT_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+    else:
+        _code_cache.move_to_end(key)
+    return code
+
+
+def run_script(key:tuple, source:str, data:dict, timeout:float = 0,
+               cpu_limit:int = 0) -> bool:
+    """Executes a fulfillment script. Called inside the worker processes.
+
+    The event data is available to the script as `data`, along with the
+    `requests` module and the `logger`. Anything else must be imported by the
+    script.
+
+    Args:
+        key (tuple): (action_id, version) of the script.
+        source (str): Source of the script.
+        data (dict): Data of the event.
+        timeout (float): Wall clock seconds the script may take (0 disables).
+        cpu_limit (int): CPU seconds the script may use (0 disables).
+
+    Returns:
+        bool: True when the script finished.
+    """
+    code = compile_script(key, source)
+    with _budget(timeout, cpu_limit):
+        exec(code, {'__builtins__': __builtins__, 'data': data,
+                    'requests': requests, 'logger': logger})
+    return True
+
+
+def _on_limit(signum, frame):
+    if signum == signal.SIGALRM:
+        raise FulfillmentTimeoutException()
+    raise FulfillmentTimeoutException("Fulfillment script exceeded its CPU budget")
+
+
+@contextmanager
+def _budget(timeout:float, cpu_limit:int):
+    if threading.current_thread() is not threading.main_thread() or \
+            not hasattr(signal, 'setitimer'):
+        yield
+        return
+
+    previous_alarm = signal.signal(signal.SIGALRM, _on_limit)
+    if timeout > 0:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    limits = None
+    if resource is not None and cpu_limit > 0:
+        limits = resource.getrlimit(resource.RLIMIT_CPU)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # RLIMIT_CPU counts the whole life of the process, so the budget is
+        # added to the CPU time already used by the worker.
+        soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu_limit
+        if limits[1] != resource.RLIM_INFINITY:
+            soft = min(soft, limits[1])
+        signal.signal(signal.SIGXCPU, _on_limit)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, limits[1]))
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_alarm)
+        if limits is not None:
+            resource.setrlimit(resource.RLIMIT_CPU, limits)
+
+
+def _serve(conn) -> None:
+    """Main loop of a worker process: runs the scripts received on `conn`
+    until it receives None or the connection is closed."""
+    # Interrupts are handled by the parent, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    conn.send(('ready', None))
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        try:
+            conn.send(('ok', run_script(*request)))
+        except Exception as e:
+            try:
+                conn.send(('error', e))
+            except Exception:
+                # The script's exception can't be pickled
+                conn.send(('error', RuntimeError(f"{type(e).__name__}: {str(e)}")))
+
+
+class _Worker:
+    """Worker process of a `FulfillmentPool` and its connection.
+
+    Args:
+        context (any): Multiprocessing context the process is started with.
+    """
+
+    __slots__ = ('process', 'conn')
+
+    def __init__(self, context) -> None:
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), 
+                                       daemon=True)
+        self.process.start()
+        child.close()
+        # The script's budget must not count the start of the process
+        try:
+            if not self.conn.poll(_START_TIMEOUT):
+                raise EOFError
+            self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise FulfillmentTimeoutException(
+                "Fulfillment worker process didn't start"
+            )
+
+
+    def call(self, request:tuple, timeout:float = None):
+        """Runs a script in the worker. A worker that doesn't answer in time
+        or died is killed.
+
+        Args:
+            request (tuple): Arguments of `run_script`.
+            timeout (float): Seconds to wait for the answer (None waits
+                             forever).
+
+        Raises:
+            FulfillmentTimeoutException: If the worker didn't answer in time
+                                         or died.
+            Exception: Any exception raised by the script.
+
+        Returns:
+            bool: True when the script finished.
+        """
+        try:
+            self.conn.send(request)
+        except OSError:
+            self.kill()
+            raise FulfillmentTimeoutException("Fulfillment worker process died")
+        try:
+            if not self.conn.poll(timeout):
+                raise FulfillmentTimeoutException()
+            status, value = self.conn.recv()
+        except (EOFError, OSError):
+            self.kill()
+            raise FulfillmentTimeoutException("Fulfillment worker process died")
+        except BaseException:
+            # The answer would be read by the next script
+            self.kill()
+            raise
+        if status == 'error':
+            raise value
+        return value
+
+
+    @property
+    def alive(self) -> bool:
+        return not self.conn.closed
+
+
+    def stop(self) -> None:
+        """Asks the worker to exit, terminating it if it doesn't."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(_STOP_TIMEOUT)
+        self.kill()
+
+
+    def kill(self) -> None:
+        """Terminates the worker process."""
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(_STOP_TIMEOUT)
+        self.conn.close()
+
+
+class FulfillmentPool:
+    """Pool of worker processes executing fulfillment scripts.
+
+    Scripts are compiled once per action version by each worker and run with
+    a wall clock and a CPU budget, both enforced inside the worker from the
+    moment it picks the script up. Time spent waiting for a free worker isn't
+    charged to the script. A worker that still doesn't answer a moment after
+    its budget is terminated and replaced, without touching the scripts
+    running in the other workers, so a runaway script can't hold the API or
+    the action worker.
+
+    Args:
+        workers (int): Number of worker processes.
+        timeout (float): Wall clock seconds of each execution.
+        cpu_limit (int): CPU seconds of each execution.
+    """
+
+    def __init__(self, workers:int = FULFILLMENT_WORKERS,
+                 timeout:float = FULFILLMENT_TIMEOUT,
+                 cpu_limit:int = FULFILLMENT_CPU_LIMIT) -> None:
+        self.workers = max(workers, 1)
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        self.__idle = []
+        self.__slots = threading.BoundedSemaphore(self.workers)
+        self.__lock = threading.Lock()
+        self.__context = multiprocessing.get_context('spawn')
+
+
+    def run(self, action_id:str, source:str, data:dict) -> bool:
+        """Executes the script of a fulfillment action.
+
+        Args:
+            action_id (str): ID of the action.
+            source (str): Source of the script.
+            data (dict): Data of the event.
+
+        Raises:
+            FulfillmentTimeoutException: If the script exceeded its budget.
+            Exception: Any exception raised by the script.
+
+        Returns:
+            bool: True when the script finished.
+        """
+        key = (action_id, script_version(source))
+        with self.__slots:
+            worker = self.__checkout()
+            try:
+                return worker.call(
+                    (key, source, data, self.timeout, self.cpu_limit),
+                    self.timeout + _GRACE_PERIOD if self.timeout > 0 else None
+                )
+            finally:
+                # A stuck or dead worker was killed, the others are reused
+                if worker.alive:
+                    self.__checkin(worker)
+
+
+    def shutdown(self) -> None:
+        """Stops the worker processes, after the running scripts finish."""
+        for _ in range(self.workers):
+            self.__slots.acquire()
+        try:
+            with self.__lock:
+                workers, self.__idle = self.__idle, []
+            for worker in workers:
+                worker.stop()
+        finally:
+            for _ in range(self.workers):
+                self.__slots.release()
+
+
+    def __checkout(self) -> _Worker:
+        with self.__lock:
+            if self.__idle:
+                return self.__idle.pop()
+        return _Worker(self.__context)
+
+
+    def __checkin(self, worker:_Worker) -> None:
+        with self.__lock:
+            self.__idle.append(worker)
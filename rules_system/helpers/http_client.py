@@ -0,0 +1,150 @@
+import threading
+import requests
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from rules_system.helpers.prometheus import REGISTRY
+from rules_system.config.settings import (WEBHOOK_POOL_CONNECTIONS,
+                                          WEBHOOK_POOL_MAXSIZE,
+                                          WEBHOOK_POOL_BLOCK,
+                                          WEBHOOK_CONNECT_TIMEOUT,
+                                          WEBHOOK_READ_TIMEOUT)
+
+
+class ConnectionStats:
+    """Thread-safe counters of the requests sent and connections opened."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.connections = 0
+        self.__lock = threading.Lock()
+
+
+    def add_request(self) -> None:
+        with self.__lock:
+            self.requests += 1
+
+
+    def add_connection(self) -> None:
+        with self.__lock:
+            self.connections += 1
+
+
+    def as_dict(self) -> dict:
+        with self.__lock:
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'reused': max(self.requests - self.connections, 0)
+            }
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTP adapter counting how many connections its pools open."""
+
+    def __init__(self, stats:ConnectionStats, **kwargs) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.add_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.add_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool
+        }
+
+
+    def send(self, request, *args, **kwargs):
+        self.stats.add_request()
+        return super().send(request, *args, **kwargs)
+
+
+class HttpClient:
+    """Shared HTTP client with pooled keep-alive connections.
+
+    Connections are kept open per host and reused by the following requests
+    instead of opening a new TCP connection and TLS session for each one.
+    Cookies are never stored, so no state leaks between webhooks.
+
+    Args:
+        pool_connections (int): Number of hosts whose pools are kept.
+        pool_maxsize (int): Maximum connections kept open per host.
+        pool_block (bool): Wait for a free connection instead of opening
+                           connections above `pool_maxsize`.
+        connect_timeout (float): Seconds to wait for a connection.
+        read_timeout (float): Seconds to wait for a response.
+    """
+
+    def __init__(self, pool_connections:int = WEBHOOK_POOL_CONNECTIONS,
+                 pool_maxsize:int = WEBHOOK_POOL_MAXSIZE,
+                 pool_block:bool = WEBHOOK_POOL_BLOCK,
+                 connect_timeout:float = WEBHOOK_CONNECT_TIMEOUT,
+                 read_timeout:float = WEBHOOK_READ_TIMEOUT) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = PooledAdapter(self.stats,
+                                pool_connections=pool_connections,
+                                pool_maxsize=pool_maxsize,
+                                pool_block=pool_block)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+
+    def post(self, url:str, **kwargs) -> requests.Response:
+        """Sends a POST request through the pooled session.
+
+        Args:
+            url (str): URL of the request.
+            **kwargs: Arguments of `requests.Session.post`.
+
+        Returns:
+            requests.Response: Response of the request.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Get the shared HTTP client of the process
+
+    Returns:
+        HttpClient: HTTP client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def _client_stat(name:str) -> int:
+    """Returns a connection counter of the shared client, 0 until it's used."""
+    return _client.stats.as_dict()[name] if _client is not None else 0
+
+
+REGISTRY.counter_function(
+    'rules_webhook_requests_total', 'Requests sent by the webhook client.',
+    lambda: _client_stat('requests'))
+REGISTRY.counter_function(
+    'rules_webhook_connections_total', 
+    'Connections opened by the webhook client; the other requests reused one.',
+    lambda: _client_stat('connections'))
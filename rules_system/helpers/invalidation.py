@@ -0,0 +1,127 @@
+import json
+import threading
+from typing import Callable
+from rules_system.logger import logger
+from rules_system.config.redis import get_redis_instance
+from rules_system.config.settings import INVALIDATION_CHANNEL
+
+
+def publish_invalidation(redis, message:dict, 
+                         channel:str = INVALIDATION_CHANNEL) -> None:
+    """Publishes a rule invalidation message.
+
+    Args:
+        redis (any): Redis instance.
+        message (dict): Entity, rule ID, rule version, epoch and sequence of
+                        the change.
+        channel (str): Pub/sub channel.
+    """
+    try:
+        redis.publish(channel, json.dumps(message))
+    except Exception as e:
+        # Subscribers resync from the version stamp when a message is missed
+        logger.error(f"[INVALIDATION EXCEPTION]: '{str(e)}'")
+
+
+class InvalidationListener:
+    """Background subscriber of the rule invalidation channel.
+
+    Every message is given to `handler` together with the Redis instance of
+    the listener. Messages published while the listener is not subscribed
+    are lost, so `on_reset` is called after each (re)subscription to make
+    the local caches resync.
+
+    Args:
+        handler (Callable): Function called with each message and the redis
+                            instance.
+        on_reset (Callable): Function called when messages may have been
+                             missed.
+        channel (str): Pub/sub channel.
+        redis_instance (any): Pre initiated redis instance (optional)
+        poll_timeout (float): Seconds waited for each message.
+        retry_delay (float): Seconds waited before subscribing again after
+                             an error.
+    """
+
+    def __init__(self, handler:Callable, on_reset:Callable,
+                 channel:str = INVALIDATION_CHANNEL, redis_instance = None,
+                 poll_timeout:float = 1.0, retry_delay:float = 1.0) -> None:
+        self.handler = handler
+        self.on_reset = on_reset
+        self.channel = channel
+        self.redis_instance = redis_instance
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        self.__subscribed = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+
+    @property
+    def healthy(self) -> bool:
+        """Tells if the listener is subscribed to the channel."""
+        return self.__subscribed.is_set()
+
+
+    def start(self) -> 'InvalidationListener':
+        """Starts listening in a daemon thread."""
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run,
+                                             name='rule-invalidation',
+                                             daemon=True)
+            self.__thread.start()
+        return self
+
+
+    def wait_subscribed(self, timeout:float = None) -> bool:
+        """Waits until the listener is subscribed.
+
+        Args:
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            bool: True if the listener is subscribed.
+        """
+        return self.__subscribed.wait(timeout)
+
+
+    def stop(self) -> None:
+        """Stops listening."""
+        self.__stopped.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+
+    def __run(self) -> None:
+        while not self.__stopped.is_set():
+            pubsub = None
+            try:
+                redis = self.redis_instance or get_redis_instance()
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.on_reset()
+                self.__subscribed.set()
+                while not self.__stopped.is_set():
+                    message = pubsub.get_message(timeout=self.poll_timeout)
+                    if message and message.get('type') == 'message':
+                        self.__handle(message.get('data'), redis)
+            except Exception as e:
+                logger.error(f"[INVALIDATION EXCEPTION]: '{str(e)}'")
+                self.__stopped.wait(self.retry_delay)
+            finally:
+                self.__subscribed.clear()
+                self.on_reset()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+
+    def __handle(self, data:bytes, redis) -> None:
+        try:
+            self.handler(json.loads(data), redis)
+        except Exception as e:
+            logger.error(f"[INVALIDATION EXCEPTION]: '{str(e)}'")
+            self.on_reset()
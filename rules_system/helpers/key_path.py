@@ -0,0 +1,147 @@
+"""Nested key paths of rule filters.
+
+A filter key may address nested event data with dots and brackets, e.g.
+`customer.address.country`, `items[0].sku` or `meta["utm.source"]`. Paths are
+parsed once into a `KeyPath` when the rule is compiled, and rules using the
+same path share the same accessor.
+
+A key present as is in the event data always wins over the path, so keys
+that contained dots before paths were supported keep matching. Keys of
+existing rules that aren't valid paths (`amount.`, `price[USD`) are read as
+plain top-level keys.
+"""
+import re
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+_NAME = re.compile(r'[^.\[\]]+')
+_INDEX = re.compile(r'\[(-?\d+)\]')
+_QUOTED = re.compile(r'''\[(["'])(.*?)\1\]''')
+
+
+def is_path(key:str) -> bool:
+    """Returns whether a filter key addresses nested data."""
+    return isinstance(key, str) and ('.' in key or '[' in key)
+
+
+def parse_path(key:str) -> Tuple[Union[str, int], ...]:
+    """Parses a filter key into the segments of its path.
+
+    Args:
+        key (str): Dotted and bracketed path.
+
+    Raises:
+        ValueError: If the path is malformed.
+
+    Returns:
+        tuple: Dict keys (str) and list indexes (int), in order.
+    """
+    segments = []
+    position = 0
+    while position < len(key):
+        if key[position] == '[':
+            match = _INDEX.match(key, position)
+            if match:
+                segments.append(int(match.group(1)))
+            else:
+                match = _QUOTED.match(key, position)
+                if not match:
+                    raise ValueError(f"invalid bracket at position {position}")
+                segments.append(match.group(2))
+        else:
+            if key[position] == '.':
+                if not segments:
+                    raise ValueError("path starts with '.'")
+                position += 1
+            match = _NAME.match(key, position)
+            if not match:
+                raise ValueError(f"empty segment at position {position}")
+            segments.append(match.group(0))
+        position = match.end()
+    if not segments:
+        raise ValueError("path is empty")
+    return tuple(segments)
+
+
+class KeyPath:
+    """Precompiled accessor of a nested key path.
+
+    Args:
+        key (str): Dotted and bracketed path.
+    """
+
+    __slots__ = ('key', 'segments')
+
+    def __init__(self, key:str) -> None:
+        self.key = key
+        self.segments = parse_path(key)
+
+
+    def __call__(self, data:dict):
+        """Returns the value of the path in the event data, or the value of
+        the whole key when the data has it, e.g. already resolved by
+        `resolve_paths`.
+        """
+        if self.key in data:
+            return data[self.key]
+        return self.walk(data)
+
+
+    def walk(self, data:dict):
+        """Follows the path in the event data.
+
+        Args:
+            data (dict): Data of the event.
+
+        Returns:
+            any: Value at the end of the path, None if any segment is missing.
+        """
+        value = data
+        for segment in self.segments:
+            if isinstance(segment, int):
+                if not isinstance(value, (list, tuple)) or \
+                        not -len(value) <= segment < len(value):
+                    return None
+                value = value[segment]
+            elif isinstance(value, dict):
+                value = value.get(segment)
+            else:
+                return None
+        return value
+
+
+@lru_cache(maxsize=4096)
+def compile_path(key:str) -> Optional[KeyPath]:
+    """Returns the shared accessor of a path.
+
+    Args:
+        key (str): Dotted and bracketed path.
+
+    Returns:
+        KeyPath: Accessor of the path, None if the path is malformed and the
+                 key is a plain top-level key.
+    """
+    try:
+        return KeyPath(key)
+    except ValueError:
+        return None
+
+
+def resolve_paths(data:dict, paths:dict) -> dict:
+    """Looks up each path once in the event data.
+
+    Args:
+        data (dict): Data of the event.
+        paths (dict): Accessors by key.
+
+    Returns:
+        dict: Copy of the data with the value of each path under its key, so
+              every rule reads it with a single lookup.
+    """
+    if not paths:
+        return data
+    resolved = dict(data)
+    for key, path in paths.items():
+        if key not in data:
+            resolved[key] = path.walk(data)
+    return resolved
@@ -0,0 +1,270 @@
+import bisect
+import threading
+from typing import Iterable, List
+from rules_system.logger import logger
+from rules_system.config.redis import get_redis_instance
+from rules_system.config.settings import METRICS_FLUSH_INTERVAL
+
+# Upper bounds of the latency histogram buckets, in microseconds. Values above
+# the last bound fall in an overflow bucket.
+LATENCY_BUCKETS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+                      25000, 50000, 100000, 250000, 500000, 1000000,
+                      2500000, 5000000, 10000000)
+
+_BOUNDS_NS = [bound * 1000 for bound in LATENCY_BUCKETS_US]
+
+
+class Histogram:
+    """Latency histogram with fixed buckets."""
+
+    __slots__ = ('counts', 'sum_ns')
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BOUNDS_NS) + 1)
+        self.sum_ns = 0
+
+
+    def observe(self, elapsed_ns:int) -> None:
+        """Records a duration.
+
+        Args:
+            elapsed_ns (int): Duration in nanoseconds.
+        """
+        self.counts[bisect.bisect_left(_BOUNDS_NS, elapsed_ns)] += 1
+        self.sum_ns += elapsed_ns
+
+
+def summarize(counts:List[int], sum_ns:int) -> dict:
+    """Summarizes the buckets of a histogram.
+
+    Percentiles are the upper bound of the bucket holding them, so they are
+    estimates no lower than the real value.
+
+    Args:
+        counts (List[int]): Count of each bucket.
+        sum_ns (int): Sum of the durations in nanoseconds.
+
+    Returns:
+        dict: Count, average and p50/p95/p99 in milliseconds.
+    """
+    count = sum(counts)
+    summary = {'count': count, 'avg_ms': None, 
+               'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    if not count:
+        return summary
+    summary['avg_ms'] = sum_ns / count / 1e6
+    for name, quantile in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+        cumulative = 0
+        for bucket, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= quantile * count:
+                bound = LATENCY_BUCKETS_US[min(bucket, len(LATENCY_BUCKETS_US) - 1)]
+                summary[name] = bound / 1000
+                break
+    return summary
+
+
+class Metrics:
+    """Process-local counters and latency histograms of rules and actions.
+
+    Event and match counters are exact; rule evaluation latencies come from
+    the evaluations sampled by `Ruleset`. Everything is accumulated in
+    memory and added to Redis hashes by `flush`, which a daemon thread calls
+    every `flush_interval` seconds:
+        - `entity_stats#{entity}`: events processed.
+        - `rule_stats#{rule_id}`: matches, evaluation latency and the
+          executions and latency of the rule's actions.
+        - `action_stats#{action}`: executions and latency per action type.
+
+    Args:
+        flush_interval (float): Seconds between flushes (0 disables the
+                                flush thread).
+        redis_instance (any): Pre initiated redis instance (optional)
+    """
+
+    def __init__(self, flush_interval:float = METRICS_FLUSH_INTERVAL,
+                 redis_instance = None) -> None:
+        self.flush_interval = flush_interval
+        self.redis_instance = redis_instance
+        self.__lock = threading.Lock()
+        self.__flusher = None
+        self.__reset()
+
+
+    def record_events(self, entity:str, results:Iterable[list]) -> None:
+        """Records processed events and the rules each one triggered.
+
+        Args:
+            entity (str): Entity of the events.
+            results (Iterable[list]): Triggered rules ID of each event.
+        """
+        with self.__lock:
+            events = 0
+            for rules_triggered in results:
+                events += 1
+                for rule_id in rules_triggered:
+                    self.__rule(rule_id)['matches'] += 1
+            self.__entities[entity] = self.__entities.get(entity, 0) + events
+        self.__start()
+
+
+    def observe_rule(self, rule_id:str, passed:bool, elapsed_ns:int) -> None:
+        """Records a sampled evaluation of a rule.
+
+        Args:
+            rule_id (str): ID of the rule.
+            passed (bool): Result of the evaluation.
+            elapsed_ns (int): Duration of the evaluation in nanoseconds.
+        """
+        with self.__lock:
+            self.__rule(rule_id)['evaluation'].observe(elapsed_ns)
+
+
+    def observe_action(self, action:str, rules_ids:Iterable[str], 
+                       succeeded:bool, elapsed_ns:int) -> None:
+        """Records the execution of an action.
+
+        Args:
+            action (str): Type of the action.
+            rules_ids (Iterable[str]): Rules the action was executed for.
+            succeeded (bool): Whether the action succeeded.
+            elapsed_ns (int): Duration of the execution in nanoseconds.
+        """
+        field = 'executed' if succeeded else 'failed'
+        with self.__lock:
+            stats = self.__actions.setdefault(
+                action, {'executed': 0, 'failed': 0, 'latency': Histogram()}
+            )
+            stats[field] += 1
+            stats['latency'].observe(elapsed_ns)
+            for rule_id in rules_ids:
+                rule = self.__rule(rule_id)
+                rule[f'actions_{field}'] += 1
+                rule['action'].observe(elapsed_ns)
+        self.__start()
+
+
+    def flush(self, redis_instance = None) -> None:
+        """Adds the metrics accumulated since the last flush to Redis.
+
+        Args:
+            redis_instance (any): Pre initiated redis instance (optional)
+        """
+        with self.__lock:
+            entities, rules, actions = self.__entities, self.__rules, self.__actions
+            self.__reset()
+        if not (entities or rules or actions):
+            return
+        redis = redis_instance or self.redis_instance or get_redis_instance()
+        pipeline = redis.pipeline(transaction=False)
+        for entity, events in entities.items():
+            pipeline.hincrby(f"entity_stats#{entity}", 'events', events)
+        for rule_id, stats in rules.items():
+            key = f"rule_stats#{rule_id}"
+            for field in ('matches', 'actions_executed', 'actions_failed'):
+                if stats[field]:
+                    pipeline.hincrby(key, field, stats[field])
+            self.__write_histogram(pipeline, key, 'evaluation', stats['evaluation'])
+            self.__write_histogram(pipeline, key, 'action', stats['action'])
+        for action, stats in actions.items():
+            key = f"action_stats#{action}"
+            for field in ('executed', 'failed'):
+                if stats[field]:
+                    pipeline.hincrby(key, field, stats[field])
+            self.__write_histogram(pipeline, key, 'latency', stats['latency'])
+        pipeline.execute()
+
+
+    @classmethod
+    def read_rule(cls, rule_id:str, entity:str, redis) -> dict:
+        """Reads the flushed metrics of a rule.
+
+        Args:
+            rule_id (str): ID of the rule.
+            entity (str): Entity of the rule.
+            redis (any): Redis instance.
+
+        Returns:
+            dict: Events of the entity, matches and match rate of the rule,
+                  and the summaries of its evaluation and action latencies.
+        """
+        pipeline = redis.pipeline(transaction=False)
+        pipeline.hget(f"entity_stats#{entity}", 'events')
+        pipeline.hgetall(f"rule_stats#{rule_id}")
+        events, stats = pipeline.execute()
+        stats = {field.decode('utf-8'): int(value) for field, value in stats.items()}
+        events = int(events or 0)
+        matches = stats.get('matches', 0)
+        return {
+            'events': events,
+            'matches': matches,
+            'match_rate': matches / events if events else None,
+            'evaluation': cls.__read_histogram(stats, 'evaluation'),
+            'actions': {
+                'executed': stats.get('actions_executed', 0),
+                'failed': stats.get('actions_failed', 0),
+                'latency': cls.__read_histogram(stats, 'action')
+            }
+        }
+
+
+    def stop(self) -> None:
+        """Stops the flush thread, flushing the pending metrics."""
+        flusher, self.__flusher = self.__flusher, None
+        if flusher is not None:
+            flusher[1].set()
+            flusher[0].join()
+        self.flush()
+
+
+    def __reset(self) -> None:
+        self.__entities = {}
+        self.__rules = {}
+        self.__actions = {}
+
+
+    def __rule(self, rule_id:str) -> dict:
+        stats = self.__rules.get(rule_id)
+        if stats is None:
+            stats = self.__rules[rule_id] = {
+                'matches': 0, 'actions_executed': 0, 'actions_failed': 0,
+                'evaluation': Histogram(), 'action': Histogram()
+            }
+        return stats
+
+
+    def __start(self) -> None:
+        if self.__flusher is not None or self.flush_interval <= 0:
+            return
+        with self.__lock:
+            if self.__flusher is None:
+                stopped = threading.Event()
+                thread = threading.Thread(target=self.__run, args=(stopped,),
+                                          name='rule-metrics', daemon=True)
+                self.__flusher = (thread, stopped)
+                thread.start()
+
+
+    def __run(self, stopped:threading.Event) -> None:
+        while not stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[METRICS EXCEPTION]: '{str(e)}'")
+
+
+    @staticmethod
+    def __write_histogram(pipeline, key:str, name:str, histogram:Histogram) -> None:
+        if not histogram.sum_ns and not any(histogram.counts):
+            return
+        for bucket, count in enumerate(histogram.counts):
+            if count:
+                pipeline.hincrby(key, f"{name}_bucket_{bucket}", count)
+        pipeline.hincrby(key, f"{name}_sum_ns", histogram.sum_ns)
+
+
+    @staticmethod
+    def __read_histogram(stats:dict, name:str) -> dict:
+        counts = [stats.get(f"{name}_bucket_{bucket}", 0) 
+                  for bucket in range(len(_BOUNDS_NS) + 1)]
+        return summarize(counts, stats.get(f"{name}_sum_ns", 0))
@@ -0,0 +1,379 @@
+"""Process metrics registry rendered in the Prometheus text format.
+
+Counters and histograms keep one shard of values per thread, so recording a
+value never takes a lock: each thread only writes its own shard and a scrape
+sums the shards. Shards of finished threads are folded into a common base
+when scraped.
+"""
+import math
+import bisect
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class _Metric:
+    """Base class of the sharded metrics.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): Help text.
+        labels (Iterable[str]): Label names.
+    """
+
+    type = ''
+
+    def __init__(self, name:str, documentation:str, 
+                 labels:Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._base = {}
+        self._lock = threading.Lock()
+
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'values', None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+
+    def _collect(self) -> dict:
+        """Returns the values of every shard merged by labels."""
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge(self._base, dict(shard))
+            self._shards = alive
+            merged = {}
+            self._merge(merged, self._base)
+            for _, shard in alive:
+                # Copying a dict is atomic, so the owner thread can keep
+                # writing while it is read
+                self._merge(merged, dict(shard))
+        return merged
+
+
+    def _merge(self, target:dict, source:dict) -> None:
+        raise NotImplementedError
+
+
+    def _samples(self) -> List[Tuple[str, tuple, float]]:
+        raise NotImplementedError
+
+
+    def render(self) -> str:
+        """Renders the metric in the Prometheus text format."""
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}",
+                 f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self._samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    type = 'counter'
+
+    def inc(self, *labels, amount:float = 1) -> None:
+        """Increments the counter of a set of label values.
+
+        Args:
+            *labels: Value of each label, in the order of the label names.
+            amount (float): Increment.
+        """
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+    def value(self, *labels) -> float:
+        """Returns the current value of a set of label values."""
+        return self._collect().get(labels, 0)
+
+
+    def _merge(self, target:dict, source:dict) -> None:
+        for labels, value in source.items():
+            target[labels] = target.get(labels, 0) + value
+
+
+    def _samples(self) -> list:
+        return [(self.name, tuple(zip(self.labels, labels)), value)
+                for labels, value in sorted(self._collect().items())]
+
+
+class Histogram(_Metric):
+    """Histogram of observed values, in seconds for latencies.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): Help text.
+        labels (Iterable[str]): Label names.
+        buckets (Iterable[float]): Upper bounds of the buckets.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name:str, documentation:str, labels:Iterable[str] = (),
+                 buckets:Iterable[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+
+    def observe(self, value:float, *labels) -> None:
+        """Records a value.
+
+        Args:
+            value (float): Observed value.
+            *labels: Value of each label, in the order of the label names.
+        """
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            entry = shard[labels] = [0] * (len(self.buckets) + 2)
+        # Buckets, then the sum of the values in the last position
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+
+    def count(self, *labels) -> int:
+        """Returns the number of values observed for a set of label values."""
+        entry = self._collect().get(labels)
+        return sum(entry[:-1]) if entry else 0
+
+
+    def _merge(self, target:dict, source:dict) -> None:
+        for labels, entry in source.items():
+            entry = list(entry)
+            current = target.get(labels)
+            if current is None:
+                target[labels] = entry
+            else:
+                target[labels] = [a + b for a, b in zip(current, entry)]
+
+
+    def _samples(self) -> list:
+        samples = []
+        for labels, entry in sorted(self._collect().items()):
+            labels = tuple(zip(self.labels, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), entry[:-1]):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", 
+                                labels + (('le', bound),), cumulative))
+            samples.append((f"{self.name}_sum", labels, entry[-1]))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class GaugeFunction(_Metric):
+    """Gauge whose value is read from a function when scraped.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): Help text.
+        function (Callable): Returns the current value.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name:str, documentation:str, function:Callable) -> None:
+        super().__init__(name, documentation)
+        self.function = function
+
+
+    def _samples(self) -> list:
+        try:
+            return [(self.name, (), self.function())]
+        except Exception:
+            # An unreachable source must not break the whole scrape
+            return []
+
+
+class CounterFunction(GaugeFunction):
+    """Counter whose value is read from a function when scraped, for totals
+    already kept by another object."""
+
+    type = 'counter'
+
+
+class Registry:
+    """Set of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self.__metrics = {}
+        self.__lock = threading.Lock()
+
+
+    def register(self, metric:_Metric) -> _Metric:
+        """Registers a metric, returning the one already registered with the
+        same name, if any.
+
+        Args:
+            metric (_Metric): Metric to register.
+
+        Returns:
+            _Metric: Registered metric.
+        """
+        with self.__lock:
+            return self.__metrics.setdefault(metric.name, metric)
+
+
+    def counter(self, name:str, documentation:str, 
+                labels:Iterable[str] = ()) -> Counter:
+        """Registers a counter."""
+        return self.register(Counter(name, documentation, labels))
+
+
+    def histogram(self, name:str, documentation:str, labels:Iterable[str] = (),
+                  buckets:Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Registers a histogram."""
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+
+    def gauge_function(self, name:str, documentation:str, 
+                       function:Callable) -> GaugeFunction:
+        """Registers a gauge read from a function when scraped."""
+        return self.register(GaugeFunction(name, documentation, function))
+
+
+    def counter_function(self, name:str, documentation:str, 
+                         function:Callable) -> CounterFunction:
+        """Registers a counter read from a function when scraped."""
+        return self.register(CounterFunction(name, documentation, function))
+
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text format.
+
+        Returns:
+            str: Metrics exposition.
+        """
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+@contextmanager
+def timed(histogram:Histogram, *labels):
+    """Observes the duration of the enclosed block in a histogram, including
+    when it raises.
+
+    Args:
+        histogram (Histogram): Histogram of the durations in seconds.
+        *labels: Value of each label of the histogram.
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started_at, *labels)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry of the server at `/metrics`."""
+
+    def do_GET(self) -> None:
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 
+                         'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format:str, *args) -> None:
+        pass
+
+
+def serve(port:int, host:str = '0.0.0.0', 
+          registry:Registry = None) -> ThreadingHTTPServer:
+    """Serves a registry at `/metrics` from a daemon thread, for processes
+    without the API, such as the action worker.
+
+    Args:
+        port (int): Port to listen on (0 picks a free one).
+        host (str): Address to listen on.
+        registry (Registry): Served registry (defaults to `REGISTRY`).
+
+    Returns:
+        ThreadingHTTPServer: Running server, stopped with `shutdown()`.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or REGISTRY
+    threading.Thread(target=server.serve_forever, name='metrics-server',
+                     daemon=True).start()
+    return server
+
+
+def _format_labels(labels:tuple) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape_label(_format_value(value) if name == "le" else value)}"'
+                     for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def _format_value(value:float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return str(value)
+
+
+def _escape_help(text:str) -> str:
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'rules_http_requests_total', 'HTTP requests handled by the API.',
+    ('method', 'route', 'status'))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'rules_http_request_duration_seconds', 'Duration of the HTTP requests.',
+    ('method', 'route'))
+EVENTS_PROCESSED = REGISTRY.counter(
+    'rules_events_processed_total', 'Events evaluated against the rules.',
+    ('entity',))
+RULES_MATCHED = REGISTRY.counter(
+    'rules_matched_total', 'Rules triggered by the evaluated events.',
+    ('entity',))
+EVALUATION_SECONDS = REGISTRY.histogram(
+    'rules_evaluation_duration_seconds', 
+    'Duration of the rule evaluation of an event or a batch of events.',
+    ('entity', 'mode'))
+REDIS_SECONDS = REGISTRY.histogram(
+    'rules_redis_duration_seconds', 'Duration of the Redis operations.',
+    ('operation',))
+DB_SECONDS = REGISTRY.histogram(
+    'rules_db_duration_seconds', 'Duration of the database operations.',
+    ('operation',))
+ACTIONS = REGISTRY.counter(
+    'rules_actions_total', 'Executed rule actions.', ('action', 'result'))
+ACTION_SECONDS = REGISTRY.histogram(
+    'rules_action_duration_seconds', 'Duration of the rule actions.',
+    ('action',))
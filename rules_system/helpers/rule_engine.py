@@ -1,37 +1,94 @@
+import uuid
 import pickle
-import requests
+import json
+import time
+import hashlib
+from types import SimpleNamespace
 from rules_system.logger import logger
-from typing import List
+from typing import Callable, Iterable, List, Optional
 from rules_system.types.enum_rule_action import RuleAction as EnumAction
 from rules_system.config.database import Session
 from rules_system.config.redis import get_redis_instance
+from rules_system.config.settings import (FILTER_CACHE_SIZE,
+                                          ACTION_CACHE_TTL,
+                                          ACTION_DEDUPE,
+                                          CACHE_INVALIDATION,
+                                          CACHE_RESYNC_INTERVAL,
+                                          FILTER_READ_LEGACY,
+                                          SLOW_TRACE_THRESHOLD)
+from rules_system.helpers.filter_cache import FilterCache
+from rules_system.helpers.filter_compiler import FilterCompiler
+from rules_system.helpers import filter_codec
+from rules_system.helpers.key_path import is_path, parse_path
+from rules_system.helpers.ruleset import Ruleset
+from rules_system.helpers.action_queue import ActionQueue
+from rules_system.helpers.action_cache import ActionCache
+from rules_system.helpers.fulfillment import FulfillmentPool
+from rules_system.helpers.metrics import Metrics
+from rules_system.helpers.prometheus import (REGISTRY,
+                                             EVENTS_PROCESSED,
+                                             RULES_MATCHED,
+                                             EVALUATION_SECONDS,
+                                             REDIS_SECONDS,
+                                             ACTIONS,
+                                             ACTION_SECONDS,
+                                             timed)
+from rules_system.helpers.tracing import span, trace
+from rules_system.helpers.invalidation import (InvalidationListener,
+                                               publish_invalidation)
+from rules_system.helpers.fanout import FanOut
+from rules_system.helpers.http_client import get_http_client
+from rules_system.helpers.email_dispatcher import (get_email_dispatcher,
+                                                   close_email_dispatcher)
 from rules_system.models import (RuleAction, Rule)
 from rules_system.exceptions import (InvalidFilterException,
                                      InvalidFilterOperationException,
                                      RuleFilterOperationMissingFieldException,
                                      MissingRuleKeyException,
-                                     InvalidActionTypeException)
+                                     InvalidRuleKeyException,
+                                     InvalidActionTypeException,
+                                     InvalidFilterFormatException)
 
 class RuleEngine:
     """Class for processing rules and executing associated actions."""
 
     __operations_list = {
-        'is' :               { 'fields' : ['value'] },
+        'is' :               { 'fields' : ['value'], 'index' : 'equality' },
         'is_not' :           { 'fields' : ['value'] },
         'is_empty' :         { 'fields' : [] },
         'is_not_empty' :     { 'fields' : [] },
-        'contains' :         { 'fields' : ['value'] },
-        'does_not_contain' : { 'fields' : ['value'] },
-        'starts_with' :      { 'fields' : ['value'] },
-        'ends_with' :        { 'fields' : ['value'] }
+        'contains' :         { 'fields' : ['value'], 'index' : 'substring' },
+        'does_not_contain' : { 'fields' : ['value'], 'index' : 'substring',
+                               'negate' : True },
+        'starts_with' :      { 'fields' : ['value'], 'index' : 'prefix' },
+        'ends_with' :        { 'fields' : ['value'], 'index' : 'suffix' }
     }
     
     __action_list = ['webhook', 'email', 'fulfillment']
     
+    __filter_cache = FilterCache(FILTER_CACHE_SIZE)
+    
+    __action_queue = None
+    
+    __fanout = FanOut()
+    
+    __action_cache = ActionCache(ACTION_CACHE_TTL)
+    
+    __dedupe_actions = ACTION_DEDUPE
+    
+    __fulfillment_pool = FulfillmentPool()
+    
+    __invalidation_listener = None
+    
+    __metrics = Metrics()
+    
     @classmethod
     def process_event(cls, data:dict, entity:str, redis_instance=False) -> list:
         """Processes an event based on the specified rules.
 
+        The actions of the triggered rules are enqueued and executed outside
+        of the request (see `ActionQueue`).
+
         Args:
             data (dict): Data of the event.
             entity (str): Entity associated with the event.
@@ -41,20 +98,193 @@ class RuleEngine:
             list: List of triggered rules ID.
         """
         redis = redis_instance or get_redis_instance()
-        rules_ids = redis.keys(f"rule_filter#{entity}#*")
-        rules = redis.mget(rules_ids)
-        rules_triggered = []
-        for rule_id, rule_filter in zip(rules_ids, rules):
-            func = pickle.loads(rule_filter)
-            filter_space={}
-            exec(func, filter_space)
-            
-            if filter_space['exec_filter'](data, entity):
-                rule_id = rule_id.decode('utf-8').split("#").pop()
-                _ = cls.__exec_rule_actions(rule_id, data)
-                rules_triggered.append(rule_id)
+        with timed(EVALUATION_SECONDS, entity, 'single'):
+            ruleset = cls.__load_ruleset(redis, entity)
+            with span('filter.match', entity=entity, rules=len(ruleset)):
+                rules_triggered = ruleset.match(data, entity)
+        EVENTS_PROCESSED.inc(entity)
+        RULES_MATCHED.inc(entity, amount=len(rules_triggered))
+        cls.__metrics.record_events(entity, [rules_triggered])
+        cls.__dispatch_actions([data], entity, [rules_triggered], redis)
         return rules_triggered    
     
+    
+    @classmethod
+    def process_events(cls, events:list, entity:str, 
+                       redis_instance=False) -> List[list]:
+        """Processes a batch of events based on the specified rules.
+
+        The rules are loaded once for the whole batch and evaluated
+        column-wise, giving the same result as calling `process_event` for
+        each event.
+
+        Args:
+            events (list): Events of the same entity.
+            entity (str): Entity associated with the events.
+            redis_instance (any): Pre initiated redis instance (optional)
+            
+        Returns:
+            List[list]: List of triggered rules ID of each event.
+        """
+        redis = redis_instance or get_redis_instance()
+        with timed(EVALUATION_SECONDS, entity, 'batch'):
+            ruleset = cls.__load_ruleset(redis, entity)
+            with span('filter.match_batch', entity=entity, events=len(events)):
+                results = ruleset.match_batch(events, entity)
+        EVENTS_PROCESSED.inc(entity, amount=len(events))
+        RULES_MATCHED.inc(entity, amount=sum(map(len, results)))
+        cls.__metrics.record_events(entity, results)
+        cls.__dispatch_actions(events, entity, results, redis)
+        return results
+    
+    
+    @classmethod
+    def __load_ruleset(cls, redis, entity:str) -> Ruleset:
+        """Loads the compiled ruleset of an entity.
+
+        The entity's version stamp is read first. While it does not change,
+        the ruleset built by this process is reused without reading the rule
+        index; otherwise only the rules whose version changed are fetched,
+        compiled again and updated in the ruleset. While the invalidation
+        listener is subscribed, the stamp is only read every
+        `RULES_CACHE_RESYNC_INTERVAL` seconds or after a missed message.
+
+        Args:
+            redis (any): Redis instance.
+            entity (str): Entity associated with the rules.
+
+        Returns:
+            Ruleset: Indexed filters of the entity's rules.
+        """
+        listener = cls.__get_invalidation_listener()
+        if listener is not None and listener.healthy and \
+                cls.__filter_cache.is_fresh(entity, CACHE_RESYNC_INTERVAL):
+            cached_stamp, ruleset = cls.__filter_cache.get_ruleset(entity)
+            if ruleset is not None:
+                return ruleset
+        with cls.__filter_cache.lock(entity):
+            return cls.__sync_ruleset(redis, entity)
+    
+    
+    @classmethod
+    def __sync_ruleset(cls, redis, entity:str) -> Ruleset:
+        """Brings the cached ruleset of an entity up to date with Redis. Called
+        with the entity's lock held.
+
+        Args:
+            redis (any): Redis instance.
+            entity (str): Entity associated with the rules.
+
+        Returns:
+            Ruleset: Indexed filters of the entity's rules.
+        """
+        with timed(REDIS_SECONDS, 'load_stamp'), span('redis.load_stamp'):
+            epoch, version = redis.mget(cls.__epoch_key(), 
+                                        cls.__version_key(entity))
+        if epoch is None:
+            return Ruleset(cls.__operations_list, 
+                           observer=cls.__metrics.observe_rule)
+        stamp = (epoch, version)
+        cached_stamp, ruleset = cls.__filter_cache.get_ruleset(entity)
+        if ruleset is not None and cached_stamp == stamp:
+            cls.__filter_cache.set_ruleset(entity, stamp, ruleset)
+            return ruleset
+        if ruleset is None or cached_stamp[0] != epoch:
+            ruleset = Ruleset(cls.__operations_list, 
+                              observer=cls.__metrics.observe_rule)
+        
+        with timed(REDIS_SECONDS, 'load_versions'), \
+                span('redis.load_versions'):
+            versions = {
+                rule_id.decode('utf-8'): rule_version.decode('utf-8')
+                for rule_id, rule_version in redis.hgetall(
+                    cls.__versions_key(entity)).items()
+            }
+        current_versions = ruleset.versions()
+        for rule_id in current_versions.keys() - versions.keys():
+            ruleset.remove(rule_id)
+        changed = [rule_id for rule_id, rule_version in versions.items()
+                   if current_versions.get(rule_id) != rule_version]
+        filters = {
+            rule_id: cls.__filter_cache.get(rule_id, versions[rule_id])
+            for rule_id in changed
+        }
+        missing = [rule_id for rule_id, func in filters.items() if func is None]
+        if missing:
+            with timed(REDIS_SECONDS, 'load_filters'), \
+                    span('redis.load_filters', rules=len(missing)):
+                rule_filters = redis.hmget(cls.__index_key(entity), missing)
+            for rule_id, rule_filter in zip(missing, rule_filters):
+                if rule_filter is None:
+                    # Removed after the versions were read
+                    del filters[rule_id]
+                    ruleset.remove(rule_id)
+                    continue
+                with span('filter.compile', rule_id=rule_id):
+                    func = cls.__try_compile_filter(rule_id, rule_filter)
+                if func is None:
+                    del filters[rule_id]
+                    ruleset.remove(rule_id)
+                    continue
+                filters[rule_id] = func
+                cls.__filter_cache.put(rule_id, versions[rule_id], func)
+        
+        for rule_id, func in filters.items():
+            ruleset.add(rule_id, func, versions[rule_id])
+        cls.__filter_cache.set_ruleset(entity, stamp, ruleset)
+        return ruleset
+    
+    
+    @classmethod
+    def __try_compile_filter(cls, rule_id:str, rule_filter:bytes):
+        """Compiles a cached rule filter, logging the rules that can't be
+        compiled instead of failing the whole ruleset.
+
+        Args:
+            rule_id (str): ID of the rule.
+            rule_filter (bytes): Serialized rule filter.
+
+        Returns:
+            Callable: The rule's compiled filter, None if it can't be compiled.
+        """
+        try:
+            return cls.__compile_filter(rule_filter)
+        except Exception as e:
+            logger.error(f"[RULE FILTER EXCEPTION]: 'Rule {rule_id} skipped: {str(e)}'")
+            return None
+    
+    
+    @classmethod
+    def __compile_filter(cls, rule_filter:bytes):
+        """Compiles a cached rule filter into a callable.
+
+        Filters are decoded from the `filter_codec` format. Filters cached
+        before it existed are pickles, of either the entity and filters or
+        the Python source of an `exec_filter` function, and are still loaded
+        while `RULES_FILTER_READ_LEGACY` is enabled.
+
+        Args:
+            rule_filter (bytes): Serialized rule filter.
+
+        Raises:
+            InvalidFilterFormatException: If the filter is a legacy pickle and
+                                          legacy filters are disabled.
+
+        Returns:
+            Callable: The rule's compiled filter.
+        """
+        if filter_codec.is_encoded(rule_filter):
+            return FilterCompiler.compile(*filter_codec.decode(rule_filter))
+        if not FILTER_READ_LEGACY:
+            raise InvalidFilterFormatException()
+        func = pickle.loads(rule_filter)
+        if isinstance(func, dict):
+            return FilterCompiler.compile(func.get('entity'), 
+                                          func.get('filters'))
+        filter_space={}
+        exec(func, filter_space)
+        return filter_space['exec_filter']
+    
     @classmethod
     def prepare_filter(cls, filters:list) -> list:
         """Prepares and validates a list of filters for rule application.
@@ -84,6 +314,11 @@ class RuleEngine:
         for _filter in filters:
             if _filter.get('key') == None:
                 raise MissingRuleKeyException()
+            if is_path(_filter.get('key')):
+                try:
+                    parse_path(_filter.get('key'))
+                except ValueError as e:
+                    raise InvalidRuleKeyException(_filter.get('key'), str(e))
             if _filter.get('operation') not in cls.__operations_list: 
                 raise InvalidFilterOperationException(list(cls.__operations_list))
             _filter_list.append(cls.__validade_rule_fields(_filter))
@@ -160,10 +395,18 @@ class RuleEngine:
         """
         redis = redis_instance or get_redis_instance()
         if rule.enabled:
-            pickled_filter = cls.get_pickled_filter(rule)
-            redis.set(f"rule_filter#{rule.entity}#{rule.id}", pickled_filter)
+            pickled_filter = cls.get_serialized_filter(rule)
+            pipeline = redis.pipeline()
+            pipeline.set(cls.__filter_key(rule.entity, rule.id), pickled_filter)
+            version = cls.__index_filter(pipeline, rule.entity, rule.id, 
+                                         pickled_filter)
+            pipeline.incr(cls.__version_key(rule.entity))
+            pipeline.get(cls.__epoch_key())
+            *_, sequence, epoch = pipeline.execute()
+            cls.__publish_invalidation(redis, rule.entity, rule.id, version,
+                                       epoch, sequence)
         else:
-            cls.delete_function_cache(rule)
+            cls.delete_function_cache(rule, redis)
         
         
     @classmethod
@@ -175,13 +418,432 @@ class RuleEngine:
             redis_instance (any): Pre initiated redis instance (optional)
         """
         redis = redis_instance or get_redis_instance()
-        redis.delete(f"rule_filter#{rule.entity}#{rule.id}")
+        pipeline = redis.pipeline()
+        pipeline.delete(cls.__filter_key(rule.entity, rule.id))
+        pipeline.hdel(cls.__index_key(rule.entity), rule.id)
+        pipeline.hdel(cls.__versions_key(rule.entity), rule.id)
+        pipeline.incr(cls.__version_key(rule.entity))
+        pipeline.get(cls.__epoch_key())
+        *_, sequence, epoch = pipeline.execute()
+        cls.__publish_invalidation(redis, rule.entity, rule.id, None,
+                                   epoch, sequence)
+        
+        
+    @classmethod
+    def get_rule_metrics(cls, rule:Rule, redis_instance = None) -> dict:
+        """Returns the metrics of a rule flushed to Redis by every process,
+        after flushing the ones of this process.
+
+        Args:
+            rule (Rule): Rule of the metrics.
+            redis_instance (any): Pre initiated redis instance (optional)
+
+        Returns:
+            dict: Match rate, evaluation latency and actions of the rule.
+        """
+        redis = redis_instance or get_redis_instance()
+        cls.__metrics.flush(redis)
+        return Metrics.read_rule(rule.id, rule.entity, redis)
+    
+    
+    @classmethod
+    def get_rule_stats(cls, rule:Rule, redis_instance = None) -> Optional[dict]:
+        """Returns how often each predicate of a rule passed and how long it
+        took in this process, in the order they are evaluated.
+
+        Args:
+            rule (Rule): Rule of the stats.
+            redis_instance (any): Pre initiated redis instance (optional)
+
+        Returns:
+            dict: Version and predicates stats of the rule, or None if the
+                  rule isn't loaded.
+        """
+        redis = redis_instance or get_redis_instance()
+        return cls.__load_ruleset(redis, rule.entity).stats(rule.id)
+    
+    
+    @classmethod
+    def start_invalidation_listener(cls, redis_instance = None) -> InvalidationListener:
+        """Subscribes this process to the rule invalidation messages, so the
+        rulesets it holds are updated without reading the version stamp on
+        every event.
+
+        Args:
+            redis_instance (any): Pre initiated redis instance (optional)
+
+        Returns:
+            InvalidationListener: Running listener.
+        """
+        if cls.__invalidation_listener is None:
+            cls.__invalidation_listener = InvalidationListener(
+                cls.apply_invalidation,
+                cls.__reset_caches,
+                redis_instance=redis_instance
+            ).start()
+        return cls.__invalidation_listener
+    
+    
+    @classmethod
+    def __reset_caches(cls) -> None:
+        """Makes the cached rulesets resync and drops the cached actions, after
+        invalidation messages may have been missed."""
+        cls.__filter_cache.drop_ruleset()
+        cls.__action_cache.clear()
+    
+    
+    @classmethod
+    def stop_invalidation_listener(cls) -> None:
+        """Stops the invalidation listener of this process."""
+        listener, cls.__invalidation_listener = cls.__invalidation_listener, None
+        if listener is not None:
+            listener.stop()
+    
+    
+    @classmethod
+    def shutdown(cls) -> None:
+        """Releases what the actions of this process hold before it exits:
+        sends the held emails, flushes the pending metrics and stops the
+        fulfillment workers. They start again if actions are executed after.
+        """
+        for name, stop in (('email', close_email_dispatcher),
+                           ('metrics', cls.__metrics.stop),
+                           ('fulfillment', cls.__fulfillment_pool.shutdown)):
+            try:
+                stop()
+            except Exception as e:
+                logger.error(f"[SHUTDOWN EXCEPTION]: '{name}: {str(e)}'")
+    
+    
+    @classmethod
+    def apply_invalidation(cls, message:dict, redis_instance = None) -> None:
+        """Applies a rule invalidation message to the cached ruleset of its
+        entity, recompiling or removing only the changed rule.
+
+        When the message doesn't directly follow the cached version stamp
+        (a missed message or another Redis), the ruleset is marked to be
+        checked against Redis on its next load instead. Messages of changed
+        actions (type 'actions') drop them from the actions cache.
+
+        Args:
+            message (dict): Entity, rule ID, rule version, epoch and sequence
+                            of the change.
+            redis_instance (any): Pre initiated redis instance (optional)
+        """
+        if message.get('type') == 'actions':
+            cls.__drop_actions(message.get('rule_id'), message.get('action_id'))
+            return
+        with cls.__filter_cache.lock(message.get('entity')):
+            cls.__apply_rule_change(message, redis_instance)
+    
+    
+    @classmethod
+    def __apply_rule_change(cls, message:dict, redis_instance = None) -> None:
+        """Applies the change of a rule to the cached ruleset of its entity.
+        Called with the entity's lock held.
+
+        Args:
+            message (dict): Entity, rule ID, rule version, epoch and sequence
+                            of the change.
+            redis_instance (any): Pre initiated redis instance (optional)
+        """
+        entity = message.get('entity')
+        stamp, ruleset = cls.__filter_cache.get_ruleset(entity)
+        if ruleset is None or stamp is None:
+            return
+        if message.get('rule_id') is None:
+            # Whole entity changed, e.g. by `build_rule_index`
+            cls.__filter_cache.drop_ruleset(entity)
+            return
+        epoch, sequence = stamp
+        if epoch is None or epoch.decode('utf-8') != message.get('epoch') or \
+                sequence is None:
+            cls.__filter_cache.drop_ruleset(entity)
+            return
+        if int(sequence) >= message.get('sequence'):
+            # Already loaded together with the version stamp
+            return
+        if int(sequence) + 1 != message.get('sequence'):
+            cls.__filter_cache.drop_ruleset(entity)
+            return
+        
+        rule_id, version = message.get('rule_id'), message.get('version')
+        if version is None:
+            ruleset.remove(rule_id)
+        else:
+            rule_filter = cls.__filter_cache.get(rule_id, version)
+            if rule_filter is None:
+                redis = redis_instance or get_redis_instance()
+                serialized = redis.hget(cls.__index_key(entity), rule_id)
+                if serialized is None or \
+                        cls.__filter_version(serialized) != version:
+                    # Changed again since the message was published
+                    cls.__filter_cache.drop_ruleset(entity)
+                    return
+                rule_filter = cls.__try_compile_filter(rule_id, serialized)
+                if rule_filter is not None:
+                    cls.__filter_cache.put(rule_id, version, rule_filter)
+            if rule_filter is None:
+                ruleset.remove(rule_id)
+            else:
+                ruleset.add(rule_id, rule_filter, version)
+        cls.__filter_cache.set_ruleset(
+            entity, (epoch, str(message.get('sequence')).encode()), ruleset
+        )
+    
+    
+    @classmethod
+    def __get_invalidation_listener(cls) -> InvalidationListener:
+        """Returns the invalidation listener, starting it when
+        `RULES_CACHE_INVALIDATION` is 'pubsub'."""
+        if cls.__invalidation_listener is None and CACHE_INVALIDATION == 'pubsub':
+            cls.start_invalidation_listener()
+        return cls.__invalidation_listener
+    
+    
+    @classmethod
+    def __publish_invalidation(cls, redis, entity:str, rule_id:str, 
+                               version:str, epoch:bytes, sequence:int) -> None:
+        """Publishes the change of a rule to the other processes."""
+        publish_invalidation(redis, {
+            'entity': entity,
+            'rule_id': rule_id,
+            'version': version,
+            'epoch': epoch.decode('utf-8') if epoch else None,
+            'sequence': sequence
+        })
+    
+    
+    @classmethod
+    def build_rule_index(cls, redis_instance = None, batch_size:int = 500) -> int:
+        """Builds the per-entity rule indexes from the existing
+        `rule_filter#{entity}#{id}` keys.
+
+        The keyspace is walked with `SCAN`, so Redis is never blocked the way
+        a `KEYS` call would block it.
+
+        Args:
+            redis_instance (any): Pre initiated redis instance (optional)
+            batch_size (int): Number of keys read and written per round trip.
+
+        Returns:
+            int: Number of rules indexed.
+        """
+        redis = redis_instance or get_redis_instance()
+        indexed = 0
+        entities = set()
+        batch = []
+        for key in redis.scan_iter(match="rule_filter#*", count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                indexed += cls.__index_filter_keys(redis, batch, entities)
+                batch = []
+        if batch:
+            indexed += cls.__index_filter_keys(redis, batch, entities)
+        
+        pipeline = redis.pipeline()
+        for entity in entities:
+            pipeline.incr(cls.__version_key(entity))
+        pipeline.get(cls.__epoch_key())
+        *sequences, epoch = pipeline.execute()
+        for entity, sequence in zip(entities, sequences):
+            cls.__publish_invalidation(redis, entity, None, None, epoch, sequence)
+        return indexed
+    
+    
+    @classmethod
+    def rebuild_rule_cache(cls, rules:Iterable, redis_instance = None,
+                           chunk_size:int = 1000, prune:bool = False,
+                           progress:Callable = None) -> dict:
+        """Writes the filters of a stream of rules to Redis, e.g. after Redis
+        was flushed or replaced.
+
+        Each rule is compiled before being written, so invalid filters are
+        reported and skipped. Filters are written with one pipeline per
+        chunk of rules.
+
+        Args:
+            rules (Iterable): Enabled rules, or rows with `id`, `entity` and
+                              `filters`.
+            redis_instance (any): Pre initiated redis instance (optional)
+            chunk_size (int): Number of rules written per Redis round trip.
+            prune (bool): Removes the cached rules that weren't written.
+            progress (Callable): Called with the number of rules processed
+                                 after each chunk (optional).
+
+        Returns:
+            dict: Number of rules 'written', 'failed' and 'pruned'.
+        """
+        redis = redis_instance or get_redis_instance()
+        result = {'written': 0, 'failed': 0, 'pruned': 0}
+        written = {}
+        pipeline = redis.pipeline(transaction=False)
+        pending = 0
+        for rule in rules:
+            try:
+                FilterCompiler.compile(rule.entity, rule.filters or [])
+            except Exception as e:
+                logger.error(f"[RULE CACHE EXCEPTION]: 'Rule {rule.id}: {str(e)}'")
+                result['failed'] += 1
+                continue
+            serialized = cls.get_serialized_filter(rule)
+            pipeline.set(cls.__filter_key(rule.entity, rule.id), serialized)
+            cls.__index_filter(pipeline, rule.entity, rule.id, serialized)
+            written.setdefault(rule.entity, set()).add(rule.id)
+            result['written'] += 1
+            pending += 1
+            if pending >= chunk_size:
+                pipeline.execute()
+                pending = 0
+                if progress:
+                    progress(result['written'] + result['failed'])
+        pipeline.execute()
+        
+        entities = set(written)
+        if prune:
+            for key in redis.scan_iter(match="rule_versions#*", count=chunk_size):
+                if isinstance(key, bytes):
+                    key = key.decode('utf-8')
+                entity = key.split("#", 1)[1]
+                stale = [rule_id.decode('utf-8') for rule_id in redis.hkeys(key)
+                         if rule_id.decode('utf-8') not in written.get(entity, ())]
+                for start in range(0, len(stale), chunk_size):
+                    chunk = stale[start:start + chunk_size]
+                    pipeline.delete(*[cls.__filter_key(entity, rule_id) 
+                                      for rule_id in chunk])
+                    pipeline.hdel(cls.__index_key(entity), *chunk)
+                    pipeline.hdel(cls.__versions_key(entity), *chunk)
+                    pipeline.execute()
+                if stale:
+                    entities.add(entity)
+                    result['pruned'] += len(stale)
+        
+        entities = list(entities)
+        for entity in entities:
+            pipeline.incr(cls.__version_key(entity))
+        pipeline.get(cls.__epoch_key())
+        *sequences, epoch = pipeline.execute()
+        for entity, sequence in zip(entities, sequences):
+            cls.__publish_invalidation(redis, entity, None, None, epoch, sequence)
+        if progress:
+            progress(result['written'] + result['failed'])
+        return result
+    
+    
+    @classmethod
+    def __index_filter_keys(cls, redis, keys:list, entities:set) -> int:
+        """Copies a batch of `rule_filter#{entity}#{id}` keys into their
+        entity index.
+
+        Args:
+            redis (any): Redis instance.
+            keys (list): Batch of rule filter keys.
+            entities (set): Set updated with the entities found in the batch.
+
+        Returns:
+            int: Number of rules indexed.
+        """
+        indexed = 0
+        pipeline = redis.pipeline()
+        for key, rule_filter in zip(keys, redis.mget(keys)):
+            if rule_filter is None:
+                continue
+            if isinstance(key, bytes):
+                key = key.decode('utf-8')
+            entity, rule_id = key.split("#", 1)[1].rsplit("#", 1)
+            cls.__index_filter(pipeline, entity, rule_id, rule_filter)
+            entities.add(entity)
+            indexed += 1
+        pipeline.execute()
+        return indexed
+    
+    
+    @classmethod
+    def __index_filter(cls, pipeline, entity:str, rule_id:str, 
+                       rule_filter:bytes) -> None:
+        """Queues the commands that add a rule filter to its entity index.
+
+        The rule version is a digest of the filter, so processes that already
+        compiled the same filter keep using it.
+
+        Args:
+            pipeline (any): Redis pipeline.
+            entity (str): Entity associated with the rule.
+            rule_id (str): ID of the rule.
+            rule_filter (bytes): Pickled filter function.
+
+        Returns:
+            str: Version of the rule.
+        """
+        version = cls.__filter_version(rule_filter)
+        pipeline.set(cls.__epoch_key(), str(uuid.uuid4()), nx=True)
+        pipeline.hset(cls.__index_key(entity), rule_id, rule_filter)
+        pipeline.hset(cls.__versions_key(entity), rule_id, version)
+        return version
+    
+    
+    @classmethod
+    def __filter_version(cls, rule_filter:bytes) -> str:
+        """Returns the version of a serialized filter."""
+        return hashlib.blake2b(rule_filter, digest_size=8).hexdigest()
+    
+    
+    @classmethod
+    def __filter_key(cls, entity:str, rule_id:str) -> str:
+        """Returns the Redis key holding the filter of a single rule."""
+        return f"rule_filter#{entity}#{rule_id}"
+    
+    
+    @classmethod
+    def __index_key(cls, entity:str) -> str:
+        """Returns the Redis key of the hash indexing an entity's filters."""
+        return f"rule_index#{entity}"
+    
+    
+    @classmethod
+    def __version_key(cls, entity:str) -> str:
+        """Returns the Redis key of the version counter of an entity's index."""
+        return f"rule_index_version#{entity}"
+    
+    
+    @classmethod
+    def __versions_key(cls, entity:str) -> str:
+        """Returns the Redis key of the hash holding each rule's version."""
+        return f"rule_versions#{entity}"
+    
+    
+    @classmethod
+    def __epoch_key(cls) -> str:
+        """Returns the Redis key identifying the current rule indexes.
+
+        It is created together with the first indexed rule, so a flushed or
+        replaced Redis never matches the version stamps cached in memory.
+        """
+        return "rule_index_epoch"
             
                 
+    @classmethod
+    def get_serialized_filter(cls, rule: Rule) -> bytes:
+        """Serializes the rule's entity and validated filters with
+        `filter_codec`. They are compiled by `FilterCompiler` when the rule
+        is loaded.
+
+        Args:
+            rule (Rule): Rule to be serialized.
+
+        Returns:
+            bytes: Serialized rule filter.
+        """
+        return filter_codec.encode(rule.entity, rule.filters)
+    
+    
     @classmethod
     def get_pickled_filter(cls, rule: Rule):
         """Generates a Pickle object for the rule's filter function.
 
+        This is the legacy format, which has to be loaded with `exec`. New
+        cache entries are written with `get_serialized_filter`.
+
         Args:
             rule (Rule): Rule for which the filter function will be generated.
 
@@ -191,7 +853,7 @@ class RuleEngine:
         function = f"""
 def exec_filter(event:any, entity:str) -> bool:
     return (
-        entity == '{rule.entity}' and
+        entity == {rule.entity!r} and
         (
             {cls.generate_custom_filters_conditions(rule.filters)}
         )
@@ -213,50 +875,228 @@ def exec_filter(event:any, entity:str) -> bool:
         for _filter in rule_filters:
             if filters != "":
                 filters = f'{filters} and '
-            key = _filter.get('key')
+            key = repr(str(_filter.get('key')))
+            value = repr(str(_filter.get('value')))
 
             if _filter.get('operation') == 'is':
-                filters = f"{filters}event.data.get('{key}') == '{_filter.get('value')}'"
+                filters = f"{filters}event.data.get({key}) == {value}"
             elif _filter.get('operation') == 'is_not':
-                filters = f"{filters}event.data.get('{key}') != '{_filter.get('value')}'"
+                filters = f"{filters}event.data.get({key}) != {value}"
             elif _filter.get('operation') == 'is_empty':
-                filters = f"{filters} not event.data.get('{key}')"
+                filters = f"{filters} not event.data.get({key})"
             elif _filter.get('operation') == 'is_not_empty':
-                filters = f"{filters}event.data.get('{key}') != ''"
+                filters = f"{filters}event.data.get({key}) != ''"
             elif _filter.get('operation') == 'contains':
-                filters = f"{filters}'{_filter.get('value')}' in event.data.get('{key}')"
+                filters = f"{filters}{value} in event.data.get({key})"
             elif _filter.get('operation') == 'does_not_contain':
-                filters = f"{filters}'{_filter.get('value')}' not in event.data.get('{key}')"
+                filters = f"{filters}{value} not in event.data.get({key})"
             elif _filter.get('operation') == 'starts_with':
-                filters = f"{filters}event.data.get('{key}').startswith('{_filter.get('value')}')"
+                filters = f"{filters}event.data.get({key}).startswith({value})"
             elif _filter.get('operation') == 'ends_with':
-                filters = f"{filters}event.data.get('{key}').endswith('{_filter.get('value')}')"
+                filters = f"{filters}event.data.get({key}).endswith({value})"
 
         return filters if filters != "" else "True"
     
     
     @classmethod
-    def __exec_rule_actions(cls, rule_id:str, data:dict) -> None:
-        """Executes the actions associated with a rule.
+    def get_action_queue(cls) -> ActionQueue:
+        """Returns the queue executing the actions of the triggered rules.
+
+        Returns:
+            ActionQueue: Action queue of the process.
+        """
+        if cls.__action_queue is None:
+            cls.__action_queue = ActionQueue(cls.execute_job)
+        return cls.__action_queue
+    
+    
+    @classmethod
+    def invalidate_actions_cache(cls, rule_id:str = None, 
+                                 action_id:str = None, 
+                                 redis_instance = None) -> None:
+        """Drops a rule or an action from the in-memory actions cache, so the
+        next trigger reads it from the database.
+
+        The change is also published on the invalidation channel, so the
+        action workers, which execute the actions with their own cache, drop
+        it as well.
 
         Args:
-            rule_id (str): ID of the rule.
-            data (dict): Data of the event.
+            rule_id (str): ID of the changed rule (optional)
+            action_id (str): ID of the changed action (optional)
+            redis_instance (any): Pre initiated redis instance (optional)
         """
-        session = Session()
-        rule = session.query(Rule).get(rule_id)
+        cls.__drop_actions(rule_id, action_id)
+        publish_invalidation(redis_instance or get_redis_instance(), {
+            'type': 'actions',
+            'rule_id': rule_id,
+            'action_id': action_id
+        })
+    
+    
+    @classmethod
+    def __drop_actions(cls, rule_id:str = None, action_id:str = None) -> None:
+        """Drops a rule or an action from the actions cache of this process."""
+        if rule_id:
+            cls.__action_cache.invalidate_rule(rule_id)
+        if action_id:
+            cls.__action_cache.invalidate_action(action_id)
+    
+    
+    @classmethod
+    def __dispatch_actions(cls, events:list, entity:str, results:List[list],
+                           redis) -> None:
+        """Enqueues one job per event with the actions of its triggered rules.
+
+        Args:
+            events (list): Processed events.
+            entity (str): Entity associated with the events.
+            results (List[list]): List of triggered rules ID of each event.
+            redis (any): Redis instance.
+        """
+        rules_ids = {rule_id for rules_triggered in results 
+                     for rule_id in rules_triggered}
+        if not rules_ids:
+            return
+        rule_actions = cls.__action_cache.get_rules_actions(rules_ids)
+        
+        jobs = []
+        for event, rules_triggered in zip(events, results):
+            actions = cls.__plan_actions(rules_triggered, rule_actions)
+            if actions:
+                jobs.append({
+                    'entity': entity,
+                    'event': {'id': getattr(event, 'id', None), 'data': event.data},
+                    'actions': actions
+                })
+        with timed(REDIS_SECONDS, 'enqueue_actions'), \
+                span('redis.enqueue_actions', jobs=len(jobs)):
+            cls.get_action_queue().enqueue(jobs, redis)
+    
+    
+    @classmethod
+    def __plan_actions(cls, rules_triggered:list, rule_actions:dict) -> list:
+        """Builds the execution plan of the actions triggered by an event.
+
+        Each item is a `[rule_id, action_id]` pair. When deduplication is
+        enabled (`RULES_ACTION_DEDUPE`), an action referenced by several
+        triggered rules appears once, as `[[rule_id, ...], action_id]` holding
+        every rule it runs for.
+
+        Args:
+            rules_triggered (list): ID of the rules triggered by the event.
+            rule_actions (dict): Actions of each rule.
+
+        Returns:
+            list: Actions to be executed for the event.
+        """
+        pairs = [[rule_id, rule_action.id] for rule_id in rules_triggered
+                 for rule_action in rule_actions.get(rule_id, [])]
+        if not cls.__dedupe_actions:
+            return pairs
+        
+        plan = {}
+        for rule_id, action_id in pairs:
+            rules_ids = plan.setdefault(action_id, [])
+            if rule_id not in rules_ids:
+                rules_ids.append(rule_id)
+        return [[rules_ids, action_id] for action_id, rules_ids in plan.items()]
+    
+    
+    @classmethod
+    def execute_job(cls, job:dict) -> list:
+        """Executes the actions of a job enqueued by `process_event`.
+
+        The actions run concurrently, bounded by the global and per event caps
+        (`RULES_ACTION_FANOUT_WORKERS` and `RULES_ACTION_FANOUT_PER_EVENT`).
+        Actions are resolved again from the rules of the plan, so an action
+        removed from its rule, or whose rule was deleted, after the job was
+        enqueued is skipped.
+
+        Args:
+            job (dict): Event and the plan of actions it triggered.
+
+        Returns:
+            list: List of executed actions ID.
+        """
+        event = SimpleNamespace(**job.get('event'))
+        with trace('job', SLOW_TRACE_THRESHOLD / 1000, 
+                   entity=job.get('entity'), event_id=getattr(event, 'id', None)):
+            plan = [([rules_ids] if isinstance(rules_ids, str) else rules_ids,
+                     action_id)
+                    for rules_ids, action_id in job.get('actions')]
+            rules_actions = cls.__action_cache.get_rules_actions(
+                rule_id for rules_ids, _ in plan for rule_id in rules_ids
+            )
+            current = {}
+            for rule_id, rule_actions in rules_actions.items():
+                for rule_action in rule_actions:
+                    current[(rule_id, rule_action.id)] = rule_action
+            pending = []
+            for rules_ids, action_id in plan:
+                triggered_by = [rule_id for rule_id in rules_ids
+                                if (rule_id, action_id) in current]
+                if triggered_by:
+                    pending.append((triggered_by, 
+                                    current[(triggered_by[0], action_id)]))
+            results = cls.__fanout.map(
+                lambda item: cls.__perform_measured_action(*item, event),
+                pending
+            )
+        
         actions_executed = []
-        if rule and len(rule.actions) > 0:
-            rule_actions = session.query(RuleAction).filter(
-                RuleAction.id.in_(rule.actions)    
-            ).all()
-            for action in rule_actions:
-                action_id = cls.__perform_action(action, data)
-                if action_id:
-                    actions_executed.append(action_id)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"[RULE ACTION EXCEPTION]: '{str(result)}'")
+            elif result:
+                actions_executed.append(result)
         return actions_executed
             
                 
+    @classmethod
+    def __perform_measured_action(cls, rules_ids, rule_action:RuleAction, 
+                                  data:dict):
+        """Executes an action, recording its result and latency in the
+        metrics of the action type and of the rules that triggered it.
+
+        Args:
+            rules_ids (str or list): Rule or rules the action runs for.
+            rule_action (RuleAction): Action to be executed.
+            data (dict): Data of the event.
+        """
+        if isinstance(rules_ids, str):
+            rules_ids = [rules_ids]
+        action = getattr(rule_action.action, 'value', rule_action.action)
+        started_at = time.perf_counter_ns()
+        try:
+            with span(f"action.{action}", action_id=rule_action.id):
+                result = cls.__perform_action(rule_action, data)
+        except Exception:
+            cls.__observe_action(action, rules_ids, 'error', started_at)
+            raise
+        cls.__observe_action(action, rules_ids, 
+                             'success' if result else 'failure', started_at)
+        return result
+    
+    
+    @classmethod
+    def __observe_action(cls, action:str, rules_ids:list, result:str,
+                         started_at:int) -> None:
+        """Records the result and latency of an executed action.
+
+        Args:
+            action (str): Type of the action.
+            rules_ids (list): Rules the action ran for.
+            result (str): 'success', 'failure' or 'error'.
+            started_at (int): `perf_counter_ns` when the action started.
+        """
+        elapsed_ns = time.perf_counter_ns() - started_at
+        cls.__metrics.observe_action(action, rules_ids, result == 'success',
+                                     elapsed_ns)
+        ACTIONS.inc(action, result)
+        ACTION_SECONDS.observe(elapsed_ns / 1e9, action)
+    
+    
     @classmethod 
     def __perform_action(cls, rule_action:RuleAction, data:dict) -> None:
         """Executes a specific action.
@@ -286,10 +1126,9 @@ def exec_filter(event:any, entity:str) -> bool:
             None
         """
         try:
-            response = requests.post(
+            response = get_http_client().post(
                 rule_action.data,
-                json=event_data.data,
-                timeout=15
+                json=event_data.data
             )
             response.raise_for_status()
             logger.error(f"[WEBHOOK ACTION]: 'Success requested for: {rule_action.data}'")
@@ -300,31 +1139,46 @@ def exec_filter(event:any, entity:str) -> bool:
     
     @classmethod
     def __exec_email_action(cls, rule_action:RuleAction, event_data:dict):
-        """Executes an email action.
+        """Executes an email action. The email is held by the email dispatcher
+        and sent in the next batch of its recipient.
 
         Args:
             rule_action (RuleAction): Email action to be executed.
             event_data (dict): Data of the event.
         """
-        # TODO: E-mail broker service should be implemented here.
-        logger.error(f"[EMAIL ACTION]: 'Email body: '{event_data.data}'")
-        logger.error(f"[EMAIL ACTION]: 'Sending e-mail for '{rule_action.data}'")
+        dispatcher = get_email_dispatcher()
+        if dispatcher is None:
+            logger.error(f"[EMAIL ACTION]: 'Email body: '{event_data.data}'")
+            logger.error(f"[EMAIL ACTION]: 'Sending e-mail for '{rule_action.data}'")
+            return rule_action.id
+        
+        subject = f"Rule action '{rule_action.name}' triggered"
+        body = json.dumps(event_data.data, indent=2, default=str)
+        for recipient in str(rule_action.data or '').split(','):
+            if recipient.strip():
+                dispatcher.submit(recipient.strip(), subject, body)
         return rule_action.id
         
     
     @classmethod
     def __exec_fulfillment_action(cls, rule_action:RuleAction, event_data:dict):
-        """Executes a fulfillment action.
+        """Executes a fulfillment action in the fulfillment worker processes.
 
         Args:
             rule_action (RuleAction): Fulfillment action to be executed.
             event_data (dict): Data of the event.
         """
         try:
-            data = event_data.data
-            # Event data can be used by the fulfillment script
-            exec(rule_action.data)
+            # Event data can be used by the fulfillment script as `data`
+            cls.__fulfillment_pool.run(rule_action.id, 
+                                       rule_action.data, 
+                                       event_data.data)
             logger.error(f"[FULFILLMENT ACTION]: 'Success executed'")
             return rule_action.id
         except Exception as e:
-            logger.error(f"[FULFILLMENT ACTION EXCEPTION]: '{str(e)}'")
\ No newline at end of file
+            logger.error(f"[FULFILLMENT ACTION EXCEPTION]: '{str(e)}'")
+
+
+REGISTRY.gauge_function(
+    'rules_action_queue_depth', 'Jobs waiting in the action queue.',
+    lambda: RuleEngine.get_action_queue().depth())
@@ -0,0 +1,657 @@
+import time
+import itertools
+import threading
+from typing import Callable, Iterator, List, Optional
+from rules_system.config.settings import (PREDICATE_STATS_SAMPLE,
+                                          PREDICATE_REORDER_INTERVAL,
+                                          PREDICATE_REORDER_MIN_SAMPLES)
+from rules_system.helpers import vectorized
+from rules_system.helpers.automaton import Automaton
+from rules_system.helpers.filter_compiler import CompiledFilter
+from rules_system.helpers.key_path import resolve_paths
+
+
+class Trie:
+    """Character trie mapping string values to the rules indexed by them."""
+
+    __slots__ = ('children', 'rules')
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.rules = {}
+
+
+    def insert(self, word:str, rule_id:str, entry:tuple) -> None:
+        """Indexes a rule by `word`.
+
+        Args:
+            word (str): Value of the rule's predicate.
+            rule_id (str): ID of the rule.
+            entry (tuple): Ruleset entry of the rule.
+        """
+        node = self
+        for char in word:
+            node = node.children.setdefault(char, Trie())
+        node.rules[rule_id] = entry
+
+
+    def remove(self, word:str, rule_id:str) -> None:
+        """Removes a rule indexed by `word`, pruning the emptied nodes.
+
+        Args:
+            word (str): Value of the rule's predicate.
+            rule_id (str): ID of the rule.
+        """
+        path = [self]
+        for char in word:
+            path.append(path[-1].children[char])
+        path[-1].rules.pop(rule_id, None)
+        for depth in range(len(word), 0, -1):
+            if path[depth].rules or path[depth].children:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+
+
+    def walk(self, text:str) -> Iterator[dict]:
+        """Yields the rules of every indexed word that is a prefix of `text`.
+
+        Args:
+            text (str): Value from the event.
+
+        Yields:
+            dict: Rules indexed by each matching word.
+        """
+        node = self
+        if node.rules:
+            yield node.rules
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                return
+            if node.rules:
+                yield node.rules
+
+
+    def is_empty(self) -> bool:
+        return not self.rules and not self.children
+
+
+class Ruleset:
+    """Compiled rules of an entity, indexed by their predicates.
+
+    Each rule is indexed by one of its predicates (its anchor), chosen by the
+    `index` declared for the predicate's operation in the operations list.
+    An event only evaluates the rules whose anchor is satisfied by it, and
+    only their remaining predicates, plus the fallback rules, which have no
+    indexable predicate.
+
+    Supported indexes, in order of preference for the anchor:
+        - equality: maps (key, value) pairs to the rules requiring them.
+        - prefix: a trie per key, walked over the event value.
+        - suffix: a trie per key built from the reversed values, walked
+          over the reversed event value.
+        - substring: an Aho-Corasick automaton per key holding the values of
+          every substring predicate, so each event value is scanned once and
+          both `contains` and its negated form are resolved from that scan.
+          Negated operations (`negate` in the operations list) are never
+          used as anchors.
+
+    Keys that are nested paths (`customer.address.country`) are resolved once
+    per event, before any index or predicate reads them, however many rules
+    use them.
+
+    Rules can be added and removed at any time; the indexes are updated in
+    place.
+
+    A sample of the evaluations records how often each predicate passes and
+    how long it takes. Periodically, the predicates evaluated after the
+    anchor are reordered by ascending cost per rejection, so the ones most
+    likely to reject an event cheaply run first. Filters are conjunctions of
+    side effect free predicates, so the order never changes the result.
+
+    Args:
+        operations (dict): Operations list of the rule engine.
+        stats_sample (int): One in `stats_sample` evaluations is recorded
+                            (0 disables the stats and the reordering).
+        reorder_interval (float): Seconds between reorderings.
+        min_samples (int): Samples a predicate needs to be ranked.
+        observer (Callable): Called with the rule ID, the result and the
+                             duration in nanoseconds of each sampled
+                             evaluation (optional).
+    """
+
+    __index_priority = ('equality', 'prefix', 'suffix', 'substring')
+
+    def __init__(self, operations:dict, 
+                 stats_sample:int = PREDICATE_STATS_SAMPLE,
+                 reorder_interval:float = PREDICATE_REORDER_INTERVAL,
+                 min_samples:int = PREDICATE_REORDER_MIN_SAMPLES,
+                 observer:Callable = None) -> None:
+        self.__operations = operations
+        self.__observer = observer
+        self.__stats_sample = stats_sample
+        self.__reorder_interval = reorder_interval
+        self.__min_samples = min_samples
+        self.__evaluations = itertools.count()
+        self.__reordered_at = time.monotonic()
+        self.__substring_operations = {
+            operation for operation, field_data in operations.items()
+            if field_data.get('index') == 'substring'
+        }
+        self.__negated_operations = {
+            operation for operation, field_data in operations.items()
+            if field_data.get('negate')
+        }
+        self.__lock = threading.RLock()
+        self.__rules = {}
+        self.__versions = {}
+        self.__anchors = {}
+        self.__equality = {}
+        self.__prefix = {}
+        self.__suffix = {}
+        self.__substring = {}
+        self.__automata = {}
+        self.__fallback = {}
+        self.__paths = {}
+        self.__path_rules = {}
+        self.__sequence = 0
+
+
+    def add(self, rule_id:str, rule_filter:Callable, version:str = None) -> None:
+        """Adds a compiled rule filter to the ruleset.
+
+        Args:
+            rule_id (str): ID of the rule.
+            rule_filter (Callable): Compiled filter of the rule.
+            version (str): Version of the rule (optional).
+        """
+        with self.__lock:
+            if rule_id in self.__rules:
+                self.remove(rule_id)
+            self.__sequence += 1
+            anchor = self.__find_anchor(rule_filter)
+            if not isinstance(rule_filter, CompiledFilter):
+                remaining = None
+            else:
+                remaining = [predicate for predicate in rule_filter.predicates
+                             if anchor is None or predicate is not anchor[1]]
+                for predicate in self.__substring_predicates(rule_filter):
+                    self.__automata.setdefault(predicate.key, Automaton()).add(
+                        str(predicate.value))
+                for predicate in self.__path_predicates(rule_filter):
+                    self.__paths[predicate.key] = predicate.path
+                    self.__path_rules[predicate.key] = \
+                        self.__path_rules.get(predicate.key, 0) + 1
+            entry = (self.__sequence, rule_id, rule_filter, remaining)
+            self.__rules[rule_id] = entry
+            self.__versions[rule_id] = version
+            self.__anchors[rule_id] = anchor
+            if anchor is None:
+                self.__fallback[rule_id] = entry
+                return
+            index, predicate = anchor
+            if index == 'equality':
+                values = self.__equality.setdefault(predicate.key, {})
+                values.setdefault(predicate.value, {})[rule_id] = entry
+            elif index == 'prefix':
+                trie = self.__prefix.setdefault(predicate.key, Trie())
+                trie.insert(str(predicate.value), rule_id, entry)
+            elif index == 'suffix':
+                trie = self.__suffix.setdefault(predicate.key, Trie())
+                trie.insert(str(predicate.value)[::-1], rule_id, entry)
+            elif index == 'substring':
+                needles = self.__substring.setdefault(predicate.key, {})
+                needles.setdefault(str(predicate.value), {})[rule_id] = entry
+
+
+    def remove(self, rule_id:str) -> None:
+        """Removes a rule from the ruleset.
+
+        Args:
+            rule_id (str): ID of the rule.
+        """
+        with self.__lock:
+            entry = self.__rules.pop(rule_id, None)
+            if entry is None:
+                return
+            del self.__versions[rule_id]
+            rule_filter = entry[2]
+            if isinstance(rule_filter, CompiledFilter):
+                for predicate in self.__substring_predicates(rule_filter):
+                    automaton = self.__automata[predicate.key]
+                    automaton.remove(str(predicate.value))
+                    if not len(automaton):
+                        del self.__automata[predicate.key]
+                for predicate in self.__path_predicates(rule_filter):
+                    self.__path_rules[predicate.key] -= 1
+                    if not self.__path_rules[predicate.key]:
+                        del self.__path_rules[predicate.key]
+                        del self.__paths[predicate.key]
+            anchor = self.__anchors.pop(rule_id)
+            if anchor is None:
+                del self.__fallback[rule_id]
+                return
+            index, predicate = anchor
+            if index in ('equality', 'substring'):
+                indexed = self.__equality if index == 'equality' else self.__substring
+                value = predicate.value if index == 'equality' else str(predicate.value)
+                values = indexed[predicate.key]
+                del values[value][rule_id]
+                if not values[value]:
+                    del values[value]
+                if not values:
+                    del indexed[predicate.key]
+            elif index in ('prefix', 'suffix'):
+                tries = self.__prefix if index == 'prefix' else self.__suffix
+                word = str(predicate.value)
+                tries[predicate.key].remove(
+                    word if index == 'prefix' else word[::-1], rule_id)
+                if tries[predicate.key].is_empty():
+                    del tries[predicate.key]
+
+
+    def versions(self) -> dict:
+        """Returns the version of every rule in the ruleset.
+
+        Returns:
+            dict: Versions by rule ID.
+        """
+        with self.__lock:
+            return dict(self.__versions)
+
+
+    def match(self, event:any, entity:str) -> List[str]:
+        """Returns the rules whose filters are satisfied by an event.
+
+        Args:
+            event (any): Event with a `data` attribute.
+            entity (str): Entity associated with the event.
+
+        Returns:
+            List[str]: IDs of the matched rules, in the order they were added.
+        """
+        with self.__lock:
+            if not self.__rules:
+                return []
+            data = resolve_paths(
+                event.data if isinstance(event.data, dict) else {}, 
+                self.__paths)
+            scans = {}
+            candidates = [(entry, False) for entry in self.__fallback.values()]
+            for key, values in self.__equality.items():
+                try:
+                    rules = values.get(data.get(key))
+                except TypeError:
+                    # Unhashable values never equal an indexed value
+                    continue
+                if rules:
+                    candidates.extend((entry, False) for entry in rules.values())
+            for key, trie in self.__prefix.items():
+                value = data.get(key)
+                if isinstance(value, str):
+                    for rules in trie.walk(value):
+                        candidates.extend((entry, False) for entry in rules.values())
+            for key, trie in self.__suffix.items():
+                value = data.get(key)
+                if isinstance(value, str):
+                    for rules in trie.walk(value[::-1]):
+                        candidates.extend((entry, False) for entry in rules.values())
+            for key, needles in self.__substring.items():
+                value = data.get(key)
+                if isinstance(value, str):
+                    for needle in self.__scan(key, value, scans):
+                        rules = needles.get(needle)
+                        if rules:
+                            candidates.extend((entry, False) for entry in rules.values())
+                elif value is not None:
+                    # Lists and other containers are not scanned, so the
+                    # anchor itself has to be evaluated
+                    for rules in needles.values():
+                        candidates.extend((entry, True) for entry in rules.values())
+
+            candidates.sort(key=lambda candidate: candidate[0][0])
+            matched = [entry[1] for entry, full in candidates
+                       if self.__evaluate(entry, full, event, entity, data, scans)]
+            if self.__stats_sample and \
+                    time.monotonic() - self.__reordered_at >= self.__reorder_interval:
+                self.reorder()
+            return matched
+
+
+    def reorder(self, min_samples:Optional[int] = None) -> int:
+        """Reorders the predicates of each rule by ascending cost per
+        rejection. Predicates without enough samples keep their relative
+        order after the ranked ones.
+
+        Args:
+            min_samples (int): Samples a predicate needs to be ranked
+                               (optional).
+
+        Returns:
+            int: Number of rules whose predicates were reordered.
+        """
+        min_samples = self.__min_samples if min_samples is None else min_samples
+        def rank(predicate) -> float:
+            if predicate.evaluations < max(min_samples, 1):
+                return float('inf')
+            return predicate.rank
+
+        reordered = 0
+        with self.__lock:
+            self.__reordered_at = time.monotonic()
+            for _, _, _, remaining in self.__rules.values():
+                if not remaining or len(remaining) < 2:
+                    continue
+                ordered = sorted(remaining, key=rank)
+                if any(a is not b for a, b in zip(ordered, remaining)):
+                    # Entries are shared by the indexes, so the list is 
+                    # updated in place
+                    remaining[:] = ordered
+                    reordered += 1
+        return reordered
+
+
+    def stats(self, rule_id:str) -> Optional[dict]:
+        """Returns the recorded evaluations of each predicate of a rule.
+
+        Args:
+            rule_id (str): ID of the rule.
+
+        Returns:
+            dict: Version and predicates of the rule in evaluation order, the
+                  anchor first, or None if the rule isn't in the ruleset.
+        """
+        with self.__lock:
+            entry = self.__rules.get(rule_id)
+            if entry is None:
+                return None
+            _, _, rule_filter, remaining = entry
+            anchor = self.__anchors.get(rule_id)
+            predicates = []
+            if anchor is not None:
+                predicates.append(dict(anchor[1].stats(), anchor=True))
+            for predicate in remaining or []:
+                predicates.append(dict(predicate.stats(), anchor=False))
+            return {'version': self.__versions.get(rule_id), 
+                    'predicates': predicates}
+
+
+    def match_batch(self, events:list, entity:str) -> List[List[str]]:
+        """Returns the rules whose filters are satisfied by each event of a
+        batch.
+
+        The event data is laid out as one column per key. Candidate rows of
+        each rule are found through the same indexes used by `match`, but
+        every distinct value of a column is looked up, walked or scanned only
+        once. The remaining predicates are then evaluated column-wise, and
+        each predicate shared by several rules is evaluated once per batch.
+
+        Args:
+            events (list): Events with a `data` attribute.
+            entity (str): Entity associated with the events.
+
+        Returns:
+            List[List[str]]: IDs of the matched rules of each event, in the
+                             same order `match` returns them.
+        """
+        results = [[] for _ in events]
+        with self.__lock:
+            if not self.__rules or not events:
+                return results
+            datas = [resolve_paths(
+                        event.data if isinstance(event.data, dict) else {}, 
+                        self.__paths)
+                     for event in events]
+            columns = {}
+            def column(key:str) -> vectorized.Column:
+                if key not in columns:
+                    columns[key] = vectorized.Column(
+                        [data.get(key) for data in datas])
+                return columns[key]
+
+            anchored, full = self.__batch_candidates(datas, column)
+            every_row = vectorized.all_rows(len(events))
+            masks = {}
+            for entry in sorted(self.__rules.values(), key=lambda entry: entry[0]):
+                _, rule_id, rule_filter, remaining = entry
+                if remaining is None:
+                    for row, event in enumerate(events):
+                        if rule_filter(event, entity):
+                            results[row].append(rule_id)
+                    continue
+                if entity != rule_filter.entity:
+                    continue
+                for rows, predicates in (
+                        (anchored.get(rule_id), remaining),
+                        (full.get(rule_id), rule_filter.predicates)):
+                    if rows is None:
+                        continue
+                    rows = every_row if rows is True else vectorized.as_rows(rows)
+                    for predicate in predicates:
+                        if not len(rows):
+                            break
+                        rows = vectorized.select(
+                            self.__batch_mask(predicate, column, masks), rows)
+                    for row in rows:
+                        results[row].append(rule_id)
+        return results
+
+
+    def __batch_candidates(self, datas:list, column:Callable) -> tuple:
+        """Finds the candidate rows of each rule of a batch.
+
+        Args:
+            datas (list): Data of each event.
+            column (Callable): Returns the column of a key.
+
+        Returns:
+            tuple: Rows whose anchor is satisfied and rows that must be
+                   evaluated with every predicate, both by rule ID. `True`
+                   stands for every row of the batch.
+        """
+        anchored = {rule_id: True for rule_id in self.__fallback}
+        full = {}
+        def add(candidates:dict, rules:dict, rows:list) -> None:
+            for rule_id in rules:
+                candidates.setdefault(rule_id, []).extend(rows)
+
+        for key, values in self.__equality.items():
+            for value, rows in self.__group_rows(column(key)).items():
+                rules = values.get(value)
+                if rules:
+                    add(anchored, rules, rows)
+        for tries, reverse in ((self.__prefix, False), (self.__suffix, True)):
+            for key, trie in tries.items():
+                for value, rows in self.__group_rows(column(key)).items():
+                    if isinstance(value, str):
+                        for rules in trie.walk(value[::-1] if reverse else value):
+                            add(anchored, rules, rows)
+        for key, needles in self.__substring.items():
+            for value, rows in self.__group_rows(column(key)).items():
+                if isinstance(value, str):
+                    for needle in self.__automata[key].scan(value):
+                        if needle in needles:
+                            add(anchored, needles[needle], rows)
+            others = [row for row, value in enumerate(column(key).values)
+                      if value is not None and not isinstance(value, str)]
+            if others:
+                for rules in needles.values():
+                    add(full, rules, others)
+        return anchored, full
+
+
+    def __group_rows(self, column:vectorized.Column) -> dict:
+        """Groups the rows of a column by value, skipping unhashable values.
+
+        Args:
+            column (Column): Column of a key.
+
+        Returns:
+            dict: Rows by value.
+        """
+        groups = {}
+        for row, value in enumerate(column.values):
+            try:
+                groups.setdefault(value, []).append(row)
+            except TypeError:
+                continue
+        return groups
+
+
+    def __batch_mask(self, predicate, column:Callable, masks:dict):
+        """Evaluates a predicate over the batch once, reusing the result for
+        every rule sharing the same predicate.
+
+        Args:
+            predicate (Predicate): Compiled predicate.
+            column (Callable): Returns the column of a key.
+            masks (dict): Masks already evaluated for the batch.
+
+        Returns:
+            Iterable[bool]: Result of the predicate for each row.
+        """
+        try:
+            mask_key = (predicate.key, predicate.operation, 
+                        type(predicate.value), predicate.value)
+            hash(mask_key)
+        except TypeError:
+            mask_key = id(predicate)
+        if mask_key not in masks:
+            masks[mask_key] = column(predicate.key).mask(predicate)
+        return masks[mask_key]
+
+
+    def __evaluate(self, entry:tuple, full:bool, event:any, entity:str, 
+                   data:dict, scans:dict) -> bool:
+        """Evaluates a candidate rule against an event.
+
+        Args:
+            entry (tuple): Ruleset entry of the rule.
+            full (bool): Whether the anchor has to be evaluated as well.
+            event (any): Event with a `data` attribute.
+            entity (str): Entity associated with the event.
+            data (dict): Data of the event.
+            scans (dict): Substring scans of the event, by key.
+
+        Returns:
+            bool: True if the rule is triggered by the event.
+        """
+        _, _, rule_filter, remaining = entry
+        if remaining is None:
+            return rule_filter(event, entity)
+        if entity != rule_filter.entity:
+            return False
+        if full:
+            return rule_filter.matches(data)
+        if self.__stats_sample and \
+                next(self.__evaluations) % self.__stats_sample == 0:
+            started_at = time.perf_counter_ns()
+            passed = self.__evaluate_sampled(remaining, data, scans)
+            if self.__observer is not None:
+                self.__observer(entry[1], passed, 
+                                time.perf_counter_ns() - started_at)
+            return passed
+        for predicate in remaining:
+            if predicate.operation in self.__substring_operations:
+                value = data.get(predicate.key)
+                if isinstance(value, str):
+                    found = str(predicate.value) in self.__scan(
+                        predicate.key, value, scans)
+                    if found == (predicate.operation in self.__negated_operations):
+                        return False
+                    continue
+            if not predicate(data):
+                return False
+        return True
+
+
+    def __evaluate_sampled(self, remaining:list, data:dict, 
+                           scans:dict) -> bool:
+        """Evaluates the predicates of a candidate rule like `__evaluate`,
+        recording the result and duration of each one.
+
+        Args:
+            remaining (list): Predicates of the rule, anchor excluded.
+            data (dict): Data of the event.
+            scans (dict): Substring scans of the event, by key.
+
+        Returns:
+            bool: True if the rule is triggered by the event.
+        """
+        for predicate in remaining:
+            started_at = time.perf_counter_ns()
+            value = data.get(predicate.key)
+            if predicate.operation in self.__substring_operations and \
+                    isinstance(value, str):
+                found = str(predicate.value) in self.__scan(
+                    predicate.key, value, scans)
+                passed = found != (predicate.operation in self.__negated_operations)
+            else:
+                passed = predicate(data)
+            predicate.record(passed, time.perf_counter_ns() - started_at)
+            if not passed:
+                return False
+        return True
+
+
+    def __scan(self, key:str, value:str, scans:dict) -> frozenset:
+        """Scans an event value once with the automaton of its key.
+
+        Args:
+            key (str): Key of the event data.
+            value (str): Value of the event data.
+            scans (dict): Substring scans of the event, by key.
+
+        Returns:
+            frozenset: Needles found in the value.
+        """
+        found = scans.get(key)
+        if found is None:
+            found = scans[key] = self.__automata[key].scan(value)
+        return found
+
+
+    def __substring_predicates(self, rule_filter:CompiledFilter) -> list:
+        """Returns the predicates of a rule resolved by substring scans."""
+        return [predicate for predicate in rule_filter.predicates
+                if predicate.operation in self.__substring_operations]
+
+
+    def __path_predicates(self, rule_filter:CompiledFilter) -> list:
+        """Returns the predicates of a rule whose key is a nested path."""
+        return [predicate for predicate in rule_filter.predicates
+                if predicate.path is not None]
+
+
+    def __find_anchor(self, rule_filter:Callable):
+        """Returns the index and predicate a rule is indexed by, if any.
+
+        Args:
+            rule_filter (Callable): Compiled filter of the rule.
+
+        Returns:
+            tuple: (index, predicate) pair or None for fallback rules.
+        """
+        if not isinstance(rule_filter, CompiledFilter):
+            return None
+        anchors = {}
+        for predicate in rule_filter.predicates:
+            field_data = self.__operations.get(predicate.operation, {})
+            index = field_data.get('index')
+            if (index not in self.__index_priority or index in anchors 
+                    or field_data.get('negate')):
+                continue
+            if index == 'equality':
+                try:
+                    hash(predicate.value)
+                except TypeError:
+                    continue
+            anchors[index] = predicate
+        for index in self.__index_priority:
+            if index in anchors:
+                return index, anchors[index]
+        return None
+
+
+    def __len__(self) -> int:
+        return len(self.__rules)
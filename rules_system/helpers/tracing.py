@@ -0,0 +1,178 @@
+"""Timing spans of a request or an action job.
+
+A trace is started per request by the tracing middleware (and per job by
+`RuleEngine.execute_job`). While it is active, `span` records a tree of timed
+blocks, such as database saves, Redis calls, filter evaluation and actions.
+Outside of a trace, `span` only reads a context variable.
+
+Span names are prefixed by their category (`db.save`, `redis.load_stamp`,
+`filter.match`, `action.webhook`), which groups them in the breakdown.
+"""
+import time
+import contextvars
+from typing import List, Optional
+from rules_system.logger import logger
+
+_current = contextvars.ContextVar('rules_span', default=None)
+
+
+class Span:
+    """Timed block of a trace.
+
+    Args:
+        name (str): Name of the span, prefixed by its category.
+        tags (dict): Details of the span (optional)
+    """
+
+    __slots__ = ('name', 'tags', 'started_at', 'duration', 'children')
+
+    def __init__(self, name:str, tags:dict = None) -> None:
+        self.name = name
+        self.tags = tags or {}
+        self.started_at = time.perf_counter()
+        self.duration = None
+        self.children = []
+
+
+    @property
+    def category(self) -> str:
+        return self.name.split('.', 1)[0]
+
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.started_at
+
+
+    def breakdown(self) -> dict:
+        """Returns the time spent in each category of the spans below this one,
+        in seconds. Spans nested in a span of the same category are not added
+        again.
+
+        Returns:
+            dict: Seconds by category.
+        """
+        totals = {}
+        def visit(span:Span, categories:frozenset) -> None:
+            for child in span.children:
+                category = child.category
+                if category not in categories and child.duration is not None:
+                    totals[category] = totals.get(category, 0) + child.duration
+                visit(child, categories | {category})
+        visit(self, frozenset())
+        return totals
+
+
+    def format(self, depth:int = 0) -> List[str]:
+        """Returns the span tree as indented lines.
+
+        Args:
+            depth (int): Indentation level of this span.
+
+        Returns:
+            List[str]: One line per span.
+        """
+        duration = (f"{self.duration * 1000:.2f}ms"
+                    if self.duration is not None else 'unfinished')
+        tags = ''.join(f" {key}={value}" for key, value in self.tags.items())
+        lines = [f"{'  ' * depth}{self.name} {duration}{tags}"]
+        for child in list(self.children):
+            lines.extend(child.format(depth + 1))
+        return lines
+
+
+class span:
+    """Records the enclosed block as a child of the current span. Does nothing
+    outside of a trace.
+
+    Args:
+        name (str): Name of the span, prefixed by its category.
+        **tags: Details of the span.
+    """
+
+    __slots__ = ('name', 'tags', 'span', 'token')
+
+    def __init__(self, name:str, **tags) -> None:
+        self.name = name
+        self.tags = tags
+        self.span = None
+
+
+    def __enter__(self) -> Optional[Span]:
+        parent = _current.get()
+        if parent is not None:
+            self.span = Span(self.name, self.tags)
+            # Spans of actions running concurrently share the parent
+            parent.children.append(self.span)
+            self.token = _current.set(self.span)
+        return self.span
+
+
+    def __exit__(self, *exc) -> None:
+        if self.span is not None:
+            self.span.finish()
+            _current.reset(self.token)
+
+
+class trace:
+    """Starts a trace whose root is the enclosed block. Nested traces are
+    recorded as spans of the outer one.
+
+    Args:
+        name (str): Name of the root span.
+        slow_threshold (float): Seconds above which the span tree is logged
+                                (0 disables it).
+        **tags: Details of the root span.
+    """
+
+    __slots__ = ('name', 'tags', 'slow_threshold', 'root', 'token', 'nested')
+
+    def __init__(self, name:str, slow_threshold:float = 0, **tags) -> None:
+        self.name = name
+        self.tags = tags
+        self.slow_threshold = slow_threshold
+        self.root = None
+
+
+    def __enter__(self) -> Span:
+        parent = _current.get()
+        self.nested = parent is not None
+        self.root = Span(self.name, self.tags)
+        if self.nested:
+            parent.children.append(self.root)
+        self.token = _current.set(self.root)
+        return self.root
+
+
+    def __exit__(self, *exc) -> None:
+        self.root.finish()
+        _current.reset(self.token)
+        if not self.nested and self.slow_threshold and \
+                self.root.duration > self.slow_threshold:
+            log_slow(self.root)
+
+
+def current_span() -> Optional[Span]:
+    """Returns the innermost active span, if a trace is active."""
+    return _current.get()
+
+
+def timing_header(root:Span) -> str:
+    """Formats the breakdown of a trace as a `Server-Timing` header.
+
+    Args:
+        root (Span): Root span of a finished trace.
+
+    Returns:
+        str: Time by category and the total, in milliseconds.
+    """
+    metrics = [f"{category};dur={duration * 1000:.2f}"
+               for category, duration in sorted(root.breakdown().items())]
+    metrics.append(f"total;dur={root.duration * 1000:.2f}")
+    return ', '.join(metrics)
+
+
+def log_slow(root:Span) -> None:
+    """Logs the span tree of a slow trace."""
+    tree = '\n'.join(root.format())
+    logger.warning(f"[SLOW TRACE]: '{root.name} took "
+                   f"{root.duration * 1000:.2f}ms'\n{tree}")
@@ -0,0 +1,103 @@
+"""Columnar evaluation of compiled predicates over a batch of events.
+
+NumPy is used when it is installed; otherwise masks and row selections are
+plain Python lists with the same semantics.
+"""
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+_SCALARS = (str, int, float, bool, type(None))
+_STRING_OPERATIONS = ('contains', 'does_not_contain', 'starts_with', 'ends_with')
+
+
+class Column:
+    """Values of one event key across a batch of events.
+
+    Args:
+        values (list): Value of the key in each event, None when missing.
+    """
+
+    def __init__(self, values:list) -> None:
+        if np is None:
+            self.values = values
+        else:
+            # Assigned element-wise, so nested lists stay single objects
+            self.values = np.empty(len(values), dtype=object)
+            self.values[:] = values
+        self.__strings = None
+
+
+    def mask(self, predicate) -> Iterable[bool]:
+        """Evaluates a predicate over every value of the column.
+
+        Args:
+            predicate (Predicate): Compiled predicate.
+
+        Returns:
+            Iterable[bool]: Result of the predicate for each row.
+        """
+        test = predicate.test
+        if np is None:
+            return [test(value) for value in self.values]
+
+        operation = predicate.operation
+        if operation in ('is', 'is_not') and isinstance(predicate.value, _SCALARS):
+            mask = np.asarray(self.values == predicate.value, dtype=bool)
+            return mask if operation == 'is' else ~mask
+        if operation in _STRING_OPERATIONS:
+            is_str, strings = self.__get_strings()
+            value = str(predicate.value)
+            if operation == 'starts_with':
+                mask = np.char.startswith(strings, value)
+            elif operation == 'ends_with':
+                mask = np.char.endswith(strings, value)
+            else:
+                mask = np.char.find(strings, value) >= 0
+                if operation == 'does_not_contain':
+                    mask = ~mask
+            mask &= is_str
+            # Lists and other non-string values keep the scalar semantics
+            for row in np.flatnonzero(~is_str):
+                mask[row] = test(self.values[row])
+            return mask
+        return np.fromiter((test(value) for value in self.values), 
+                           dtype=bool, count=len(self.values))
+
+
+    def __get_strings(self) -> tuple:
+        """Returns which rows hold strings and the rows as a string array."""
+        if self.__strings is None:
+            is_str = np.fromiter((isinstance(value, str) for value in self.values),
+                                 dtype=bool, count=len(self.values))
+            strings = np.where(is_str, self.values, '').astype(str)
+            self.__strings = (is_str, strings)
+        return self.__strings
+
+
+def all_rows(size:int) -> Iterable[int]:
+    """Returns the indexes of every row of a batch."""
+    return list(range(size)) if np is None else np.arange(size)
+
+
+def as_rows(rows:list) -> Iterable[int]:
+    """Converts a list of row indexes to the representation used by masks."""
+    return rows if np is None else np.asarray(rows, dtype=np.intp)
+
+
+def select(mask:Iterable[bool], rows:Iterable[int]) -> Iterable[int]:
+    """Keeps the rows whose value in `mask` is true.
+
+    Args:
+        mask (Iterable[bool]): Result of a predicate for each row.
+        rows (Iterable[int]): Candidate rows.
+
+    Returns:
+        Iterable[int]: Selected rows.
+    """
+    if np is None:
+        return [row for row in rows if mask[row]]
+    return rows[mask[rows]]
@@ -6,6 +6,8 @@ from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import declared_attr
 from rules_system.config import Session
+from rules_system.helpers.prometheus import DB_SECONDS, timed
+from rules_system.helpers.tracing import span
 
 
 class BaseModel(MappedAsDataclass, DeclarativeBase):
@@ -54,7 +56,8 @@ class BaseModel(MappedAsDataclass, DeclarativeBase):
             Exception: Any exception raised during the database commit.
                        Rolls back the transaction if an exception occurs.
         """
-        with Session() as session:
+        with timed(DB_SECONDS, 'save'), span('db.save', model=type(self).__name__), \
+                Session() as session:
             session.add(self)
             if commit:
                 try:
@@ -63,3 +66,40 @@ class BaseModel(MappedAsDataclass, DeclarativeBase):
                     session.rollback()
                     raise e
 
+
+    @classmethod
+    def save_all(cls, models:list) -> list:
+        """Saves a list of models to the database in a single transaction.
+
+        The models are flushed together, which lets SQLAlchemy send them as
+        multi-row inserts. If that fails, each model is saved again inside
+        its own savepoint, so only the models that fail are left out.
+
+        Args:
+            models (list): Models to be saved.
+
+        Returns:
+            list: The exception raised for each model, or None if it was
+                  saved.
+        """
+        errors = [None] * len(models)
+        if not models:
+            return errors
+        with timed(DB_SECONDS, 'save_all'), span('db.save_all', models=len(models)), \
+                Session() as session:
+            session.add_all(models)
+            try:
+                session.commit()
+                return errors
+            except Exception:
+                session.rollback()
+
+            for index, model in enumerate(models):
+                try:
+                    with session.begin_nested():
+                        session.add(model)
+                except Exception as e:
+                    errors[index] = e
+            session.commit()
+        return errors
+
@@ -0,0 +1,45 @@
+"""Compares size and load time of the cached filter formats: the legacy
+pickled `exec_filter` source, the pickled filters and `filter_codec`.
+
+Usage:
+    python -m tests.benchmarks.filter_codec [--loads 20000]
+"""
+import pickle
+import timeit
+import argparse
+from rules_system.models import Rule
+from rules_system.helpers import filter_codec
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.helpers.filter_compiler import FilterCompiler
+from tests.benchmarks.filter_compiler import FILTERS, legacy_exec_filter
+
+
+def main(argv:list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--loads', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    rule = Rule(id='benchmark', name="Benchmark", entity="order",
+                enabled=True, filters=FILTERS, actions=[])
+    legacy = RuleEngine.get_pickled_filter(rule)
+    pickled = pickle.dumps({'entity': rule.entity, 'filters': rule.filters})
+    encoded = filter_codec.encode(rule.entity, rule.filters)
+
+    def load_pickled():
+        data = pickle.loads(pickled)
+        return FilterCompiler.compile(data['entity'], data['filters'])
+
+    cases = {
+        'legacy source (pickle + exec)': (legacy, lambda: legacy_exec_filter(legacy)),
+        'pickled filters': (pickled, load_pickled),
+        'filter_codec': (encoded, 
+                         lambda: FilterCompiler.compile(*filter_codec.decode(encoded))),
+    }
+    print(f"{len(FILTERS)} predicates, {args.loads} loads")
+    for name, (data, load) in cases.items():
+        seconds = min(timeit.repeat(load, number=args.loads, repeat=3))
+        print(f"{name:<32} {len(data):6d} bytes {seconds / args.loads * 1e6:8.3f} us/load")
+
+
+if __name__ == '__main__':
+    main()
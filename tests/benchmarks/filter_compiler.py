@@ -0,0 +1,72 @@
+"""Compares the per-event cost of the legacy `exec_filter` path with the
+filters compiled by `FilterCompiler`.
+
+Usage:
+    python -m tests.benchmarks.filter_compiler [--events 100000]
+"""
+import uuid
+import pickle
+import timeit
+import argparse
+from rules_system.models import Order, Rule
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.helpers.filter_compiler import FilterCompiler
+
+FILTERS = [
+    {"key": "status", "operation": "is", "value": "paid"},
+    {"key": "country", "operation": "is_not", "value": "Brazil"},
+    {"key": "coupon", "operation": "is_empty"},
+    {"key": "client", "operation": "is_not_empty"},
+    {"key": "notes", "operation": "does_not_contain", "value": "fraud"},
+    {"key": "sku", "operation": "starts_with", "value": "SKU-"},
+    {"key": "email", "operation": "ends_with", "value": ".com"},
+    {"key": "notes", "operation": "contains", "value": "gift"},
+]
+
+EVENT = {
+    "status": "paid",
+    "country": "France",
+    "coupon": "",
+    "client": "Steve Jobs",
+    "notes": "a gift for a friend",
+    "sku": "SKU-123456",
+    "email": "steve@apple.com",
+}
+
+
+def legacy_exec_filter(pickled_filter:bytes):
+    filter_space = {}
+    exec(pickle.loads(pickled_filter), filter_space)
+    return filter_space['exec_filter']
+
+
+def main(argv:list = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--events', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    rule = Rule(id=str(uuid.uuid4()), name="Benchmark", entity="order",
+                enabled=True, filters=FILTERS, actions=[])
+    order = Order(id=str(uuid.uuid4()), data=EVENT)
+    pickled_filter = RuleEngine.get_pickled_filter(rule)
+    exec_filter = legacy_exec_filter(pickled_filter)
+    compiled_filter = FilterCompiler.compile(rule.entity, rule.filters)
+    assert exec_filter(order, 'order') is compiled_filter(order, 'order') is True
+
+    cases = {
+        'exec_filter (pickle.loads + exec per event)':
+            lambda: legacy_exec_filter(pickled_filter)(order, 'order'),
+        'exec_filter (compiled once)':
+            lambda: exec_filter(order, 'order'),
+        'FilterCompiler (compiled once)':
+            lambda: compiled_filter(order, 'order'),
+    }
+    print(f"{len(FILTERS)} predicates, {args.events} events")
+    for name, case in cases.items():
+        events = args.events if 'per event' not in name else args.events // 10
+        seconds = min(timeit.repeat(case, number=events, repeat=3))
+        print(f"{name:<45} {seconds / events * 1e6:8.3f} us/event")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""Measures `RuleEngine.process_event` with synthetic rulesets of growing size.
+
+Rules are generated with every operation supported by the engine, written to
+Redis with `RuleEngine.rebuild_rule_cache` and evaluated against synthetic
+events. For each ruleset size the run reports events per second, p50/p99
+latency, the time and memory taken to load the ruleset and the average
+number of triggered rules. Results can be saved as JSON and compared with a
+previous run.
+
+Usage:
+    python -m tests.benchmarks.process_event [--rules 100,1000,10000,100000]
+        [--events 2000] [--redis-url redis://localhost:6379/15]
+        [--output results.json] [--baseline previous.json]
+    python -m tests.benchmarks.process_event --compare old.json new.json
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from types import SimpleNamespace
+
+# The rules have no actions, the database only answers the action lookups.
+# The per rule metrics are not flushed, as they would go to the default Redis
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+os.environ.setdefault('RULES_METRICS_FLUSH_INTERVAL', '0')
+
+from rules_system.config.database import engine
+from rules_system.models import Base
+from rules_system.helpers.rule_engine import RuleEngine
+
+FORMAT_VERSION = 1
+
+KEYS = ['status', 'country', 'coupon', 'client', 'notes', 'sku', 'email',
+        'channel', 'carrier', 'currency']
+
+WORDS = ['paid', 'pending', 'refunded', 'Brazil', 'France', 'Japan', 'gift',
+         'fraud', 'express', 'SKU-', 'VIP', '.com', '.org', 'web', 'store',
+         'BRL', 'USD', 'EUR', 'steve', 'ana']
+
+OPERATIONS = ['is', 'is_not', 'is_empty', 'is_not_empty', 'contains',
+              'does_not_contain', 'starts_with', 'ends_with']
+
+# Compared metrics and whether a higher value is better
+METRICS = {
+    'events_per_second': True,
+    'p50_us': False,
+    'p99_us': False,
+    'load_seconds': False,
+    'memory_bytes': False,
+}
+
+
+def generate_rules(count:int, entity:str, rng:random.Random) -> list:
+    """Generates rules of one to three filters, using every operation.
+
+    Args:
+        count (int): Number of rules.
+        entity (str): Entity of the rules.
+        rng (random.Random): Seeded random generator.
+
+    Returns:
+        list: Rows with `id`, `entity` and `filters`.
+    """
+    rules = []
+    for index in range(count):
+        filters = []
+        for position in range(rng.randint(1, 3)):
+            # Cycling the first operation covers all of them in every size
+            operation = OPERATIONS[index % len(OPERATIONS)] if position == 0 \
+                else rng.choice(OPERATIONS)
+            _filter = {'key': rng.choice(KEYS), 'operation': operation}
+            if operation not in ('is_empty', 'is_not_empty'):
+                _filter['value'] = rng.choice(WORDS)
+            filters.append(_filter)
+        rules.append(SimpleNamespace(id=f"rule-{index}", entity=entity,
+                                     filters=filters))
+    return rules
+
+
+def generate_events(count:int, rng:random.Random) -> list:
+    """Generates events whose data has a random subset of the keys.
+
+    Args:
+        count (int): Number of events.
+        rng (random.Random): Seeded random generator.
+
+    Returns:
+        list: Events with `id` and `data`, like the saved models.
+    """
+    events = []
+    for index in range(count):
+        events.append(SimpleNamespace(id=f"event-{index}", data={
+            key: ' '.join(rng.sample(WORDS, rng.randint(1, 3)))
+            if rng.random() > 0.2 else ''
+            for key in rng.sample(KEYS, rng.randint(4, len(KEYS)))
+        }))
+    return events
+
+
+def get_redis(url:str = None):
+    """Returns a client of the given Redis, flushed, or a fakeredis server."""
+    if url:
+        import redis
+        client = redis.Redis.from_url(url)
+        client.flushdb()
+        return client
+    from fakeredis import FakeStrictRedis
+    return FakeStrictRedis()
+
+
+def percentile(values:list, percent:float) -> float:
+    """Returns the nearest-rank percentile of sorted values."""
+    if not values:
+        return 0
+    index = min(len(values) - 1, max(0, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+def run_size(size:int, events:list, redis, rng:random.Random) -> dict:
+    """Measures `process_event` with a ruleset of the given size.
+
+    Args:
+        size (int): Number of rules.
+        events (list): Evaluated events.
+        redis (any): Redis instance the rules are written to.
+        rng (random.Random): Seeded random generator.
+
+    Returns:
+        dict: Metrics of the run.
+    """
+    entity = f"benchmark_{size}"
+    RuleEngine.rebuild_rule_cache(generate_rules(size, entity, rng), redis,
+                                  chunk_size=5000)
+
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    RuleEngine.process_event(events[0], entity, redis)
+    load_seconds = time.perf_counter() - started_at
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    latencies = []
+    matches = 0
+    started_at = time.perf_counter()
+    for event in events:
+        event_started_at = time.perf_counter_ns()
+        matches += len(RuleEngine.process_event(event, entity, redis))
+        latencies.append(time.perf_counter_ns() - event_started_at)
+    elapsed = time.perf_counter() - started_at
+    latencies.sort()
+    return {
+        'rules': size,
+        'events': len(events),
+        'events_per_second': round(len(events) / elapsed, 1),
+        'p50_us': round(percentile(latencies, 50) / 1000, 1),
+        'p99_us': round(percentile(latencies, 99) / 1000, 1),
+        'load_seconds': round(load_seconds, 4),
+        'memory_bytes': memory_bytes,
+        'avg_matches': round(matches / len(events), 2),
+    }
+
+
+def compare(baseline:dict, current:dict, tolerance:float) -> bool:
+    """Prints the change of each metric between two runs.
+
+    Args:
+        baseline (dict): Results of the previous run.
+        current (dict): Results of the new run.
+        tolerance (float): Relative change accepted before a metric is
+                           reported as a regression.
+
+    Returns:
+        bool: True if no metric regressed beyond the tolerance.
+    """
+    ok = True
+    print(f"{'rules':>8} {'metric':<18} {'baseline':>14} {'current':>14} {'change':>9}")
+    for size, result in current['results'].items():
+        previous = baseline['results'].get(size)
+        if previous is None:
+            print(f"{size:>8} not present in the baseline")
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = -change > tolerance if higher_is_better \
+                else change > tolerance
+            ok = ok and not regressed
+            print(f"{size:>8} {metric:<18} {old:>14} {new:>14} "
+                  f"{change:>+8.1%}{' REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main(argv:list = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rules', default='100,1000,10000,100000',
+                        help='Comma separated ruleset sizes')
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--redis-url', default=os.getenv('BENCHMARK_REDIS_URL'),
+                        help='Redis to use instead of fakeredis. Its database '
+                             'is flushed')
+    parser.add_argument('--output', help='Saves the results as JSON')
+    parser.add_argument('--baseline', help='Compares the results with a '
+                                           'previous JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='Compares two JSON files without running')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Relative change reported as a regression')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            return 0 if compare(json.load(old), json.load(new),
+                                args.tolerance) else 1
+
+    Base.metadata.create_all(engine)
+    events = generate_events(args.events, random.Random(args.seed))
+    redis = get_redis(args.redis_url)
+    results = {}
+    for size in (int(size) for size in args.rules.split(',')):
+        # Each size has its own generator, so its rules don't depend on the
+        # other sizes of the run
+        result = run_size(size, events, redis, random.Random(args.seed + size))
+        results[str(size)] = result
+        print(f"{size:>7} rules: {result['events_per_second']:>10} events/s "
+              f"p50 {result['p50_us']:>8} us  p99 {result['p99_us']:>8} us  "
+              f"load {result['load_seconds']:>7} s  "
+              f"memory {result['memory_bytes'] / 2**20:>7.1f} MiB  "
+              f"matches {result['avg_matches']}")
+
+    report = {
+        'format': FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'redis': 'redis' if args.redis_url else 'fakeredis',
+        'seed': args.seed,
+        'events': args.events,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            return 0 if compare(json.load(baseline), report,
+                                args.tolerance) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import time
+import uuid
+import threading
+from unittest.mock import patch
+from app import app
+from chalice.test import Client
+from tests.test_base import TestBase
+from rules_system.commands import action_worker
+from rules_system.config.redis import get_redis_instance
+from rules_system.helpers.action_cache import ActionCache
+from rules_system.helpers.metrics import Metrics
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.models import Rule, RuleAction
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestActionWorker(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.redis = get_redis_instance()
+        self.action = RuleAction(id=str(uuid.uuid4()), name="Webhook",
+                                 data="https://test.com", action='webhook')
+        self.action.save()
+        self.rule = Rule(id=str(uuid.uuid4()), name="Rule name", 
+                         entity="order", enabled=True,
+                         filters=[{"key": "Py", "operation": "is", "value": "Test"}],
+                         actions=[self.action.id])
+        self.rule.save()
+
+
+    def enqueue(self):
+        RuleEngine.get_action_queue().enqueue([{
+            'entity': 'order',
+            'event': {'id': str(uuid.uuid4()), 'data': {'Py': 'Test'}},
+            'actions': [[self.rule.id, self.action.id]]
+        }], self.redis)
+
+
+    def test_deleted_rule_not_executed_by_running_worker(self):
+        executed = []
+        invalidations = []
+        invalidate_rule = ActionCache.invalidate_rule
+        def record_invalidation(cache, rule_id):
+            invalidations.append(threading.current_thread().name)
+            invalidate_rule(cache, rule_id)
+
+        with patch.object(RuleEngine, '_RuleEngine__exec_webhook_action',
+                          side_effect=lambda action, event: executed.append(action.id) 
+                          or action.id), \
+             patch.object(ActionCache, 'invalidate_rule', autospec=True,
+                          side_effect=record_invalidation), \
+             patch('rules_system.helpers.rule_engine.get_redis_instance',
+                   return_value=self.redis):
+            stopped = threading.Event()
+            worker = threading.Thread(target=action_worker.run, 
+                                      args=(1, 1, 2, self.redis, stopped),
+                                      daemon=True)
+            worker.start()
+            self.addCleanup(worker.join, 5)
+            self.addCleanup(stopped.set)
+            self.enqueue()
+            self.assertTrue(wait_for(lambda: executed == [self.action.id]))
+            
+            with Client(app) as client:
+                response = client.http.delete(f'/rules/{self.rule.id}')
+                self.assertEqual(response.status_code, 200)
+            # Once by the API and once by the worker's invalidation listener
+            self.assertTrue(wait_for(lambda: 'rule-invalidation' in invalidations))
+            
+            self.enqueue()
+            worker.join(5)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(executed, [self.action.id])
+
+
+    def test_worker_releases_actions_on_exit(self):
+        calls = []
+        with patch.object(RuleEngine, '_RuleEngine__exec_webhook_action',
+                          side_effect=lambda action, event: calls.append('action') 
+                          or action.id), \
+             patch('rules_system.helpers.rule_engine.close_email_dispatcher',
+                   side_effect=lambda: calls.append('email')), \
+             patch.object(Metrics, 'stop', autospec=True,
+                          side_effect=lambda metrics: calls.append('metrics')):
+            self.enqueue()
+            self.assertEqual(action_worker.run(1, 1, 1, self.redis), 1)
+
+        self.assertEqual(calls, ['action', 'email', 'metrics'])
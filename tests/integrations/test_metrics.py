@@ -0,0 +1,38 @@
+import json
+from app import app
+from chalice.test import Client
+from tests.test_base import TestBase
+from rules_system.helpers.prometheus import HTTP_REQUESTS, DB_SECONDS
+
+
+class TestMetrics(TestBase):
+
+    def test_metrics_exposition(self):
+        with Client(app) as client:
+            client.http.get('/')
+            response = client.http.get('/metrics')
+            assert response.status_code == 200
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            body = response.body.decode('utf-8')
+            assert '# TYPE rules_http_requests_total counter' in body
+            assert 'rules_http_requests_total{method="GET",route="/",status="200"}' in body
+            assert '# TYPE rules_action_queue_depth gauge' in body
+
+
+    def test_requests_recorded_by_route(self):
+        before = HTTP_REQUESTS.value('GET', '/rules/{_id}', 404)
+        saves = DB_SECONDS.count('save')
+        with Client(app) as client:
+            client.http.get('/rules/missing')
+            client.http.post(
+                '/rules',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps({
+                    "name": "Rule test",
+                    "entity": "orders",
+                    "enabled": False,
+                    "filters": []
+                })
+            )
+        assert HTTP_REQUESTS.value('GET', '/rules/{_id}', 404) == before + 1
+        assert DB_SECONDS.count('save') > saves
@@ -1,4 +1,5 @@
 import json
+from unittest.mock import patch
 from app import app
 from chalice.test import Client
 from tests.test_base import TestBase
@@ -23,6 +24,21 @@ class TestOrder(TestBase):
         assert result[0].data.get('client') == 'Py Test'
         
     
+    def test_save_all_partial_errors(self):
+        Order(id='123', data={"client": "Py Test"}).save()
+        errors = Order.save_all([
+            Order(id='456', data={"client": "Py Test"}),
+            Order(id='123', data={"client": "Test Py"}),
+            Order(id='789', data={"client": "Test Py"}),
+        ])
+
+        self.assertIsNone(errors[0])
+        self.assertIsNotNone(errors[1])
+        self.assertIsNone(errors[2])
+        ids = sorted(order.id for order in db.query(Order).all())
+        self.assertEqual(ids, ['123', '456', '789'])
+        
+    
     def test_post_success(self):
         with Client(app) as client:
             request_body = {
@@ -36,6 +52,22 @@ class TestOrder(TestBase):
             
             self.assertEqual(response.status_code, 201)
             self.assertEqual(response.json_body.get('data'), request_body)
+            self.assertNotIn('Server-Timing', response.headers)
+            
+    
+    @patch('rules_system.blueprints.tracing_blueprint.TRACE_HEADER', True)
+    def test_post_timing_header(self):
+        with Client(app) as client:
+            response = client.http.post(
+                '/orders',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps({"client": "Py Test"})
+            )
+            
+            self.assertEqual(response.status_code, 201)
+            timing = response.headers['Server-Timing']
+            self.assertIn('db;dur=', timing)
+            self.assertIn('total;dur=', timing)
             
             
     def test_get_success(self):
@@ -134,4 +166,54 @@ class TestOrder(TestBase):
             
             self.assertEqual(delete_data.status_code, 404)
             self.assertEqual(delete_data.json_body.get('error'), 
-                             f"Order with id '123456' not found.")
\ No newline at end of file
+                             f"Order with id '123456' not found.")            
+    
+    def test_bulk_success(self):
+        with Client(app) as client:
+            request_body = [{"client": "Py Test"}, {"client": "Test Py"}]
+            response = client.http.post(
+                '/orders/bulk',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps(request_body)
+            )
+            
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json_body.get('created'), 2)
+            self.assertEqual(response.json_body.get('failed'), 0)
+            items = response.json_body.get('items')
+            for item, data in zip(items, request_body):
+                self.assertIsNone(item.get('error'))
+                get_data = client.http.get(f"/orders/{item.get('id')}")
+                self.assertEqual(get_data.json_body, data)
+                
+    
+    def test_bulk_ndjson_partial_errors(self):
+        with Client(app) as client:
+            request_body = '{"client": "Py Test"}\n{invalid\n\n[1, 2]\n{"client": "Test Py"}\n'
+            response = client.http.post(
+                '/orders/bulk',
+                headers={'Content-Type':'application/x-ndjson'},
+                body=request_body
+            )
+            
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json_body.get('created'), 2)
+            self.assertEqual(response.json_body.get('failed'), 2)
+            items = response.json_body.get('items')
+            self.assertEqual([item.get('id') is None for item in items],
+                             [False, True, True, False])
+            self.assertEqual(items[1].get('error'), "Invalid JSON line")
+            self.assertEqual(items[2].get('error'), "Item must be a JSON object")
+            
+    
+    def test_bulk_bad_request(self):
+        with Client(app) as client:
+            response = client.http.post(
+                '/orders/bulk',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps({"client": "Py Test"})
+            )
+            
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json_body.get('error'), 
+                             "Bulk body must be a JSON array or NDJSON (one JSON object per line)")
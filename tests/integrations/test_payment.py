@@ -135,4 +135,54 @@ class TestPayment(TestBase):
             
             self.assertEqual(delete_data.status_code, 404)
             self.assertEqual(delete_data.json_body.get('error'), 
-                             f"Payment with id '123456' not found.")
\ No newline at end of file
+                             f"Payment with id '123456' not found.")            
+    
+    def test_bulk_success(self):
+        with Client(app) as client:
+            request_body = [{"client": "Py Test"}, {"client": "Test Py"}]
+            response = client.http.post(
+                '/payments/bulk',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps(request_body)
+            )
+            
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json_body.get('created'), 2)
+            self.assertEqual(response.json_body.get('failed'), 0)
+            items = response.json_body.get('items')
+            for item, data in zip(items, request_body):
+                self.assertIsNone(item.get('error'))
+                get_data = client.http.get(f"/payments/{item.get('id')}")
+                self.assertEqual(get_data.json_body, data)
+                
+    
+    def test_bulk_ndjson_partial_errors(self):
+        with Client(app) as client:
+            request_body = '{"client": "Py Test"}\n{invalid\n\n[1, 2]\n{"client": "Test Py"}\n'
+            response = client.http.post(
+                '/payments/bulk',
+                headers={'Content-Type':'application/x-ndjson'},
+                body=request_body
+            )
+            
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json_body.get('created'), 2)
+            self.assertEqual(response.json_body.get('failed'), 2)
+            items = response.json_body.get('items')
+            self.assertEqual([item.get('id') is None for item in items],
+                             [False, True, True, False])
+            self.assertEqual(items[1].get('error'), "Invalid JSON line")
+            self.assertEqual(items[2].get('error'), "Item must be a JSON object")
+            
+    
+    def test_bulk_bad_request(self):
+        with Client(app) as client:
+            response = client.http.post(
+                '/payments/bulk',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps({"client": "Py Test"})
+            )
+            
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json_body.get('error'), 
+                             "Bulk body must be a JSON array or NDJSON (one JSON object per line)")
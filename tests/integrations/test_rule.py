@@ -254,4 +254,36 @@ class TestRule(TestBase):
             
             self.assertEqual(delete_data.status_code, 404)
             self.assertEqual(delete_data.json_body.get('error'), 
-                             f"Rule with id '123456' not found.")
\ No newline at end of file
+                             f"Rule with id '123456' not found.")            
+    
+    def test_stats_success(self):
+        with Client(app) as client:
+            request_body = {
+                "name": "Rule test",
+                "entity": "orders",
+                "enabled": True,
+                "filters": [{"key":"Py","operation":"is","value":"Test"}]
+            }
+            post_data = client.http.post(
+                '/rules',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps(request_body)
+            ).json_body
+            
+            response = client.http.get(f"/rules/{post_data.get('id')}/stats")
+            
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json_body.get('id'), post_data.get('id'))
+            self.assertEqual(response.json_body.get('matches'), 0)
+            self.assertIsNone(response.json_body.get('match_rate'))
+            self.assertEqual(response.json_body.get('evaluation').get('count'), 0)
+            self.assertEqual(response.json_body.get('actions').get('executed'), 0)
+            
+    
+    def test_stats_not_found(self):
+        with Client(app) as client:
+            response = client.http.get(f"/rules/123456/stats")
+            
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json_body.get('error'), 
+                             f"Rule with id '123456' not found.")
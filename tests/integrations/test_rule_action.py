@@ -4,6 +4,7 @@ from chalice.test import Client
 from tests.test_base import TestBase
 from tests import db
 from rules_system.models import RuleAction
+from rules_system.helpers.rule_engine import RuleEngine
 
 
 class TestRuleAction(TestBase):
@@ -194,4 +195,34 @@ class TestRuleAction(TestBase):
             
             self.assertEqual(delete_data.status_code, 404)
             self.assertEqual(delete_data.json_body.get('error'), 
-                             f"Rule action with id '123456' not found.")
\ No newline at end of file
+                             f"Rule action with id '123456' not found.")
+            
+
+    def test_put_invalidates_actions_cache(self):
+        action_cache = RuleEngine._RuleEngine__action_cache
+        with Client(app) as client:
+            request_body = {
+                "name": "Webhook",
+                "action": "webhook",
+                "data": "https://google.com"
+            }
+            post_data = client.http.post(
+                '/rule_actions',
+                headers={'Content-Type':'application/json'},
+                body=json.dumps(request_body)
+            ).json_body
+            action_id = post_data.get('id')
+            self.assertEqual(action_cache.get_actions([action_id])[action_id].data,
+                             "https://google.com")
+            
+            request_body['data'] = "https://example.com"
+            client.http.put(
+                f"/rule_actions/{action_id}",
+                headers={'Content-Type':'application/json'},
+                body=json.dumps(request_body)
+            )
+            self.assertEqual(action_cache.get_actions([action_id])[action_id].data,
+                             "https://example.com")
+            
+            client.http.delete(f"/rule_actions/{action_id}")
+            self.assertEqual(action_cache.get_actions([action_id]), {})
@@ -0,0 +1,101 @@
+import uuid
+from contextlib import contextmanager
+from sqlalchemy import event
+from tests.test_base import TestBase
+from rules_system.config.database import engine
+from rules_system.models import Rule, RuleAction
+from rules_system.helpers.action_cache import ActionCache
+
+
+@contextmanager
+def count_queries():
+    queries = []
+    listener = lambda *args: queries.append(args[2])
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+class TestActionCache(TestBase):
+
+    def create_rule(self, *actions_ids):
+        rule = Rule(id=str(uuid.uuid4()), name="Rule", entity="order",
+                    filters=[], actions=list(actions_ids))
+        rule.save()
+        return rule
+
+
+    def create_action(self, data="py@test.com"):
+        rule_action = RuleAction(id=str(uuid.uuid4()), name="Action",
+                                 data=data, action='email')
+        rule_action.save()
+        return rule_action
+
+
+    def test_cold_lookup_is_batched(self):
+        actions = [self.create_action() for _ in range(3)]
+        rules = [self.create_rule(actions[0].id, actions[i].id) 
+                 for i in range(1, 3)]
+        cache = ActionCache(60)
+
+        with count_queries() as queries:
+            resolved = cache.get_rules_actions([rule.id for rule in rules])
+        self.assertEqual(len(queries), 2)
+        self.assertEqual([a.id for a in resolved[rules[0].id]], 
+                         [actions[0].id, actions[1].id])
+        self.assertEqual([a.id for a in resolved[rules[1].id]], 
+                         [actions[0].id, actions[2].id])
+
+        with count_queries() as queries:
+            cache.get_rules_actions([rule.id for rule in rules])
+        self.assertEqual(queries, [])
+
+
+    def test_missing_entries(self):
+        rule = self.create_rule(str(uuid.uuid4()))
+        cache = ActionCache(60)
+
+        resolved = cache.get_rules_actions([rule.id, str(uuid.uuid4())])
+        self.assertEqual(resolved, {rule.id: []})
+        with count_queries() as queries:
+            cache.get_rules_actions([rule.id])
+        self.assertEqual(queries, [])
+
+
+    def test_invalidate_action(self):
+        rule_action = self.create_action()
+        cache = ActionCache(60)
+        self.assertEqual(cache.get_actions([rule_action.id])[rule_action.id].data,
+                         "py@test.com")
+
+        rule_action.data = "new@test.com"
+        rule_action.save()
+        self.assertEqual(cache.get_actions([rule_action.id])[rule_action.id].data,
+                         "py@test.com")
+        cache.invalidate_action(rule_action.id)
+        self.assertEqual(cache.get_actions([rule_action.id])[rule_action.id].data,
+                         "new@test.com")
+
+
+    def test_invalidate_rule(self):
+        first, second = self.create_action(), self.create_action()
+        rule = self.create_rule(first.id)
+        cache = ActionCache(60)
+        cache.get_rules_actions([rule.id])
+
+        rule.actions = [first.id, second.id]
+        rule.save()
+        cache.invalidate_rule(rule.id)
+        resolved = cache.get_rules_actions([rule.id])
+        self.assertEqual([a.id for a in resolved[rule.id]], [first.id, second.id])
+
+
+    def test_expired_entries(self):
+        rule_action = self.create_action()
+        cache = ActionCache(0)
+        cache.get_actions([rule_action.id])
+        with count_queries() as queries:
+            cache.get_actions([rule_action.id])
+        self.assertEqual(len(queries), 1)
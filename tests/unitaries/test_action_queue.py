@@ -0,0 +1,57 @@
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from redis.exceptions import ConnectionError
+from rules_system.config.redis import get_redis_instance
+from rules_system.helpers.action_queue import ActionQueue
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.commands import action_worker
+
+JOB = {'entity': 'order', 
+       'event': {'id': '1', 'data': {'Py': 'Test'}}, 
+       'actions': [['rule', 'action']]}
+
+
+class TestActionQueue(TestCase):
+
+    def test_enqueue_redis(self):
+        redis = get_redis_instance()
+        handler = MagicMock()
+        queue = ActionQueue(handler, backend='redis', key='test_queue')
+        queue.enqueue([JOB, JOB], redis)
+
+        self.assertEqual(queue.depth(redis), 2)
+        self.assertEqual(queue.dequeue(1, redis), JOB)
+        self.assertEqual(queue.dequeue(1, redis), JOB)
+        handler.assert_not_called()
+
+
+    def test_enqueue_memory(self):
+        executed = threading.Event()
+        queue = ActionQueue(lambda job: executed.set(), backend='memory')
+        queue.enqueue([JOB])
+
+        self.assertTrue(executed.wait(5))
+
+
+    def test_enqueue_redis_unavailable(self):
+        redis = MagicMock()
+        redis.lpush.side_effect = ConnectionError("Connection refused")
+        executed = threading.Event()
+        queue = ActionQueue(lambda job: executed.set(), backend='redis')
+        queue.enqueue([JOB], redis)
+
+        self.assertTrue(executed.wait(5))
+
+
+    def test_action_worker_run(self):
+        redis = get_redis_instance()
+        RuleEngine.get_action_queue().enqueue([JOB, JOB], redis)
+        with patch.object(RuleEngine.get_action_queue(), 'handler', 
+                          return_value=['action']) as handler_mock:
+            consumed = action_worker.run(2, timeout=1, max_jobs=2, 
+                                         redis_instance=redis)
+
+        self.assertEqual(consumed, 2)
+        self.assertEqual(handler_mock.call_count, 2)
+        handler_mock.assert_called_with(JOB)
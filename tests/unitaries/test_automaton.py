@@ -0,0 +1,49 @@
+from unittest import TestCase
+from rules_system.helpers.automaton import Automaton
+
+
+class TestAutomaton(TestCase):
+
+    def test_scan_empty(self):
+        automaton = Automaton()
+        self.assertEqual(automaton.scan("fraud"), frozenset())
+
+
+    def test_scan_overlapping_needles(self):
+        automaton = Automaton()
+        for needle in ["he", "she", "his", "hers"]:
+            automaton.add(needle)
+
+        self.assertEqual(automaton.scan("ushers"), {"he", "she", "hers"})
+        self.assertEqual(automaton.scan("this"), {"his"})
+        self.assertEqual(automaton.scan("nothing"), frozenset())
+
+
+    def test_scan_empty_needle(self):
+        automaton = Automaton()
+        automaton.add("")
+        self.assertEqual(automaton.scan("text"), {""})
+
+
+    def test_add_after_scan(self):
+        automaton = Automaton()
+        automaton.add("gift")
+        self.assertEqual(automaton.scan("a gift card"), {"gift"})
+
+        automaton.add("card")
+        self.assertEqual(automaton.scan("a gift card"), {"gift", "card"})
+
+
+    def test_remove_reference_counted(self):
+        automaton = Automaton()
+        automaton.add("fraud")
+        automaton.add("fraud")
+        automaton.add("chargeback")
+
+        automaton.remove("fraud")
+        self.assertEqual(automaton.scan("fraud chargeback"), 
+                         {"fraud", "chargeback"})
+        automaton.remove("fraud")
+        self.assertEqual(automaton.scan("fraud chargeback"), {"chargeback"})
+        self.assertNotIn("fraud", automaton)
+        self.assertEqual(len(automaton), 1)
@@ -0,0 +1,138 @@
+import time
+import threading
+import socketserver
+from email import message_from_bytes
+from unittest import TestCase
+from unittest.mock import patch
+from rules_system.helpers.email_dispatcher import EmailDispatcher, SmtpPool
+from rules_system.helpers import email_dispatcher
+
+
+class SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP server storing the received messages."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 sink ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 sink')
+            elif command.startswith('RCPT'):
+                recipients.append(line.decode().split(':', 1)[1].strip(' <>\r\n'))
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = b''
+                while True:
+                    line = self.rfile.readline()
+                    if line in (b'.\r\n', b''):
+                        break
+                    data += line
+                self.server.messages.append((recipients, message_from_bytes(data)))
+                recipients = []
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 OK')
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SmtpSinkHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class TestEmailDispatcher(TestCase):
+
+    def setUp(self):
+        self.sink = SmtpSink()
+        threading.Thread(target=self.sink.serve_forever, daemon=True).start()
+        self.pool = SmtpPool('127.0.0.1', self.sink.server_address[1])
+
+
+    def tearDown(self):
+        self.pool.close()
+        self.sink.shutdown()
+        self.sink.server_close()
+
+
+    def test_batches_per_recipient(self):
+        dispatcher = EmailDispatcher(self.pool, window=60)
+        for i in range(3):
+            dispatcher.submit('a@test.com', f'Subject {i}', 'Body')
+        dispatcher.submit('b@test.com', 'Subject', 'Body')
+        self.assertEqual(self.sink.messages, [])
+
+        dispatcher.close()
+        self.assertEqual(len(self.sink.messages), 4)
+        self.assertEqual([r for r, _ in self.sink.messages],
+                         [['a@test.com']] * 3 + [['b@test.com']])
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(self.pool.connections_opened, 1)
+
+
+    def test_window(self):
+        dispatcher = EmailDispatcher(self.pool, window=0.1)
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        deadline = time.monotonic() + 2
+        while len(self.sink.messages) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(len(self.sink.messages), 2)
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        dispatcher.close()
+        self.assertEqual(len(self.sink.messages), 3)
+        self.assertEqual(self.pool.connections_opened, 1)
+
+
+    def test_max_batch(self):
+        dispatcher = EmailDispatcher(self.pool, window=60, max_batch=2)
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        deadline = time.monotonic() + 2
+        while len(self.sink.messages) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(len(self.sink.messages), 2)
+        dispatcher.close()
+
+
+    def test_digest(self):
+        dispatcher = EmailDispatcher(self.pool, window=60, digest=True)
+        dispatcher.submit('a@test.com', 'First', 'Body 1')
+        dispatcher.submit('a@test.com', 'Second', 'Body 2')
+        dispatcher.close()
+        self.assertEqual(len(self.sink.messages), 1)
+        message = self.sink.messages[0][1]
+        self.assertEqual(message['Subject'], '2 rule notifications')
+        self.assertIn('Body 1', message.get_payload())
+        self.assertIn('Body 2', message.get_payload())
+
+
+    def test_reconnects(self):
+        dispatcher = EmailDispatcher(self.pool, window=60)
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        dispatcher.flush()
+        self.pool.close()
+        dispatcher.submit('a@test.com', 'Subject', 'Body')
+        dispatcher.close()
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(self.pool.connections_opened, 2)
+
+
+    def test_get_email_dispatcher_disabled(self):
+        with patch.object(email_dispatcher, 'SMTP_HOST', ''):
+            self.assertIsNone(email_dispatcher.get_email_dispatcher())
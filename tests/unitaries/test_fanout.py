@@ -0,0 +1,70 @@
+import time
+import threading
+from unittest import TestCase
+from rules_system.helpers.fanout import FanOut
+
+
+class Tracker:
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return item * 2
+
+
+class TestFanOut(TestCase):
+
+    def test_results_in_order(self):
+        fanout = FanOut(max_workers=4, per_call=4)
+        self.assertEqual(fanout.map(Tracker(0.01), range(10)),
+                         [i * 2 for i in range(10)])
+        fanout.shutdown()
+
+
+    def test_runs_concurrently(self):
+        fanout = FanOut(max_workers=5, per_call=5)
+        tracker = Tracker()
+        start = time.monotonic()
+        fanout.map(tracker, range(5))
+        self.assertLess(time.monotonic() - start, 0.2)
+        self.assertEqual(tracker.peak, 5)
+        fanout.shutdown()
+
+
+    def test_per_call_cap(self):
+        fanout = FanOut(max_workers=10, per_call=2)
+        tracker = Tracker()
+        fanout.map(tracker, range(6))
+        self.assertEqual(tracker.peak, 2)
+        fanout.shutdown()
+
+
+    def test_global_cap(self):
+        fanout = FanOut(max_workers=3, per_call=3)
+        tracker = Tracker()
+        threads = [threading.Thread(target=fanout.map, args=(tracker, range(3)))
+                   for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(tracker.peak, 3)
+        fanout.shutdown()
+
+
+    def test_exceptions_are_returned(self):
+        fanout = FanOut(max_workers=2, per_call=2)
+        results = fanout.map(lambda item: 1 / item, [1, 0])
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ZeroDivisionError)
+        fanout.shutdown()
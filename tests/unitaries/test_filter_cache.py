@@ -0,0 +1,35 @@
+from unittest import TestCase
+from rules_system.helpers.filter_cache import FilterCache
+
+
+class TestFilterCache(TestCase):
+
+    def test_get_put_success(self):
+        cache = FilterCache(10)
+        cache.put('rule', '1', len)
+        self.assertIs(cache.get('rule', '1'), len)
+        self.assertIsNone(cache.get('rule', '2'))
+
+
+    def test_lru_eviction(self):
+        cache = FilterCache(2)
+        cache.put('rule_a', '1', len)
+        cache.put('rule_b', '1', len)
+        cache.get('rule_a', '1')
+        cache.put('rule_c', '1', len)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get('rule_a', '1'), len)
+        self.assertIsNone(cache.get('rule_b', '1'))
+        self.assertIs(cache.get('rule_c', '1'), len)
+
+
+    def test_ruleset_stamp(self):
+        cache = FilterCache(10)
+        cache.set_ruleset('order', ('epoch', '1'), [('rule', len)])
+        self.assertEqual(cache.get_ruleset('order'), 
+                         (('epoch', '1'), [('rule', len)]))
+        self.assertEqual(cache.get_ruleset('payment'), (None, None))
+        
+        cache.clear()
+        self.assertEqual(cache.get_ruleset('order'), (None, None))
@@ -0,0 +1,104 @@
+import uuid
+import pickle
+from unittest import TestCase
+from unittest.mock import patch
+from rules_system.config.redis import get_redis_instance
+from rules_system.exceptions import InvalidFilterFormatException
+from rules_system.helpers import filter_codec
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.models import Order, Rule
+
+FILTERS = [
+    {"key": "status", "operation": "is", "value": "paid"},
+    {"key": "total", "operation": "is", "value": 10},
+    {"key": "rate", "operation": "is_not", "value": 1.5},
+    {"key": "paid", "operation": "is", "value": True},
+    {"key": "coupon", "operation": "is_empty", "value": None},
+    {"key": "tags", "operation": "contains", "value": ["a", 1]},
+    {"key": "big", "operation": "is", "value": 2 ** 70},
+    {"key": "nome", "operation": "starts_with", "value": "João"},
+]
+
+
+class TestFilterCodec(TestCase):
+
+    def test_round_trip(self):
+        encoded = filter_codec.encode('order', FILTERS)
+        self.assertTrue(filter_codec.is_encoded(encoded))
+        self.assertEqual(filter_codec.decode(encoded), ('order', FILTERS))
+        self.assertEqual(filter_codec.decode(filter_codec.encode('order', None)),
+                         ('order', []))
+
+
+    def test_missing_value(self):
+        encoded = filter_codec.encode('order', [{"key": "a", "operation": "is_empty"}])
+        self.assertEqual(filter_codec.decode(encoded),
+                         ('order', [{"key": "a", "operation": "is_empty", "value": None}]))
+
+
+    def test_smaller_than_pickle(self):
+        encoded = filter_codec.encode('order', FILTERS)
+        pickled = pickle.dumps({'entity': 'order', 'filters': FILTERS})
+        self.assertLess(len(encoded), len(pickled))
+        self.assertFalse(filter_codec.is_encoded(pickled))
+
+
+    def test_unknown_operation(self):
+        with self.assertRaises(InvalidFilterFormatException):
+            filter_codec.encode('order', [{"key": "a", "operation": "unknown"}])
+
+
+    def test_invalid_data(self):
+        encoded = filter_codec.encode('order', FILTERS)
+        for data in [encoded[:-1], encoded + b'\x00', b'RF\x09\x00\x01', b'RF']:
+            with self.assertRaises(InvalidFilterFormatException):
+                filter_codec.decode(data)
+
+
+    def test_legacy_filters(self):
+        redis = get_redis_instance()
+        rule = Rule(id=str(uuid.uuid4()), name="Rule name", entity="order",
+                    enabled=True, filters=[{"key": "Py", "operation": "is", 
+                                            "value": "Test"}])
+        RuleEngine.set_function_cache(rule, redis)
+        self.assertTrue(filter_codec.is_encoded(
+            redis.hget("rule_index#order", rule.id)
+        ))
+        
+        legacy = Rule(id=str(uuid.uuid4()), name="Rule name", entity="order",
+                      enabled=True, filters=rule.filters)
+        redis.set(f"rule_filter#order#{legacy.id}", 
+                  RuleEngine.get_pickled_filter(legacy))
+        RuleEngine.build_rule_index(redis)
+        order = Order(id=str(uuid.uuid4()), data={"Py": "Test"})
+        self.assertEqual(sorted(RuleEngine.process_event(order, 'order', redis)),
+                         sorted([rule.id, legacy.id]))
+        
+        compile_filter = RuleEngine._RuleEngine__compile_filter
+        with patch('rules_system.helpers.rule_engine.FILTER_READ_LEGACY', False):
+            with self.assertRaises(InvalidFilterFormatException):
+                compile_filter(RuleEngine.get_pickled_filter(legacy))
+            self.assertTrue(compile_filter(RuleEngine.get_serialized_filter(rule))
+                            (order, 'order'))
+
+
+    def test_invalid_filter_skips_rule(self):
+        redis = get_redis_instance()
+        rule = Rule(id=str(uuid.uuid4()), name="Rule name", entity="payment",
+                    enabled=True, filters=[{"key": "Py", "operation": "is", 
+                                            "value": "Test"}])
+        legacy = Rule(id=str(uuid.uuid4()), name="Rule name", entity="payment",
+                      enabled=True, filters=rule.filters)
+        corrupted = Rule(id=str(uuid.uuid4()), name="Rule name", 
+                         entity="payment", enabled=True, filters=rule.filters)
+        redis.set(f"rule_filter#payment#{rule.id}", 
+                  RuleEngine.get_serialized_filter(rule))
+        redis.set(f"rule_filter#payment#{legacy.id}", 
+                  RuleEngine.get_pickled_filter(legacy))
+        redis.set(f"rule_filter#payment#{corrupted.id}", b'RF\x09\x00\x01')
+        RuleEngine.build_rule_index(redis)
+        
+        order = Order(id=str(uuid.uuid4()), data={"Py": "Test"})
+        with patch('rules_system.helpers.rule_engine.FILTER_READ_LEGACY', False):
+            self.assertEqual(RuleEngine.process_event(order, 'payment', redis),
+                             [rule.id])
@@ -0,0 +1,121 @@
+import uuid
+import pickle
+from unittest import TestCase
+from rules_system.models import Order, Rule
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.helpers.filter_compiler import FilterCompiler
+
+
+class TestFilterCompiler(TestCase):
+
+    def assertMatches(self, filters:list, data:dict, expected:bool):
+        compiled = FilterCompiler.compile('order', filters)
+        order = Order(id=str(uuid.uuid4()), data=data)
+        self.assertIs(compiled(order, 'order'), expected)
+
+
+    def test_compile_empty_filters(self):
+        self.assertMatches([], {}, True)
+
+
+    def test_compile_entity_unmatched(self):
+        compiled = FilterCompiler.compile('order', [])
+        order = Order(id=str(uuid.uuid4()), data={})
+        self.assertIs(compiled(order, 'payment'), False)
+
+
+    def test_compile_is(self):
+        _filter = [{"key":"Py","operation":"is","value":"Test"}]
+        self.assertMatches(_filter, {"Py":"Test"}, True)
+        self.assertMatches(_filter, {"Py":"Unity"}, False)
+        self.assertMatches(_filter, {}, False)
+
+
+    def test_compile_is_number(self):
+        # Values are compared as strings, like the legacy filters
+        _filter = [{"key":"value","operation":"is","value":155.02}]
+        self.assertMatches(_filter, {"value":"155.02"}, True)
+        self.assertMatches(_filter, {"value":155.02}, False)
+        _filter = [{"key":"value","operation":"is_not","value":5}]
+        self.assertMatches(_filter, {"value":5}, True)
+        self.assertMatches(_filter, {"value":"5"}, False)
+
+
+    def test_compile_is_not(self):
+        _filter = [{"key":"Py","operation":"is_not","value":"Test"}]
+        self.assertMatches(_filter, {"Py":"Unity"}, True)
+        self.assertMatches(_filter, {"Py":"Test"}, False)
+
+
+    def test_compile_is_empty(self):
+        _filter = [{"key":"Py","operation":"is_empty"}]
+        self.assertMatches(_filter, {"Py":""}, True)
+        self.assertMatches(_filter, {}, True)
+        self.assertMatches(_filter, {"Py":"Test"}, False)
+
+
+    def test_compile_is_not_empty(self):
+        _filter = [{"key":"Py","operation":"is_not_empty"}]
+        self.assertMatches(_filter, {"Py":"Test"}, True)
+        self.assertMatches(_filter, {"Py":""}, False)
+        # Legacy filters tested `!= ''`, which missing keys satisfy
+        self.assertMatches(_filter, {}, True)
+        self.assertMatches(_filter, {"Py":None}, True)
+
+
+    def test_compile_contains(self):
+        _filter = [{"key":"Py","operation":"contains","value":"test"}]
+        self.assertMatches(_filter, {"Py":"I'm a test, dude!"}, True)
+        self.assertMatches(_filter, {"Py":["test", "unity"]}, True)
+        self.assertMatches(_filter, {"Py":"I'm a robot, dude!"}, False)
+        self.assertMatches(_filter, {}, False)
+
+
+    def test_compile_does_not_contain(self):
+        _filter = [{"key":"Py","operation":"does_not_contain","value":"test"}]
+        self.assertMatches(_filter, {"Py":"I'm a robot, dude!"}, True)
+        self.assertMatches(_filter, {}, True)
+        self.assertMatches(_filter, {"Py":"I'm a test, dude!"}, False)
+
+
+    def test_compile_starts_with(self):
+        _filter = [{"key":"Py","operation":"starts_with","value":"Test"}]
+        self.assertMatches(_filter, {"Py":"Test is a good idea!"}, True)
+        self.assertMatches(_filter, {"Py":"A Test"}, False)
+        self.assertMatches(_filter, {"Py":None}, False)
+
+
+    def test_compile_ends_with(self):
+        _filter = [{"key":"Py","operation":"ends_with","value":"Test"}]
+        self.assertMatches(_filter, {"Py":"I like being a Test"}, True)
+        self.assertMatches(_filter, {"Py":"Test is a good idea!"}, False)
+
+
+    def test_compile_value_with_quotes(self):
+        _filter = [{"key":"Py's","operation":"is","value":"It's a \"Test\""}]
+        self.assertMatches(_filter, {"Py's":"It's a \"Test\""}, True)
+
+
+    def test_compile_multiple_filters(self):
+        _filter = [
+            {"key":"Py","operation":"is","value":"Test"},
+            {"key":"Test","operation":"is_not","value":"Unity"}
+        ]
+        self.assertMatches(_filter, {"Py":"Test", "Test": "Py"}, True)
+        self.assertMatches(_filter, {"Py":"Test", "Test": "Unity"}, False)
+
+
+    def test_compile_matches_legacy_filters(self):
+        values = ["5", 5, "", None, "Test", True, "True"]
+        for operation in ["is", "is_not", "is_empty", "is_not_empty"]:
+            for value in values:
+                _filter = [{"key":"Py","operation":operation,"value":value}]
+                rule = Rule(id=str(uuid.uuid4()), name="Rule name", 
+                            entity="order", enabled=True, filters=_filter)
+                filter_space = {}
+                exec(pickle.loads(RuleEngine.get_pickled_filter(rule)), 
+                     filter_space)
+                for data in [{"Py":field} for field in values] + [{}]:
+                    order = Order(id=str(uuid.uuid4()), data=data)
+                    self.assertMatches(_filter, data, 
+                                       filter_space['exec_filter'](order, 'order'))
@@ -0,0 +1,116 @@
+import time
+import threading
+from unittest import TestCase
+from rules_system.exceptions import FulfillmentTimeoutException
+from rules_system.helpers import fulfillment
+from rules_system.helpers.fulfillment import (FulfillmentPool, compile_script,
+                                              run_script, script_version)
+
+
+class TestFulfillment(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = FulfillmentPool(workers=2, timeout=0.5, cpu_limit=1)
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+
+    def test_compile_once_per_version(self):
+        source = 'data["total"] = data["price"] * 2'
+        key = ('action', script_version(source))
+        code = compile_script(key, source)
+        self.assertIs(compile_script(key, source), code)
+        
+        other = 'data["total"] = 0'
+        self.assertIsNot(compile_script(('action', script_version(other)), other),
+                         code)
+
+
+    def test_run_script_data(self):
+        data = {'price': 10}
+        source = 'data["total"] = data["price"] * 2'
+        self.assertTrue(run_script(('action', script_version(source)), source, data))
+        self.assertEqual(data['total'], 20)
+
+
+    def test_cache_size(self):
+        size = fulfillment.FULFILLMENT_CACHE_SIZE
+        for i in range(size + 10):
+            source = f'x = {i}'
+            compile_script((str(i), script_version(source)), source)
+        self.assertEqual(len(fulfillment._code_cache), size)
+
+
+    def test_pool_run(self):
+        self.assertTrue(self.pool.run('action', 'assert data["Py"] == "Test"', 
+                                      {'Py': 'Test'}))
+        with self.assertRaises(AssertionError):
+            self.pool.run('action', 'assert data["Py"] == "Other"', {'Py': 'Test'})
+        with self.assertRaises(SyntaxError):
+            self.pool.run('action', 'I am a wrong script (;)', {})
+
+
+    def test_pool_timeout(self):
+        with self.assertRaises(FulfillmentTimeoutException):
+            self.pool.run('action', 'import time\ntime.sleep(10)', {})
+        self.assertTrue(self.pool.run('action', 'pass', {}))
+
+
+    def test_pool_cpu_limit(self):
+        pool = FulfillmentPool(workers=1, timeout=10, cpu_limit=1)
+        with self.assertRaises(FulfillmentTimeoutException) as context:
+            pool.run('action', 'while True: pass', {})
+        self.assertIn('CPU', context.exception.message)
+        self.assertTrue(pool.run('action', 'pass', {}))
+        pool.shutdown()
+
+
+    def test_pool_recycles_stuck_worker(self):
+        source = ('import signal, time\n'
+                  'signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])\n'
+                  'time.sleep(10)')
+        with self.assertRaises(FulfillmentTimeoutException):
+            self.pool.run('action', source, {})
+        self.assertTrue(self.pool.run('action', 'pass', {}))
+
+
+    def test_pool_queue_time_not_charged(self):
+        pool = FulfillmentPool(workers=1, timeout=0.5, cpu_limit=1)
+        self.addCleanup(pool.shutdown)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+                       pool.run('action', 'import time\ntime.sleep(0.4)', {})))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 5)
+
+
+    def test_pool_kills_only_stuck_worker(self):
+        pool = FulfillmentPool(workers=2, timeout=1, cpu_limit=2)
+        self.addCleanup(pool.shutdown)
+        stuck = ('import signal, time\n'
+                 'signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])\n'
+                 'time.sleep(10)')
+        results = []
+        def run_slow():
+            # Still running when the stuck worker is killed
+            time.sleep(fulfillment._GRACE_PERIOD + 0.2)
+            results.append(pool.run('action', 'import time\ntime.sleep(0.9)', {}))
+        thread = threading.Thread(target=run_slow)
+        thread.start()
+        with self.assertRaises(FulfillmentTimeoutException):
+            pool.run('action', stuck, {})
+        thread.join()
+        self.assertEqual(results, [True])
+
+
+    def test_script_namespace(self):
+        self.assertTrue(self.pool.run('action', 'requests.Session\nlogger.debug("ok")', 
+                                      {}))
@@ -0,0 +1,80 @@
+import json
+import threading
+from unittest import TestCase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rules_system.helpers.http_client import HttpClient, get_http_client
+from rules_system.helpers.prometheus import REGISTRY
+
+
+def scrape(name:str) -> float:
+    for line in REGISTRY.render().splitlines():
+        if line.startswith(f'{name} '):
+            return float(line.split()[1])
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(json.loads(body))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.send_header('Set-Cookie', 'session=1; Path=/')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpClient(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+        self.server.received = []
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+    def test_reuses_connections(self):
+        client = HttpClient(pool_maxsize=2)
+        for i in range(5):
+            client.post(self.url, json={'i': i}).raise_for_status()
+
+        self.assertEqual(self.server.received, [{'i': i} for i in range(5)])
+        self.assertEqual(client.stats.as_dict(),
+                         {'requests': 5, 'connections': 1, 'reused': 4})
+
+
+    def test_does_not_store_cookies(self):
+        client = HttpClient()
+        client.post(self.url, json={})
+        self.assertEqual(len(client.session.cookies), 0)
+
+
+    def test_timeouts(self):
+        client = HttpClient(connect_timeout=1, read_timeout=2)
+        self.assertEqual(client.timeout, (1, 2))
+
+
+    def test_shared_client(self):
+        self.assertIs(get_http_client(), get_http_client())
+
+
+    def test_registry_metrics(self):
+        self.assertIn('# TYPE rules_webhook_requests_total counter', 
+                      REGISTRY.render())
+        requests = scrape('rules_webhook_requests_total')
+        connections = scrape('rules_webhook_connections_total')
+        for i in range(3):
+            get_http_client().post(self.url, json={'i': i}).raise_for_status()
+        self.assertEqual(scrape('rules_webhook_requests_total'), requests + 3)
+        self.assertEqual(scrape('rules_webhook_connections_total'), 
+                         connections + 1)
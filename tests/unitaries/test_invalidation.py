@@ -0,0 +1,127 @@
+import time
+import uuid
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+from tests.test_base import TestBase
+from rules_system.config.redis import get_redis_instance
+from rules_system.models import Rule
+from rules_system.helpers.rule_engine import RuleEngine
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestInvalidation(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.redis = get_redis_instance()
+        self.entity = f"entity-{uuid.uuid4()}"
+        self.listener = RuleEngine.start_invalidation_listener(self.redis)
+        self.assertTrue(self.listener.wait_subscribed(2))
+
+
+    def tearDown(self):
+        RuleEngine.stop_invalidation_listener()
+        super().tearDown()
+
+
+    def create_rule(self, value):
+        rule = Rule(id=str(uuid.uuid4()), name="Rule name", entity=self.entity,
+                    enabled=True, 
+                    filters=[{"key": "Py", "operation": "is", "value": value}])
+        RuleEngine.set_function_cache(rule, self.redis)
+        return rule
+
+
+    def process(self, value):
+        event = SimpleNamespace(id=str(uuid.uuid4()), data={"Py": value})
+        return RuleEngine.process_event(event, self.entity, self.redis)
+
+
+    def test_skips_version_stamp_while_subscribed(self):
+        rule = self.create_rule("Test")
+        self.assertEqual(self.process("Test"), [rule.id])
+        with patch.object(self.redis, 'mget', 
+                          side_effect=AssertionError("stamp read")):
+            self.assertEqual(self.process("Test"), [rule.id])
+
+
+    def test_updates_changed_rule(self):
+        first, second = self.create_rule("Test"), self.create_rule("Other")
+        self.assertEqual(self.process("Test"), [first.id])
+
+        first.filters = [{"key": "Py", "operation": "is", "value": "New"}]
+        RuleEngine.set_function_cache(first, self.redis)
+        self.assertTrue(wait_for(lambda: self.process("New") == [first.id]))
+        self.assertEqual(self.process("Test"), [])
+        self.assertEqual(self.process("Other"), [second.id])
+
+        RuleEngine.delete_function_cache(second, self.redis)
+        self.assertTrue(wait_for(lambda: self.process("Other") == []))
+
+
+    def test_missed_message_resyncs(self):
+        rule = self.create_rule("Test")
+        self.assertEqual(self.process("Test"), [rule.id])
+
+        rule.filters = [{"key": "Py", "operation": "is", "value": "New"}]
+        with patch('rules_system.helpers.rule_engine.publish_invalidation'):
+            RuleEngine.set_function_cache(rule, self.redis)
+        other = self.create_rule("Other")
+        self.assertTrue(wait_for(lambda: self.process("Other") == [other.id]))
+        self.assertEqual(self.process("New"), [rule.id])
+
+
+    def test_unhealthy_listener_reads_stamp(self):
+        rule = self.create_rule("Test")
+        self.assertEqual(self.process("Test"), [rule.id])
+        RuleEngine.stop_invalidation_listener()
+
+        rule.filters = [{"key": "Py", "operation": "is", "value": "New"}]
+        RuleEngine.set_function_cache(rule, self.redis)
+        self.assertEqual(self.process("New"), [rule.id])
+
+
+    def test_load_and_invalidation_serialized(self):
+        rule = self.create_rule("Test")
+        self.assertEqual(self.process("Test"), [rule.id])
+
+        messages = []
+        rule.filters = [{"key": "Py", "operation": "is", "value": "New"}]
+        with patch('rules_system.helpers.rule_engine.publish_invalidation',
+                   side_effect=lambda redis, message: messages.append(message)):
+            RuleEngine.set_function_cache(rule, self.redis)
+        RuleEngine._RuleEngine__filter_cache.drop_ruleset(self.entity)
+
+        loading, proceed = threading.Event(), threading.Event()
+        hgetall = self.redis.hgetall
+        def slow_hgetall(*args):
+            loading.set()
+            proceed.wait(2)
+            return hgetall(*args)
+
+        results = []
+        with patch.object(self.redis, 'hgetall', side_effect=slow_hgetall):
+            loader = threading.Thread(
+                target=lambda: results.append(self.process("New")))
+            loader.start()
+            self.assertTrue(loading.wait(2))
+            invalidation = threading.Thread(
+                target=RuleEngine.apply_invalidation, args=(messages[0], self.redis))
+            invalidation.start()
+            invalidation.join(0.2)
+            # Waits for the load of the same entity to store its stamp
+            self.assertTrue(invalidation.is_alive())
+            proceed.set()
+            loader.join(2)
+            invalidation.join(2)
+
+        self.assertEqual(results, [[rule.id]])
+        self.assertEqual(self.process("New"), [rule.id])
+        self.assertEqual(self.process("Test"), [])
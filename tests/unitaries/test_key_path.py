@@ -0,0 +1,80 @@
+from unittest import TestCase
+from rules_system.helpers.key_path import (is_path, parse_path, compile_path,
+                                           resolve_paths)
+from rules_system.helpers.filter_compiler import Predicate
+
+
+class TestKeyPath(TestCase):
+
+    def test_parse_path(self):
+        self.assertEqual(parse_path('status'), ('status',))
+        self.assertEqual(parse_path('customer.address.country'),
+                         ('customer', 'address', 'country'))
+        self.assertEqual(parse_path('items[0].sku'), ('items', 0, 'sku'))
+        self.assertEqual(parse_path('items[-1]'), ('items', -1))
+        self.assertEqual(parse_path('meta["utm.source"]'), ('meta', 'utm.source'))
+        self.assertEqual(parse_path("meta['a[b]']"), ('meta', 'a[b]'))
+
+
+    def test_parse_invalid_path(self):
+        for key in ['', '.status', 'status.', 'a..b', 'items[x]', 'items[0', 'a]b']:
+            with self.assertRaises(ValueError, msg=key):
+                parse_path(key)
+
+
+    def test_is_path(self):
+        self.assertFalse(is_path('status'))
+        self.assertTrue(is_path('customer.country'))
+        self.assertTrue(is_path('items[0]'))
+        self.assertFalse(is_path(None))
+
+
+    def test_walk(self):
+        path = compile_path('items[1].tags[0]')
+        self.assertEqual(path({'items': [{}, {'tags': ['gift']}]}), 'gift')
+        self.assertIsNone(path({'items': [{}]}))
+        self.assertIsNone(path({'items': {'1': {}}}))
+        self.assertIsNone(path({'items': 'ab'}))
+        self.assertIsNone(path({}))
+
+
+    def test_literal_key_wins(self):
+        path = compile_path('customer.country')
+        self.assertEqual(path({'customer.country': 'BR', 
+                               'customer': {'country': 'FR'}}), 'BR')
+
+
+    def test_shared_accessor(self):
+        self.assertIs(compile_path('customer.country'), 
+                      compile_path('customer.country'))
+        first = Predicate('customer.country', 'is', 'FR')
+        second = Predicate('customer.country', 'is_not', 'BR')
+        self.assertIs(first.path, second.path)
+        self.assertIsNone(Predicate('status', 'is', 'paid').path)
+
+
+    def test_malformed_path_is_plain_key(self):
+        for key in ['amount.', 'a..b', 'price[USD']:
+            self.assertIsNone(compile_path(key), msg=key)
+            predicate = Predicate(key, 'is', '5')
+            self.assertIsNone(predicate.path)
+            self.assertTrue(predicate({key: '5'}))
+            self.assertFalse(predicate({}))
+
+
+    def test_predicate(self):
+        predicate = Predicate('customer.address.country', 'is', 'FR')
+        self.assertTrue(predicate({'customer': {'address': {'country': 'FR'}}}))
+        self.assertFalse(predicate({'customer': {'address': None}}))
+
+
+    def test_resolve_paths(self):
+        data = {'customer': {'country': 'FR'}, 'items.count': 2}
+        paths = {key: compile_path(key) 
+                 for key in ['customer.country', 'items.count', 'missing.key']}
+        resolved = resolve_paths(data, paths)
+        self.assertEqual(resolved['customer.country'], 'FR')
+        self.assertEqual(resolved['items.count'], 2)
+        self.assertIsNone(resolved['missing.key'])
+        self.assertNotIn('customer.country', data)
+        self.assertIs(resolve_paths(data, {}), data)
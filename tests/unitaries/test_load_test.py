@@ -0,0 +1,120 @@
+import os
+import json
+import tempfile
+import threading
+from unittest import TestCase
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rules_system.commands.load_test import (LoadTest, read_events, 
+                                             parse_mix, main)
+
+
+class FakeApi(BaseHTTPRequestHandler):
+
+    requests = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append(('POST', self.path))
+        self.reply(201, {'id': str(len(self.requests))})
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append(('PUT', self.path))
+        self.reply(200, {})
+
+    def do_GET(self):
+        self.requests.append(('GET', self.path))
+        self.reply(200, {})
+
+    def reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLoadTest(TestCase):
+
+    def setUp(self):
+        FakeApi.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeApi)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.file = tempfile.NamedTemporaryFile('w', suffix='.ndjson', 
+                                                delete=False)
+        self.file.write('{"client": "Py Test"}\n\n')
+        self.file.write('{"method": "POST", "path": "/payments", "body": {"value": 1}}\n')
+        self.file.close()
+
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        os.unlink(self.file.name)
+
+
+    def test_read_events(self):
+        events = read_events([self.file.name], 'orders')
+        self.assertEqual(events, [
+            {'method': 'POST', 'path': '/orders', 'body': {'client': 'Py Test'}},
+            {'method': 'POST', 'path': '/payments', 'body': {'value': 1}},
+        ])
+
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('post=80,put=10,get=10'),
+                         {'post': 80, 'put': 10, 'get': 10})
+        with self.assertRaises(ValueError):
+            parse_mix('get=10')
+        with self.assertRaises(ValueError):
+            parse_mix('post=1,delete=1')
+
+
+    def test_run_requests(self):
+        events = read_events([self.file.name], 'orders')
+        report = LoadTest(self.url, events, concurrency=4, 
+                          total_requests=20).run()
+        self.assertEqual(report['requests'], 20)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(report['statuses'], {'201': 20})
+        self.assertEqual(len(FakeApi.requests), 20)
+        self.assertEqual({path for _, path in FakeApi.requests},
+                         {'/orders', '/payments'})
+        self.assertGreater(report['latency_ms']['p99'], 0)
+
+
+    def test_mixed_workload(self):
+        events = read_events([self.file.name], 'orders')
+        report = LoadTest(self.url, events, concurrency=2, total_requests=60,
+                          mix={'post': 1, 'put': 1, 'get': 1}).run()
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(set(report['methods']), {'POST', 'PUT', 'GET'})
+        for method, path in FakeApi.requests:
+            if method != 'POST':
+                self.assertRegex(path, r'^/(orders|payments)/\d+$')
+
+
+    def test_rate(self):
+        events = read_events([self.file.name], 'orders')
+        report = LoadTest(self.url, events, concurrency=4, rate=100,
+                          total_requests=20).run()
+        # 20 requests at 100 req/s take at least 0.19s
+        self.assertGreaterEqual(report['elapsed'], 0.19)
+
+
+    def test_main_output(self):
+        output = self.file.name + '.json'
+        try:
+            code = main([self.file.name, '--url', self.url, '--requests', '5',
+                         '--concurrency', '1', '--output', output])
+            self.assertEqual(code, 0)
+            with open(output) as report:
+                self.assertEqual(json.load(report)['requests'], 5)
+        finally:
+            if os.path.exists(output):
+                os.unlink(output)
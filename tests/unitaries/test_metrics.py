@@ -0,0 +1,77 @@
+import uuid
+from unittest import TestCase
+from tests.test_base import TestBase
+from rules_system.config.redis import get_redis_instance
+from rules_system.models import Order, Rule, RuleAction
+from rules_system.helpers.metrics import Metrics, Histogram, summarize
+from rules_system.helpers.rule_engine import RuleEngine
+
+
+class TestMetrics(TestCase):
+
+    def test_histogram_summary(self):
+        histogram = Histogram()
+        for elapsed_us in [5] * 50 + [40] * 45 + [2000] * 5:
+            histogram.observe(elapsed_us * 1000)
+        summary = summarize(histogram.counts, histogram.sum_ns)
+        self.assertEqual(summary['count'], 100)
+        self.assertAlmostEqual(summary['avg_ms'], 0.1205)
+        self.assertEqual(summary['p50_ms'], 0.01)
+        self.assertEqual(summary['p95_ms'], 0.05)
+        self.assertEqual(summary['p99_ms'], 2.5)
+        self.assertIsNone(summarize([0] * len(histogram.counts), 0)['p50_ms'])
+
+
+    def test_flush_accumulates(self):
+        redis = get_redis_instance()
+        metrics = Metrics(flush_interval=0)
+        metrics.record_events('order', [['a'], ['a', 'b'], []])
+        metrics.observe_rule('a', True, 20000)
+        metrics.observe_action('webhook', ['a'], True, 3000000)
+        metrics.observe_action('webhook', ['a', 'b'], False, 1000000)
+        metrics.flush(redis)
+        metrics.record_events('order', [['b']])
+        metrics.flush(redis)
+        metrics.flush(redis)
+
+        rule_a = Metrics.read_rule('a', 'order', redis)
+        self.assertEqual(rule_a['events'], 4)
+        self.assertEqual(rule_a['matches'], 2)
+        self.assertEqual(rule_a['match_rate'], 0.5)
+        self.assertEqual(rule_a['evaluation']['count'], 1)
+        self.assertEqual(rule_a['actions']['executed'], 1)
+        self.assertEqual(rule_a['actions']['failed'], 1)
+        self.assertEqual(rule_a['actions']['latency']['count'], 2)
+        self.assertEqual(redis.hget('action_stats#webhook', 'failed'), b'1')
+
+        rule_b = Metrics.read_rule('b', 'order', redis)
+        self.assertEqual(rule_b['matches'], 2)
+        self.assertEqual(rule_b['actions']['failed'], 1)
+        self.assertEqual(Metrics.read_rule('c', 'order', redis)['matches'], 0)
+
+
+class TestRuleEngineMetrics(TestBase):
+
+    def test_rule_metrics(self):
+        redis = get_redis_instance()
+        email_action = RuleAction(id=str(uuid.uuid4()), name="Rule Action name",
+                                  data="py@test.com", action='email')
+        email_action.save()
+        rule = Rule(id=str(uuid.uuid4()), name="Rule name", entity="order",
+                    enabled=True, actions=[email_action.id],
+                    filters=[{"key":"Py","operation":"is","value":"Test"},
+                             {"key":"Lang","operation":"is_not_empty"}])
+        rule.save()
+        RuleEngine.set_function_cache(rule, redis)
+
+        for value in ['Test', 'Other', 'Test']:
+            order = Order(id=str(uuid.uuid4()), data={"Py": value, "Lang": "py"})
+            RuleEngine.process_event(order, 'order', redis)
+        for _ in range(2):
+            RuleEngine.execute_job(RuleEngine.get_action_queue().dequeue(1, redis))
+
+        metrics = RuleEngine.get_rule_metrics(rule, redis)
+        self.assertEqual(metrics['matches'], 2)
+        self.assertGreaterEqual(metrics['events'], 3)
+        self.assertEqual(metrics['actions']['executed'], 2)
+        self.assertEqual(metrics['actions']['latency']['count'], 2)
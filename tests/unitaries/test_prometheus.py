@@ -0,0 +1,101 @@
+import threading
+import urllib.error
+import urllib.request
+from unittest import TestCase
+from rules_system.helpers.prometheus import Registry, serve, timed
+
+
+class TestPrometheus(TestCase):
+
+    def test_counter_render(self):
+        registry = Registry()
+        counter = registry.counter('jobs_total', 'Jobs.', ('queue',))
+        counter.inc('default')
+        counter.inc('default', amount=2)
+        counter.inc('slow')
+        output = registry.render()
+        self.assertIn('# HELP jobs_total Jobs.', output)
+        self.assertIn('# TYPE jobs_total counter', output)
+        self.assertIn('jobs_total{queue="default"} 3', output)
+        self.assertIn('jobs_total{queue="slow"} 1', output)
+
+
+    def test_counter_sums_thread_shards(self):
+        registry = Registry()
+        counter = registry.counter('hits_total', 'Hits.')
+        def work():
+            for _ in range(1000):
+                counter.inc()
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        self.assertLessEqual(counter.value(), 8000)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 8000)
+        # Shards of finished threads are kept in the base
+        self.assertEqual(counter.value(), 8000)
+
+
+    def test_histogram_render(self):
+        registry = Registry()
+        histogram = registry.histogram('latency_seconds', 'Latency.', 
+                                       ('op',), buckets=(0.1, 1))
+        histogram.observe(0.05, 'get')
+        histogram.observe(0.5, 'get')
+        histogram.observe(5, 'get')
+        output = registry.render()
+        self.assertIn('latency_seconds_bucket{op="get",le="0.1"} 1', output)
+        self.assertIn('latency_seconds_bucket{op="get",le="1"} 2', output)
+        self.assertIn('latency_seconds_bucket{op="get",le="+Inf"} 3', output)
+        self.assertIn('latency_seconds_sum{op="get"} 5.55', output)
+        self.assertIn('latency_seconds_count{op="get"} 3', output)
+
+
+    def test_timed(self):
+        registry = Registry()
+        histogram = registry.histogram('block_seconds', 'Block.')
+        with timed(histogram):
+            pass
+        with self.assertRaises(ValueError):
+            with timed(histogram):
+                raise ValueError()
+        self.assertEqual(histogram.count(), 2)
+
+
+    def test_gauge_function(self):
+        registry = Registry()
+        registry.gauge_function('depth', 'Depth.', lambda: 7)
+        registry.gauge_function('broken', 'Broken.', lambda: 1 / 0)
+        output = registry.render()
+        self.assertIn('depth 7', output)
+        self.assertIn('# TYPE broken gauge', output)
+        self.assertNotIn('broken 1', output)
+
+
+    def test_label_escaping(self):
+        registry = Registry()
+        counter = registry.counter('names_total', 'Names.', ('name',))
+        counter.inc('a"b\\c')
+        self.assertIn('names_total{name="a\\"b\\\\c"} 1', registry.render())
+
+
+    def test_register_returns_existing(self):
+        registry = Registry()
+        first = registry.counter('same_total', 'Same.')
+        self.assertIs(registry.counter('same_total', 'Same.'), first)
+
+
+    def test_serve(self):
+        registry = Registry()
+        registry.counter('jobs_total', 'Jobs.').inc()
+        server = serve(0, '127.0.0.1', registry)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            self.assertEqual(response.status, 200)
+            self.assertIn('text/plain', response.headers['Content-Type'])
+            self.assertIn('jobs_total 1', response.read().decode())
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
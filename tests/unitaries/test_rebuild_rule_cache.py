@@ -0,0 +1,59 @@
+import uuid
+from tests.test_base import TestBase
+from rules_system.config.redis import get_redis_instance
+from rules_system.models import Order, Rule
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.commands import rebuild_rule_cache
+
+
+class TestRebuildRuleCache(TestBase):
+
+    def create_rule(self, value, enabled=True, operation="is"):
+        rule = Rule(id=str(uuid.uuid4()), name="Rule name", entity="order",
+                    enabled=enabled, actions=[],
+                    filters=[{"key": "Py", "operation": operation, "value": value}])
+        rule.save()
+        return rule
+
+
+    def test_rebuild(self):
+        redis = get_redis_instance()
+        rules = [self.create_rule(f"Test {i}") for i in range(5)]
+        self.create_rule("Test 0", enabled=False)
+        self.create_rule("Test 0", operation="unknown")
+        
+        processed = []
+        result = RuleEngine.rebuild_rule_cache(
+            rules, redis, chunk_size=2,
+            progress=processed.append
+        )
+        self.assertEqual(result, {'written': 5, 'failed': 0, 'pruned': 0})
+        self.assertEqual(processed, [2, 4, 5])
+
+        redis = get_redis_instance()
+        result = rebuild_rule_cache.rebuild(chunk_size=2, redis_instance=redis)
+        self.assertEqual(result, {'written': 5, 'failed': 1, 'pruned': 0})
+        self.assertEqual(redis.hlen("rule_index#order"), 5)
+        for i, rule in enumerate(rules):
+            order = Order(id=str(uuid.uuid4()), data={"Py": f"Test {i}"})
+            self.assertEqual(RuleEngine.process_event(order, 'order', redis), 
+                             [rule.id])
+
+
+    def test_rebuild_prune(self):
+        redis = get_redis_instance()
+        rule = self.create_rule("Test")
+        stale = Rule(id=str(uuid.uuid4()), name="Rule name", entity="payment",
+                     enabled=True, actions=[],
+                     filters=[{"key": "Py", "operation": "is", "value": "Test"}])
+        RuleEngine.set_function_cache(stale, redis)
+
+        result = rebuild_rule_cache.rebuild(redis_instance=redis)
+        self.assertEqual(result['pruned'], 0)
+        self.assertEqual(redis.hlen("rule_index#payment"), 1)
+        
+        result = rebuild_rule_cache.rebuild(prune=True, redis_instance=redis)
+        self.assertEqual(result, {'written': 1, 'failed': 0, 'pruned': 1})
+        self.assertEqual(redis.hlen("rule_index#payment"), 0)
+        self.assertIsNone(redis.get(f"rule_filter#payment#{stale.id}"))
+        self.assertEqual(redis.hkeys("rule_index#order"), [rule.id.encode()])
@@ -9,6 +9,7 @@ from rules_system.exceptions import (InvalidFilterException,
                                      MissingRuleKeyException,
                                      InvalidFilterOperationException,
                                      RuleFilterOperationMissingFieldException,
+                                     InvalidRuleKeyException,
                                      InvalidActionTypeException)
 
 class TestRuleEngine(TestBase):
@@ -157,6 +158,21 @@ class TestRuleEngine(TestBase):
             self.assertTrue(True)
             
     
+    def test_prepare_filter_nested_key(self):
+        _filter = RuleEngine.prepare_filter([{
+            "key" : "customer.addresses[0].country",
+            "operation" : "is",
+            "value" : "FR",
+        }])
+        self.assertEqual(_filter[0]['key'], "customer.addresses[0].country")
+        with self.assertRaises(InvalidRuleKeyException):
+            RuleEngine.prepare_filter([{
+                "key" : "customer..country",
+                "operation" : "is",
+                "value" : "FR",
+            }])
+            
+    
     def test_prepare_filter_missing_rule_operation(self):
         rule_engine = RuleEngine()
         try:
@@ -490,7 +506,8 @@ class TestRuleEngine(TestBase):
     def test_exec_multiple_rule_action(self):
         """ This unitary test perforM tests on multiple functions:
             - __perform_action()
-            - __exec_rule_actions()
+            - __dispatch_actions()
+            - execute_job()
             - __exec_webhook_action()
             - __exec_email_action()
             - __exec_fulfillment_action()
@@ -535,6 +552,13 @@ class TestRuleEngine(TestBase):
             rules = rule_engine.process_event(order, 'order', redis)
             self.assertEqual(rules, [rule.id])
             
+            job = rule_engine.get_action_queue().dequeue(1, redis)
+            self.assertEqual(job.get('event'), {'id': order.id, 'data': order.data})
+            actions = rule_engine.execute_job(job)
+            self.assertEqual(actions, [email_action.id, 
+                                       webhook_action.id, 
+                                       fulfillment_action.id])
+            
             
     def test_exec_invalid_fulfilllment_action(self):
         redis = get_redis_instance()
@@ -559,4 +583,176 @@ class TestRuleEngine(TestBase):
         rule_engine.set_function_cache(rule, redis)
             
         rules = rule_engine.process_event(order, 'order', redis)
-        self.assertEqual(rules, [rule.id])
\ No newline at end of file
+        self.assertEqual(rules, [rule.id])
+        
+        job = rule_engine.get_action_queue().dequeue(1, redis)
+        self.assertEqual(rule_engine.execute_job(job), [])
+
+    def test_dedupe_actions(self):
+        redis = get_redis_instance()
+        email_action = RuleAction(id=str(uuid.uuid4()), 
+                                 name="Rule Action name",
+                                 data="py@test.com", 
+                                 action='email')
+        email_action.save()
+        rules = []
+        for value in ['Test', 'T']:
+            rule = Rule(id=str(uuid.uuid4()),
+                        name="Rule name", 
+                        entity="order",
+                        enabled=True, 
+                        filters= [{"key":"Py","operation":"starts_with",
+                                   "value":value}],
+                        actions=[email_action.id])
+            rule.save()
+            RuleEngine.set_function_cache(rule, redis)
+            rules.append(rule.id)
+        
+        order = Order(id=str(uuid.uuid4()), data={"Py": "Test"})
+        order.save()
+        
+        RuleEngine.process_event(order, 'order', redis)
+        job = RuleEngine.get_action_queue().dequeue(1, redis)
+        self.assertEqual(sorted(job.get('actions')), 
+                         sorted([[rule_id, email_action.id] for rule_id in rules]))
+        self.assertEqual(RuleEngine.execute_job(job), 
+                         [email_action.id, email_action.id])
+        
+        with patch.object(RuleEngine, '_RuleEngine__dedupe_actions', True):
+            RuleEngine.process_event(order, 'order', redis)
+        job = RuleEngine.get_action_queue().dequeue(1, redis)
+        self.assertEqual(len(job.get('actions')), 1)
+        self.assertEqual(sorted(job.get('actions')[0][0]), sorted(rules))
+        self.assertEqual(RuleEngine.execute_job(job), [email_action.id])
+
+
+    def test_get_rule_stats(self):
+        redis = get_redis_instance()
+        rule = Rule(id=str(uuid.uuid4()),
+                    name="Rule name", 
+                    entity="order",
+                    enabled=True, 
+                    filters= [{"key":"Py","operation":"is","value":"Test"},
+                              {"key":"Lang","operation":"is_not_empty"}],
+                    actions=[])
+        RuleEngine.set_function_cache(rule, redis)
+        
+        stats = RuleEngine.get_rule_stats(rule, redis)
+        self.assertEqual(len(stats['version']), 16)
+        self.assertEqual([(p['key'], p['anchor']) for p in stats['predicates']],
+                         [('Py', True), ('Lang', False)])
+        
+        other = Rule(id=str(uuid.uuid4()), entity="order")
+        self.assertIsNone(RuleEngine.get_rule_stats(other, redis))
+
+
+    def test_set_function_cache_indexes_rule(self):
+        redis = get_redis_instance()
+
+        rule = Rule(id=str(uuid.uuid4()),
+                    name="Rule name", 
+                    entity="order",
+                    enabled=True, 
+                    filters= [{"key":"Py","operation":"is","value":"Test"}],
+                    actions=[])
+        rule.save()
+        
+        rule_engine = RuleEngine()
+        rule_engine.set_function_cache(rule, redis)
+        self.assertIsNotNone(redis.hget("rule_index#order", rule.id))
+        self.assertEqual(redis.get("rule_index_version#order"), b'1')
+        
+        rule_engine.delete_function_cache(rule, redis)
+        self.assertIsNone(redis.hget("rule_index#order", rule.id))
+        self.assertEqual(redis.get("rule_index_version#order"), b'2')
+        
+    
+    def test_build_rule_index_success(self):
+        redis = get_redis_instance()
+
+        rule = Rule(id=str(uuid.uuid4()),
+                    name="Rule name", 
+                    entity="order",
+                    enabled=True, 
+                    filters= [{"key":"Py","operation":"is","value":"Test"}],
+                    actions=[])
+        rule.save()
+        
+        rule_engine = RuleEngine()
+        redis.set(f"rule_filter#{rule.entity}#{rule.id}", 
+                  rule_engine.get_pickled_filter(rule))
+        self.assertEqual(rule_engine.process_event({}, 'order', redis), [])
+        
+        self.assertEqual(rule_engine.build_rule_index(redis, batch_size=1), 1)
+        order = Order(id=str(uuid.uuid4()), data={"Py": "Test"})
+        rules = rule_engine.process_event(order, 'order', redis)
+        self.assertEqual(rules, [rule.id])
+        
+    
+    def test_process_event_recompiles_changed_rule(self):
+        redis = get_redis_instance()
+
+        rule = Rule(id=str(uuid.uuid4()),
+                    name="Rule name", 
+                    entity="order",
+                    enabled=True, 
+                    filters= [{"key":"Py","operation":"is","value":"Test"}],
+                    actions=[])
+        rule.save()
+        
+        order = Order(id=str(uuid.uuid4()), data={"Py": "Test"})
+        rule_engine = RuleEngine()
+        rule_engine.set_function_cache(rule, redis)
+        self.assertEqual(rule_engine.process_event(order, 'order', redis), 
+                         [rule.id])
+        
+        with patch.object(RuleEngine, '_RuleEngine__compile_filter') as compile_mock:
+            self.assertEqual(rule_engine.process_event(order, 'order', redis), 
+                             [rule.id])
+            compile_mock.assert_not_called()
+        
+        rule.filters = [{"key":"Py","operation":"is","value":"Unitary"}]
+        rule_engine.set_function_cache(rule, redis)
+        self.assertEqual(rule_engine.process_event(order, 'order', redis), [])
+        
+    
+    def test_process_event_updates_ruleset(self):
+        redis = get_redis_instance()
+        rule_engine = RuleEngine()
+        rules = []
+        for value in ["gift", "card"]:
+            rule = Rule(id=str(uuid.uuid4()),
+                        name="Rule name", 
+                        entity="order",
+                        enabled=True, 
+                        filters= [{"key":"notes","operation":"contains","value":value}],
+                        actions=[])
+            rule.save()
+            rule_engine.set_function_cache(rule, redis)
+            rules.append(rule)
+        
+        order = Order(id=str(uuid.uuid4()), data={"notes": "a gift card"})
+        self.assertEqual(rule_engine.process_event(order, 'order', redis), 
+                         [rules[0].id, rules[1].id])
+        
+        rule_engine.delete_function_cache(rules[0], redis)
+        self.assertEqual(rule_engine.process_event(order, 'order', redis), 
+                         [rules[1].id])
+        
+    
+    def test_process_events_success(self):
+        redis = get_redis_instance()
+        rule = Rule(id=str(uuid.uuid4()),
+                    name="Rule name", 
+                    entity="order",
+                    enabled=True, 
+                    filters= [{"key":"Py","operation":"is","value":"Test"}],
+                    actions=[])
+        rule.save()
+        
+        rule_engine = RuleEngine()
+        rule_engine.set_function_cache(rule, redis)
+        orders = [Order(id=str(uuid.uuid4()), data={"Py": "Test"}),
+                  Order(id=str(uuid.uuid4()), data={"Py": "Unitary"})]
+        rules = rule_engine.process_events(orders, 'order', redis)
+        self.assertEqual(rules, [[rule.id], []])
@@ -0,0 +1,314 @@
+import uuid
+from unittest import TestCase
+from unittest.mock import patch
+from rules_system.models import Order
+from rules_system.helpers.rule_engine import RuleEngine
+from rules_system.helpers import vectorized
+from rules_system.helpers.ruleset import Ruleset
+from rules_system.helpers.filter_compiler import FilterCompiler, Predicate
+
+
+class TestRuleset(TestCase):
+
+    def setUp(self):
+        self.ruleset = Ruleset(RuleEngine._RuleEngine__operations_list)
+
+
+    def add_rule(self, rule_id:str, filters:list) -> None:
+        self.ruleset.add(rule_id, FilterCompiler.compile('order', filters))
+
+
+    def match(self, data:dict) -> list:
+        order = Order(id=str(uuid.uuid4()), data=data)
+        return self.ruleset.match(order, 'order')
+
+
+    def test_match_empty(self):
+        self.assertEqual(self.match({"status": "paid"}), [])
+
+
+    def test_match_equality(self):
+        self.add_rule('paid', [{"key":"status","operation":"is","value":"paid"}])
+        self.add_rule('open', [{"key":"status","operation":"is","value":"open"}])
+        self.add_rule('paid_br', [
+            {"key":"country","operation":"is_not","value":"Brazil"},
+            {"key":"status","operation":"is","value":"paid"},
+        ])
+
+        self.assertEqual(self.match({"status": "paid"}), ['paid', 'paid_br'])
+        self.assertEqual(self.match({"status": "paid", "country": "Brazil"}), 
+                         ['paid'])
+        self.assertEqual(self.match({"status": "open"}), ['open'])
+        self.assertEqual(self.match({"status": ["paid"]}), [])
+
+
+    def test_match_evaluates_only_candidates(self):
+        for index in range(100):
+            self.add_rule(f'rule_{index}', [
+                {"key":"client","operation":"is_not_empty"},
+                {"key":"status","operation":"is","value":index},
+            ])
+        
+        with patch.object(Predicate, '__call__', 
+                          autospec=True, return_value=True) as predicate_mock:
+            self.assertEqual(self.match({"status": "42"}), ['rule_42'])
+            self.assertEqual(predicate_mock.call_count, 1)
+
+
+    def test_match_fallback(self):
+        self.add_rule('not_paid', 
+                      [{"key":"status","operation":"is_not","value":"paid"}])
+        self.add_rule('all', [])
+
+        self.assertEqual(self.match({"status": "open"}), ['not_paid', 'all'])
+        self.assertEqual(self.match({"status": "paid"}), ['all'])
+
+
+    def test_remove(self):
+        self.add_rule('paid', [{"key":"status","operation":"is","value":"paid"}])
+        self.add_rule('all', [])
+        self.ruleset.remove('paid')
+        self.ruleset.remove('all')
+        self.ruleset.remove('unknown')
+
+        self.assertEqual(len(self.ruleset), 0)
+        self.assertEqual(self.match({"status": "paid"}), [])
+
+
+    def test_add_replaces_rule(self):
+        self.add_rule('rule', [{"key":"status","operation":"is","value":"paid"}])
+        self.add_rule('rule', [{"key":"status","operation":"is","value":"open"}])
+
+        self.assertEqual(len(self.ruleset), 1)
+        self.assertEqual(self.match({"status": "paid"}), [])
+        self.assertEqual(self.match({"status": "open"}), ['rule'])
+
+
+    def test_match_prefix(self):
+        self.add_rule('sku', [{"key":"sku","operation":"starts_with","value":"SKU-"}])
+        self.add_rule('sku_1', [{"key":"sku","operation":"starts_with","value":"SKU-1"}])
+        self.add_rule('any', [{"key":"sku","operation":"starts_with","value":""}])
+        self.add_rule('zip', [{"key":"zip","operation":"starts_with","value":"SKU-"}])
+
+        self.assertEqual(self.match({"sku": "SKU-123"}), ['sku', 'sku_1', 'any'])
+        self.assertEqual(self.match({"sku": "SKU-234"}), ['sku', 'any'])
+        self.assertEqual(self.match({"sku": "SK"}), ['any'])
+        self.assertEqual(self.match({"sku": 123}), [])
+
+
+    def test_match_suffix(self):
+        self.add_rule('com', [{"key":"email","operation":"ends_with","value":".com"}])
+        self.add_rule('com_br', [{"key":"email","operation":"ends_with","value":".com.br"}])
+
+        self.assertEqual(self.match({"email": "py@test.com"}), ['com'])
+        self.assertEqual(self.match({"email": "py@test.com.br"}), ['com_br'])
+        self.assertEqual(self.match({"email": "py@test.org"}), [])
+
+
+    def test_match_prefers_equality_anchor(self):
+        self.add_rule('rule', [
+            {"key":"sku","operation":"starts_with","value":"SKU-"},
+            {"key":"status","operation":"is","value":"paid"},
+        ])
+
+        self.assertEqual(self.match({"sku": "SKU-1", "status": "paid"}), ['rule'])
+        self.assertEqual(self.match({"sku": "SKU-1", "status": "open"}), [])
+        self.assertEqual(self.match({"sku": "ABC-1", "status": "paid"}), [])
+
+
+    def test_remove_prefix(self):
+        self.add_rule('sku', [{"key":"sku","operation":"starts_with","value":"SKU-"}])
+        self.add_rule('sku_1', [{"key":"sku","operation":"starts_with","value":"SKU-1"}])
+        self.ruleset.remove('sku_1')
+
+        self.assertEqual(self.match({"sku": "SKU-123"}), ['sku'])
+        self.ruleset.remove('sku')
+        self.assertEqual(self.match({"sku": "SKU-123"}), [])
+
+
+    def test_match_contains(self):
+        self.add_rule('gift', [{"key":"notes","operation":"contains","value":"gift"}])
+        self.add_rule('card', [{"key":"notes","operation":"contains","value":"card"}])
+        self.add_rule('fraud', [{"key":"notes","operation":"contains","value":"fraud"}])
+
+        self.assertEqual(self.match({"notes": "a gift card"}), ['gift', 'card'])
+        self.assertEqual(self.match({"notes": "nothing"}), [])
+        self.assertEqual(self.match({"notes": ["gift"]}), ['gift'])
+        self.assertEqual(self.match({}), [])
+
+
+    def test_match_does_not_contain(self):
+        self.add_rule('safe', [
+            {"key":"notes","operation":"does_not_contain","value":"fraud"}
+        ])
+        self.add_rule('gift', [
+            {"key":"notes","operation":"contains","value":"gift"},
+            {"key":"notes","operation":"does_not_contain","value":"card"},
+        ])
+
+        self.assertEqual(self.match({"notes": "a gift"}), ['safe', 'gift'])
+        self.assertEqual(self.match({"notes": "a gift card"}), ['safe'])
+        self.assertEqual(self.match({"notes": "fraud gift"}), ['gift'])
+        self.assertEqual(self.match({}), ['safe'])
+
+
+    def test_remove_contains(self):
+        self.add_rule('gift', [{"key":"notes","operation":"contains","value":"gift"}])
+        self.add_rule('safe', [
+            {"key":"notes","operation":"does_not_contain","value":"gift"}
+        ])
+        self.ruleset.remove('gift')
+
+        self.assertEqual(self.match({"notes": "a gift"}), [])
+        self.assertEqual(self.match({"notes": "a card"}), ['safe'])
+        self.ruleset.remove('safe')
+        self.assertEqual(self.match({"notes": "a card"}), [])
+
+
+    def test_versions(self):
+        self.ruleset.add('rule', FilterCompiler.compile('order', []), '1')
+        self.assertEqual(self.ruleset.versions(), {'rule': '1'})
+        self.ruleset.remove('rule')
+        self.assertEqual(self.ruleset.versions(), {})
+
+
+
+    def test_match_batch_same_as_match(self):
+        self.add_rule('paid', [{"key":"status","operation":"is","value":"paid"}])
+        self.add_rule('sku', [
+            {"key":"sku","operation":"starts_with","value":"SKU-"},
+            {"key":"email","operation":"ends_with","value":".com"},
+        ])
+        self.add_rule('gift', [
+            {"key":"notes","operation":"contains","value":"gift"},
+            {"key":"notes","operation":"does_not_contain","value":"card"},
+        ])
+        self.add_rule('not_paid', [
+            {"key":"status","operation":"is_not","value":"paid"},
+            {"key":"coupon","operation":"is_empty"},
+        ])
+        events = [
+            Order(id=str(uuid.uuid4()), data=data) for data in [
+                {"status": "paid", "sku": "SKU-1", "email": "py@test.com"},
+                {"status": "open", "coupon": "", "notes": "a gift"},
+                {"status": ["paid"], "notes": ["gift"], "sku": 1},
+                {"notes": "a gift card", "email": "py@test.com"},
+                {},
+            ]
+        ]
+        expected = [self.ruleset.match(event, 'order') for event in events]
+        self.assertEqual(expected, [
+            ['paid', 'sku'], ['gift', 'not_paid'], ['gift', 'not_paid'], 
+            ['not_paid'], ['not_paid']
+        ])
+
+        self.assertEqual(self.ruleset.match_batch(events, 'order'), expected)
+        with patch.object(vectorized, 'np', None):
+            self.assertEqual(self.ruleset.match_batch(events, 'order'), expected)
+
+
+    def test_match_nested_paths(self):
+        self.add_rule('fr', [
+            {"key":"customer.address.country","operation":"is","value":"FR"},
+        ])
+        self.add_rule('fr_sku', [
+            {"key":"customer.address.country","operation":"is","value":"FR"},
+            {"key":"items[0].sku","operation":"starts_with","value":"SKU-"},
+        ])
+        self.add_rule('utm', [
+            {"key":'meta["utm.source"]',"operation":"contains","value":"mail"},
+        ])
+        events = [
+            Order(id=str(uuid.uuid4()), data=data) for data in [
+                {"customer": {"address": {"country": "FR"}},
+                 "items": [{"sku": "SKU-1"}]},
+                {"customer": {"address": {"country": "FR"}}, "items": [],
+                 "meta": {"utm.source": "newsletter mail"}},
+                {"customer": "FR", "items": {"0": {"sku": "SKU-1"}}},
+                {"customer.address.country": "FR"},
+            ]
+        ]
+        expected = [self.ruleset.match(event, 'order') for event in events]
+        self.assertEqual(expected, [['fr', 'fr_sku'], ['fr', 'utm'], [], ['fr']])
+        self.assertEqual(self.ruleset.match_batch(events, 'order'), expected)
+
+
+    def test_nested_path_resolved_once_per_event(self):
+        lookups = []
+        class Address(dict):
+            def get(self, key, default=None):
+                lookups.append(key)
+                return super().get(key, default)
+
+        for index in range(5):
+            self.add_rule(f'rule_{index}', [
+                {"key":"customer.address.country","operation":"is_not","value":"BR"},
+                {"key":"customer.address.country","operation":"ends_with","value":str(index)},
+            ])
+        matched = self.match({"customer": {"address": Address(country="FR3")}})
+        self.assertEqual(matched, ['rule_3'])
+        self.assertEqual(lookups, ['country'])
+
+
+    def test_remove_nested_path(self):
+        self.add_rule('fr', [
+            {"key":"customer.country","operation":"is","value":"FR"},
+        ])
+        self.ruleset.remove('fr')
+        self.assertEqual(self.ruleset._Ruleset__paths, {})
+        self.assertEqual(self.match({"customer": {"country": "FR"}}), [])
+
+
+    def test_match_batch_empty(self):
+        self.assertEqual(self.ruleset.match_batch([], 'order'), [])
+        order = Order(id=str(uuid.uuid4()), data={})
+        self.assertEqual(self.ruleset.match_batch([order], 'order'), [[]])
+
+
+    def test_reorder_by_selectivity(self):
+        self.ruleset = Ruleset(RuleEngine._RuleEngine__operations_list, 
+                               stats_sample=1, reorder_interval=3600, 
+                               min_samples=10)
+        self.add_rule('rule', [
+            {"key":"client","operation":"is_not_empty"},
+            {"key":"country","operation":"is_not","value":"Brazil"},
+        ])
+        events = [{"client": "Steve", "country": "Brazil" if i % 10 else "France"}
+                  for i in range(100)]
+        before = [self.match(data) for data in events]
+
+        stats = self.ruleset.stats('rule')
+        self.assertEqual([p['key'] for p in stats['predicates']], 
+                         ['client', 'country'])
+        self.assertEqual(stats['predicates'][0]['evaluations'], 100)
+        self.assertEqual(stats['predicates'][0]['pass_rate'], 1)
+        self.assertEqual(stats['predicates'][1]['pass_rate'], 0.1)
+
+        self.assertEqual(self.ruleset.reorder(), 1)
+        self.assertEqual([p['key'] for p in self.ruleset.stats('rule')['predicates']], 
+                         ['country', 'client'])
+        self.assertEqual([self.match(data) for data in events], before)
+        self.assertEqual(self.ruleset.reorder(), 0)
+
+
+    def test_reorder_keeps_unsampled_order(self):
+        self.ruleset = Ruleset(RuleEngine._RuleEngine__operations_list, 
+                               stats_sample=0)
+        self.add_rule('rule', [
+            {"key":"client","operation":"is_not_empty"},
+            {"key":"country","operation":"is_not","value":"Brazil"},
+        ])
+        self.match({"client": "Steve", "country": "Brazil"})
+        self.assertEqual(self.ruleset.reorder(), 0)
+        self.assertEqual(self.ruleset.stats('rule')['predicates'][0]['evaluations'], 0)
+        self.assertIsNone(self.ruleset.stats('unknown'))
+
+
+    def test_stats_anchor_first(self):
+        self.add_rule('rule', [
+            {"key":"country","operation":"is_not","value":"Brazil"},
+            {"key":"status","operation":"is","value":"paid"},
+        ])
+        stats = self.ruleset.stats('rule')
+        self.assertEqual([(p['key'], p['anchor']) for p in stats['predicates']],
+                         [('status', True), ('country', False)])
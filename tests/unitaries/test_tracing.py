@@ -0,0 +1,74 @@
+import time
+from unittest import TestCase
+from rules_system.helpers.fanout import FanOut
+from rules_system.helpers.tracing import (span, trace, current_span, 
+                                          timing_header)
+
+
+class TestTracing(TestCase):
+
+    def test_span_outside_trace(self):
+        with span('db.save') as recorded:
+            self.assertIsNone(recorded)
+        self.assertIsNone(current_span())
+
+
+    def test_span_tree(self):
+        with trace('POST /orders') as root:
+            with span('db.save', model='Order'):
+                pass
+            with span('filter.match'):
+                with span('filter.compile'):
+                    pass
+                with span('redis.load_filters'):
+                    pass
+        self.assertIsNone(current_span())
+        self.assertEqual([child.name for child in root.children],
+                         ['db.save', 'filter.match'])
+        self.assertEqual([child.name for child in root.children[1].children],
+                         ['filter.compile', 'redis.load_filters'])
+        self.assertIsNotNone(root.duration)
+
+
+    def test_breakdown_not_double_counted(self):
+        with trace('job') as root:
+            with span('filter.match'):
+                with span('filter.compile'):
+                    time.sleep(0.01)
+                time.sleep(0.01)
+        breakdown = root.breakdown()
+        self.assertEqual(set(breakdown), {'filter'})
+        self.assertAlmostEqual(breakdown['filter'], 
+                               root.children[0].duration)
+
+
+    def test_timing_header(self):
+        with trace('GET /') as root:
+            with span('redis.load_stamp'):
+                pass
+            with span('db.save'):
+                pass
+        header = timing_header(root)
+        self.assertRegex(header, r'^db;dur=[\d.]+, redis;dur=[\d.]+, total;dur=[\d.]+$')
+
+
+    def test_slow_trace_logged(self):
+        with self.assertLogs('rules_system.logger', level='WARNING') as logs:
+            with trace('POST /orders', 0.001):
+                with span('action.webhook', action_id='1'):
+                    time.sleep(0.01)
+        output = '\n'.join(logs.output)
+        self.assertIn('[SLOW TRACE]', output)
+        self.assertIn('action.webhook', output)
+        self.assertIn('action_id=1', output)
+
+
+    def test_spans_from_threads(self):
+        def work(index):
+            with span('action.webhook', index=index):
+                time.sleep(0.01)
+        fanout = FanOut(max_workers=4, per_call=4)
+        with trace('job') as root:
+            fanout.map(work, range(4))
+        fanout.shutdown()
+        self.assertEqual(len(root.children), 4)